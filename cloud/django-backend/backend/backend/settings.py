@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -122,3 +123,10 @@ STATIC_URL = 'static/'
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+
+# Local trace log of the ingest views, joined offline with the edge's on the trace ID of the records.
+# The same sample rate as the edge's TRACE_SAMPLE_RATE logs the same traces on both sides (0, the default, disables it).
+
+TRACE_LOG = os.environ.get('TRACE_LOG', str(BASE_DIR / 'traces.jsonl'))
+TRACE_SAMPLE_RATE = float(os.environ.get('TRACE_SAMPLE_RATE', '0'))
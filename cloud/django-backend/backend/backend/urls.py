@@ -23,6 +23,7 @@ urlpatterns = [
     path('home/', home_view, name='home'),
 
     path('display_json/', display_json, name='display_json'),
+    path('display_json/bulk/', display_json_bulk, name='display_json_bulk'),
 
     path('temperature/', temperature_view, name='temperature'),
     path('temperature/day/', temperature_view_day, name='temperature_day'),
@@ -0,0 +1,38 @@
+# Generated by Django 4.2.5 on 2026-10-17 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend_app', '0004_delete_plug'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='libellium',
+            name='CO',
+            field=models.FloatField(null=True),
+        ),
+        migrations.AlterField(
+            model_name='libellium',
+            name='HUM',
+            field=models.FloatField(null=True),
+        ),
+        migrations.AlterField(
+            model_name='libellium',
+            name='O3',
+            field=models.FloatField(null=True),
+        ),
+        migrations.AlterField(
+            model_name='libellium',
+            name='PRES',
+            field=models.FloatField(null=True),
+        ),
+        migrations.AlterField(
+            model_name='libellium',
+            name='TC',
+            field=models.FloatField(null=True),
+        ),
+    ]
@@ -5,8 +5,9 @@ from django.db import models
 class Libellium(models.Model):
     timestamp = models.DateTimeField()
     # id = models.IntegerField(primary_key=True)
-    CO = models.FloatField()
-    O3 = models.FloatField()
-    TC = models.FloatField()
-    HUM = models.FloatField()
-    PRES = models.FloatField()
\ No newline at end of file
+    # NULL when the edge did not report the value (unchanged since the node's previous record): readers carry it forward
+    CO = models.FloatField(null=True)
+    O3 = models.FloatField(null=True)
+    TC = models.FloatField(null=True)
+    HUM = models.FloatField(null=True)
+    PRES = models.FloatField(null=True)
\ No newline at end of file
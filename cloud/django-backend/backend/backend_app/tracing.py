@@ -0,0 +1,64 @@
+# Spans of the ingest views, written to a local sampled trace log in the edge's format (see edge/tracing/tracing.py)
+
+import json
+import threading
+import time
+
+from django.conf import settings
+
+SAMPLE_SPACE = 1 << 32
+
+_lock = threading.Lock()
+_file = None
+
+
+def is_sampled(trace_id, sample_rate):
+    # Same rule as the edge: the decision only depends on the trace ID
+    try:
+        return int(trace_id[:8], 16) < sample_rate * SAMPLE_SPACE
+    except (TypeError, ValueError):
+        return False
+
+
+def write(line):
+    global _file
+    with _lock:
+        if _file is None:
+            _file = open(settings.TRACE_LOG, 'a', buffering=1)
+        _file.write(line + '\n')
+
+
+class RequestTrace:
+    # Spans of one ingest request, logged for each of its sampled records
+    def __init__(self, view):
+        self.view = view
+        self.received = time.time()
+        self.start = time.monotonic()
+        self.spans = []
+
+    def span(self, name, begin):
+        self.spans.append({
+            'name': name,
+            'start': round(begin - self.start, 6),
+            'duration': round(time.monotonic() - begin, 6)
+        })
+
+    def finish(self, records, outcome):
+        sample_rate = settings.TRACE_SAMPLE_RATE
+        if sample_rate <= 0:
+            return
+
+        for record in records:
+            metadata = record.get('metadata', {}) if isinstance(record, dict) else {}
+            trace_id = metadata.get('trace_id')
+            if trace_id is None or not is_sampled(trace_id, sample_rate):
+                continue
+            write(json.dumps({
+                'trace_id': trace_id,
+                'process': 'cloud',
+                'view': self.view,
+                'received': round(self.received, 6),
+                'outcome': outcome,
+                'records': len(records),
+                'spans': self.spans
+            }))
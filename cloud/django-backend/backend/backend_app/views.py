@@ -5,40 +5,127 @@ from django.utils import timezone
 # Create your views here.
 
 import json
+import time
+from django.db import transaction
 from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from .models import Libellium
+from . import tracing
+from . import wire
+
+LIBELLIUM_FIELDS = ('CO', 'O3', 'TC', 'HUM', 'PRES')
+
+def build_libellium(json_data):
+    # Convert the date and time to a datetime object
+    datetime_str = f"{json_data['metadata']['date']}T{json_data['metadata']['time']}"
+    formatted_datetime = datetime.datetime.fromisoformat(datetime_str)
+
+    # The edge only reports the values that changed: the others are stored as NULL and carried forward by the readers
+    values = {}
+    for field in LIBELLIUM_FIELDS:
+        measure = json_data['data'].get(field)
+        values[field] = measure['value'] if measure is not None else None
+
+    # Libellium creation
+    return Libellium(timestamp=formatted_datetime, **values)
+
+def series(parameter, start_datetime, end_datetime):
+    # (timestamp, value) of a parameter in a time slot, oldest first: NULL values (not reported by the edge because
+    # unchanged) take the last value reported before them, even before the slot
+    last = (Libellium.objects.filter(timestamp__lt=start_datetime, **{f"{parameter}__isnull": False})
+            .order_by('-timestamp', '-id').values_list(parameter, flat=True).first())
+
+    measurements = Libellium.objects.filter(timestamp__range=(start_datetime, end_datetime)).order_by('timestamp', 'id')
+    for instance in measurements:
+        value = getattr(instance, parameter)
+        if value is None:
+            value = last
+        if value is None:
+            continue
+        last = value
+        yield instance.timestamp, value
+
+def read_records(request):
+    # Content negotiation: JSON (a record or an array of records) or a compact message, optionally compressed
+    body = wire.decompress(request.body, request.headers.get('Content-Encoding'))
+    if request.content_type == wire.CONTENT_TYPE_COMPACT:
+        return wire.to_json_records(body)
+
+    json_data = json.loads(body.decode('utf-8'))
+    return json_data if isinstance(json_data, list) else [json_data]
 
 @csrf_exempt # This decorator is used to exempt the csrf token check
 
 def display_json(request):
     if request.method == 'POST':
+        trace = tracing.RequestTrace('display_json')
         try:
-            json_data = json.loads(request.body.decode('utf-8'))
+            begin = time.monotonic()
+            json_list = read_records(request)
+            trace.span('read', begin)
+            if not json_list:
+                return render(request, 'error.html', {'error_message': 'No records'})
             # Save JSON data to the database
             # JSONData.objects.create(data=json_data)
 
-            # Convert the date and time to a datetime object
-            datetime_str = f"{json_data['metadata']['date']}T{json_data['metadata']['time']}"
-            formatted_datetime = datetime.datetime.fromisoformat(datetime_str)
+            begin = time.monotonic()
+            for json_data in json_list:
+                lib = build_libellium(json_data)
 
-            # Libellium creation
-            lib = Libellium(timestamp=formatted_datetime,
-                            CO = json_data['data']['CO']['value'],
-                            O3 = json_data['data']['O3']['value'],
-                            TC = json_data['data']['TC']['value'],
-                            HUM = json_data['data']['HUM']['value'],
-                            PRES = json_data['data']['PRES']['value'])
-
-            # Save to database
-            lib.save()
+                # Save to database
+                lib.save()
+            trace.span('save', begin)
+            trace.finish(json_list, 'saved')
 
             return render(request, 'display.html', {'json_data': json_data})
         except json.JSONDecodeError as e:
             return render(request, 'error.html', {'error_message': 'Invalid JSON format'})
+        except wire.WireFormatError as e:
+            return render(request, 'error.html', {'error_message': str(e)})
+        except (KeyError, TypeError, ValueError, AttributeError) as e:
+            return render(request, 'error.html', {'error_message': f'Invalid record: {e!r}'})
     else:
         return render(request, 'error.html', {'error_message': 'Method not allowed'})
 
+@csrf_exempt
+
+def display_json_bulk(request):
+    # Same records as display_json, sent by the edge in batches as a JSON array or a compact message.
+    # The valid records are saved and the invalid ones reported by position, so one bad record never blocks a batch
+    if request.method != 'POST':
+        return JsonResponse({'error': 'Method not allowed'}, status=405)
+
+    trace = tracing.RequestTrace('display_json_bulk')
+    try:
+        begin = time.monotonic()
+        json_list = read_records(request)
+        trace.span('read', begin)
+    except json.JSONDecodeError:
+        return JsonResponse({'error': 'Invalid JSON format'}, status=400)
+    except wire.UnsupportedEncoding as e:
+        return JsonResponse({'error': str(e)}, status=415)
+    except wire.WireFormatError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    begin = time.monotonic()
+    libs = []
+    rejected = []
+    for index, json_data in enumerate(json_list):
+        try:
+            libs.append(build_libellium(json_data))
+        except (KeyError, TypeError, ValueError, AttributeError) as e:
+            rejected.append({'index': index, 'error': f'Invalid record: {e!r}'})
+    trace.span('build', begin)
+
+    # Save the valid records with a single query
+    begin = time.monotonic()
+    with transaction.atomic():
+        Libellium.objects.bulk_create(libs)
+    trace.span('save', begin)
+    trace.finish(json_list, 'saved' if not rejected else 'partial')
+
+    return JsonResponse({'created': len(libs), 'rejected': rejected})
+
 def home_view(request):
     return render(request, 'html/home.html')
 
@@ -119,8 +206,6 @@ def build_json_day(label, parameter):
     # Calculate the end of the 24-hour slot
     end_datetime = current_datetime
 
-    measurements = Libellium.objects.filter(timestamp__range=(start_datetime, end_datetime))
-
     # Create metadata dictionary
     metadata = {
         "type": "line",
@@ -129,13 +214,10 @@ def build_json_day(label, parameter):
 
     # Create data list
     data = []
-    # Iterate through Libellium instances
-    for instance in measurements:
-        time = instance.timestamp.strftime("%Y-%m-%d %H:%M")  # Format timestamp as yyyy-mm-dd hh:mm
-        # time = instance.timestamp.strftime("%H:%M")  # Format timestamp as hh:mm
-        if parameter=="TC": value = instance.TC  # Assuming TC is temperature in °C
-        if parameter=="HUM": value = instance.HUM
-        if parameter=="CO": value = instance.CO
+    # Iterate through the values of the parameter, carried forward where the edge did not report them
+    for timestamp, value in series(parameter, start_datetime, end_datetime):
+        time = timestamp.strftime("%Y-%m-%d %H:%M")  # Format timestamp as yyyy-mm-dd hh:mm
+        # time = timestamp.strftime("%H:%M")  # Format timestamp as hh:mm
 
         # Create data point dictionary
         data_point = {"time": time, "value": value}
@@ -162,8 +244,6 @@ def build_json_month(label, parameter):
     # Calculate the start of the 30-day slot
     start_datetime = end_datetime - datetime.timedelta(days=30)
 
-    measurements = Libellium.objects.filter(timestamp__range=(start_datetime, end_datetime))
-
     # Create metadata dictionary
     metadata = {
         "type": "line",
@@ -172,13 +252,10 @@ def build_json_month(label, parameter):
 
     # Create data list
     data = []
-    # Iterate through Libellium instances
-    for instance in measurements:
-        time = instance.timestamp.strftime("%Y-%m-%d %H:%M")  # Format timestamp as yyyy-mm-dd hh:mm
-        # time = instance.timestamp.strftime("%H:%M")  # Format timestamp as hh:mm
-        if parameter=="TC": value = instance.TC  # Assuming TC is temperature in °C
-        if parameter=="HUM": value = instance.HUM
-        if parameter=="CO": value = instance.CO
+    # Iterate through the values of the parameter, carried forward where the edge did not report them
+    for timestamp, value in series(parameter, start_datetime, end_datetime):
+        time = timestamp.strftime("%Y-%m-%d %H:%M")  # Format timestamp as yyyy-mm-dd hh:mm
+        # time = timestamp.strftime("%H:%M")  # Format timestamp as hh:mm
 
         # Create data point dictionary
         data_point = {"time": time, "value": value}
@@ -205,8 +282,6 @@ def build_json_year(label, parameter):
     # Calculate the start of the 1-year slot
     start_datetime = end_datetime - datetime.timedelta(days=365)
 
-    measurements = Libellium.objects.filter(timestamp__range=(start_datetime, end_datetime))
-
     # Create metadata dictionary
     metadata = {
         "type": "line",
@@ -215,13 +290,10 @@ def build_json_year(label, parameter):
 
     # Create data list
     data = []
-    # Iterate through Libellium instances
-    for instance in measurements:
-        time = instance.timestamp.strftime("%Y-%m-%d %H:%M")  # Format timestamp as yyyy-mm-dd hh:mm
-        # time = instance.timestamp.strftime("%H:%M")  # Format timestamp as hh:mm
-        if parameter=="TC": value = instance.TC  # Assuming TC is temperature in °C
-        if parameter=="HUM": value = instance.HUM
-        if parameter=="CO": value = instance.CO
+    # Iterate through the values of the parameter, carried forward where the edge did not report them
+    for timestamp, value in series(parameter, start_datetime, end_datetime):
+        time = timestamp.strftime("%Y-%m-%d %H:%M")  # Format timestamp as yyyy-mm-dd hh:mm
+        # time = timestamp.strftime("%H:%M")  # Format timestamp as hh:mm
 
         # Create data point dictionary
         data_point = {"time": time, "value": value}
@@ -0,0 +1,140 @@
+# Decoder of the compact format published by the edge (see edge/wire/wire.py, which also encodes it)
+
+import datetime
+import struct
+import zlib
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+CONTENT_TYPE_JSON = 'application/json'
+CONTENT_TYPE_COMPACT = 'application/x-libellium-compact'
+
+MAGIC = b'LBC'
+VERSION = 1
+HEADER = struct.Struct('<3sBB')
+BODY_HEADER = struct.Struct('<H')
+FLAG_ZLIB = 0x01
+FLAG_ZSTD = 0x02
+RECORD_LENGTH = struct.Struct('<H')
+RECORD_HEADER = struct.Struct('<qB')
+
+# Reserved binary_id of the trace of a record: [trace_id, received_at]
+TRACE = 255
+
+UINT8, UINT16, UINT32, UINT64, INT64, FLOAT32, FLOAT64, STRING, LIST, NULL = range(10)
+VALUE_FORMATS = {
+    UINT8: struct.Struct('<B'),
+    UINT16: struct.Struct('<H'),
+    UINT32: struct.Struct('<I'),
+    UINT64: struct.Struct('<Q'),
+    INT64: struct.Struct('<q'),
+    FLOAT32: struct.Struct('<f'),
+    FLOAT64: struct.Struct('<d'),
+}
+
+EPOCH = datetime.datetime(1970, 1, 1)
+
+# binary_id of the sensors stored by the backend (from the edge's sensor.json)
+ASCII_IDS = {0: 'CO', 4: 'O3', 74: 'TC', 76: 'HUM', 77: 'PRES'}
+
+
+class WireFormatError(Exception):
+    pass
+
+
+class UnsupportedEncoding(WireFormatError):
+    pass
+
+
+def decompress(body, encoding):
+    # HTTP 'Content-Encoding' of a body: none, 'deflate' (zlib) or 'zstd'
+    if not encoding or encoding == 'identity':
+        return body
+    if encoding == 'deflate':
+        return zlib.decompress(body)
+    if encoding == 'zstd' and zstandard is not None:
+        return zstandard.ZstdDecompressor().decompress(body)
+    raise UnsupportedEncoding(f"Content encoding '{encoding}' not supported")
+
+
+def decode_value(view, offset):
+    code = view[offset]
+    offset += 1
+
+    unpacker = VALUE_FORMATS.get(code)
+    if unpacker is not None:
+        return unpacker.unpack_from(view, offset)[0], offset + unpacker.size
+    if code == STRING:
+        length = view[offset]
+        offset += 1
+        return bytes(view[offset:offset + length]).decode('utf-8'), offset + length
+    if code == LIST:
+        count = view[offset]
+        offset += 1
+        values = []
+        for _ in range(count):
+            value, offset = decode_value(view, offset)
+            values.append(value)
+        return values, offset
+    if code == NULL:
+        return None, offset
+    raise WireFormatError(f"Unknown type code {code}")
+
+
+def to_json_records(data):
+    # Decodes a compact message into records shaped like the JSON ones: {"metadata", "data"}
+    try:
+        magic, version, flags = HEADER.unpack_from(data, 0)
+        if magic != MAGIC or version != VERSION:
+            raise WireFormatError("Not a compact message")
+
+        body = bytes(data[HEADER.size:])
+        if flags & FLAG_ZLIB:
+            body = decompress(body, 'deflate')
+        elif flags & FLAG_ZSTD:
+            body = decompress(body, 'zstd')
+
+        count = BODY_HEADER.unpack_from(body, 0)[0]
+        offset = BODY_HEADER.size
+        length = body[offset]
+        room = body[offset + 1:offset + 1 + length].decode('utf-8')
+        offset += 1 + length
+
+        records = []
+        for _ in range(count):
+            length = RECORD_LENGTH.unpack_from(body, offset)[0]
+            offset += RECORD_LENGTH.size
+            end = offset + length
+
+            milliseconds, values = RECORD_HEADER.unpack_from(body, offset)
+            offset += RECORD_HEADER.size
+
+            data = {}
+            trace = None
+            for _ in range(values):
+                binary_id = body[offset]
+                value, offset = decode_value(body, offset + 1)
+                if binary_id == TRACE:
+                    trace = value
+                    continue
+                data[ASCII_IDS.get(binary_id, str(binary_id))] = {'value': value}
+
+            if offset != end:
+                raise WireFormatError("Record length mismatch")
+
+            timestamp = EPOCH + datetime.timedelta(milliseconds=milliseconds)
+            metadata = {
+                'date': timestamp.strftime('%Y-%m-%d'),
+                'time': timestamp.strftime('%H:%M:%S.%f')[:-5],
+                'room': room
+            }
+            if trace is not None:
+                metadata['trace_id'], metadata['received_at'] = trace
+            records.append({'metadata': metadata, 'data': data})
+        return records
+
+    except (struct.error, IndexError, UnicodeDecodeError, zlib.error) as e:
+        raise WireFormatError(f"Truncated or corrupted compact message: {e}")
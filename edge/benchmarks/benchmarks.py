@@ -0,0 +1,202 @@
+# ************************************** BENCHMARKS MODULE **************************************
+
+import argparse
+import itertools
+import json
+import platform
+import random
+import statistics
+import sys
+import time
+from datetime import datetime
+import libellium.libellium as libellium
+import libellium.aes as aes
+import loadgen.loadgen as loadgen
+import wire.wire as wire
+
+# Frame sent by 'test.py', decoded by every benchmark besides the generated fleet
+FRAME = bytes.fromhex("3C3D3E06451B20B4BD3C195E206E6F64655F3031231434641500000000006185EB3F0100000000"
+                      "046179913E4A7B14C4414C005462424DBFD0C647460000000047000000004800000000")
+
+# Ratio beyond which a benchmark is reported as slower or faster than the baseline
+THRESHOLD = 0.05
+
+
+def measure(function, number: int, repeat: int) -> dict:
+    """
+    Times a function: 'repeat' rounds of 'number' calls, after a warm-up round.
+    The minimum is the most repeatable figure, the median shows the noise of the machine.
+
+    Args:
+        function (callable): The function, called without arguments.
+        number (int): Calls per round.
+        repeat (int): Number of rounds.
+
+    Returns:
+        dict: The min and median time per call in microseconds, the calls per round and the number of rounds.
+    """
+    for _ in range(number):
+        function()
+
+    rounds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        rounds.append((time.perf_counter() - start) / number * 1e6)
+
+    return {
+        "min_us": round(min(rounds), 3),
+        "median_us": round(statistics.median(rounds), 3),
+        "number": number,
+        "repeat": repeat
+    }
+
+
+def parse(frame, mode: str):
+    measurement = libellium.Libellium(frame)
+    measurement.parse(mode)
+    return measurement
+
+
+def benchmarks(seed: int = 0, nodes: int = 100) -> dict:
+    """
+    Returns the benchmarks: {name: function}. Generated frames come from a fleet of 'nodes' nodes
+    built with 'seed', so that two runs with the same arguments decode the same frames.
+
+    Args:
+        seed (int, optional): The seed of the generated fleet. Default is 0.
+        nodes (int, optional): Number of nodes of the generated fleet. Default is 100.
+    """
+    import tcp_module
+
+    builder = loadgen.FrameBuilder(seed)
+    fleet = [builder.build(builder.node(number)) for number in range(nodes)]
+    fleet_hex = [frame.hex().upper() for frame in fleet]
+    frame_hex = FRAME.hex().upper()
+    # The fleet benchmarks go through every generated frame in turn
+    next_frame = itertools.cycle(fleet).__next__
+    next_frame_hex = itertools.cycle(fleet_hex).__next__
+
+    temperature = libellium.SENSORS[74]
+    float_tokens = ['01000001', '11001010', '01010010', '01000010']
+    uint16_tokens = ['11101000', '00000011']
+    uint32_tokens = ['01000000', '11100010', '00000001', '00000000']
+
+    module = tcp_module.TcpModule()
+
+    # Records serialized from the measurements of the decoded fleet
+    decoded = [parse(frame, 'bytes').measurements for frame in fleet]
+    next_measures = itertools.cycle(decoded).__next__
+    json_codec = wire.Codec('json')
+    compact_codec = wire.Codec('compact')
+    metadata = {"date": "2024-01-01", "time": "12:00:00.0", "room": "DTLab"}
+
+    selected = {
+        "libellium.parse.bytes": lambda: parse(FRAME, 'bytes'),
+        "libellium.parse.bytes.hex": lambda: parse(frame_hex, 'bytes'),
+        "libellium.parse.bytes.fleet": lambda: parse(next_frame(), 'bytes'),
+        "libellium.parse.tokens": lambda: parse(frame_hex, 'tokens'),
+        "libellium.parse.tokens.fleet": lambda: parse(next_frame_hex(), 'tokens'),
+        "sensor.little_endian_conversion.float": lambda: temperature.little_endian_conversion(float_tokens, 'float'),
+        "sensor.little_endian_conversion.uint16_t": lambda: temperature.little_endian_conversion(uint16_tokens, 'uint16_t'),
+        "sensor.little_endian_conversion.uint32_t": lambda: temperature.little_endian_conversion(uint32_tokens, 'uint32_t'),
+        "tcp_module.decode": lambda: module.decode(FRAME),
+        "tcp_module.decode.fleet": lambda: module.decode(next_frame()),
+        "wire.record.json.fleet": lambda: json_codec.record(metadata, next_measures(), wire.EPOCH),
+        "wire.record.compact.fleet": lambda: compact_codec.record(metadata, next_measures(), wire.EPOCH),
+        "wire.sensor_messages.json.fleet": lambda: json_codec.sensor_messages(metadata, next_measures(), wire.EPOCH),
+        "wire.sensor_messages.compact.fleet": lambda: compact_codec.sensor_messages(metadata, next_measures(), wire.EPOCH)
+    }
+
+    # The same frames encrypted with a key per node (AES-256 v15 frames): the added latency is the decryption
+    if aes.Cipher is not None:
+        keys = random.Random(seed)
+        store = libellium.KEY_STORE.keys
+        for frame in [FRAME] + fleet:
+            store.setdefault(int.from_bytes(frame[aes.SERIAL_ID_START:aes.SERIAL_ID_END], 'big'), keys.randbytes(32))
+        encrypted, *encrypted_fleet = [
+            aes.encrypt_frame(frame, store[int.from_bytes(frame[aes.SERIAL_ID_START:aes.SERIAL_ID_END], 'big')])
+            for frame in [FRAME] + fleet
+        ]
+        next_encrypted = itertools.cycle(encrypted_fleet).__next__
+
+        selected["libellium.parse.aes"] = lambda: parse(encrypted, 'bytes')
+        selected["libellium.parse.aes.fleet"] = lambda: parse(next_encrypted(), 'bytes')
+        selected["tcp_module.decode.aes.fleet"] = lambda: module.decode(next_encrypted())
+
+    return selected
+
+
+def run(selected: dict, number: int, repeat: int) -> dict:
+    """
+    Runs benchmarks and returns their results with the environment they ran in.
+
+    Args:
+        selected (dict): The benchmarks: {name: function}.
+        number (int): Calls per round.
+        repeat (int): Number of rounds.
+    """
+    results = {}
+    for name, function in selected.items():
+        results[name] = measure(function, number, repeat)
+        print(f"[BENCHMARKS] {name:<45} {results[name]['min_us']:>10.3f} us (median {results[name]['median_us']:.3f} us)")
+
+    return {
+        "metadata": {
+            "date": datetime.now().isoformat(timespec='seconds'),
+            "python": sys.version.split()[0],
+            "implementation": platform.python_implementation(),
+            "platform": platform.platform(),
+            "machine": platform.machine()
+        },
+        "results": results
+    }
+
+
+def compare(baseline: dict, current: dict) -> list:
+    """
+    Compares the min times of two runs.
+
+    Args:
+        baseline (dict): The results of the previous run.
+        current (dict): The results of this run.
+
+    Returns:
+        list: (name, baseline us, current us, current / baseline) for the benchmarks of both runs.
+    """
+    rows = []
+    for name, result in current["results"].items():
+        previous = baseline["results"].get(name)
+        if previous is not None:
+            rows.append((name, previous["min_us"], result["min_us"], result["min_us"] / previous["min_us"]))
+    return rows
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Micro-benchmarks of the frame decoding.")
+    parser.add_argument('--output', help="write the results to this JSON file")
+    parser.add_argument('--compare', help="compare with the results of a previous run (JSON file)")
+    parser.add_argument('--filter', default='', help="only the benchmarks whose name contains this text")
+    parser.add_argument('--number', type=int, default=2000, help="calls per round (default 2000)")
+    parser.add_argument('--repeat', type=int, default=7, help="number of rounds (default 7)")
+    parser.add_argument('--seed', type=int, default=0, help="seed of the generated fleet (default 0)")
+    args = parser.parse_args()
+
+    selected = {name: function for name, function in benchmarks(args.seed).items() if args.filter in name}
+    report = run(selected, args.number, args.repeat)
+    report["metadata"]["seed"] = args.seed
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(report, file, indent=4)
+        print(f"[BENCHMARKS] Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+        print(f"[BENCHMARKS] Compared with {args.compare} ({baseline['metadata']['date']}, "
+              f"Python {baseline['metadata']['python']}):")
+        for name, before, after, ratio in compare(baseline, report):
+            verdict = "slower" if ratio > 1 + THRESHOLD else "faster" if ratio < 1 - THRESHOLD else "same"
+            print(f"    {name:<45} {before:>10.3f} -> {after:>10.3f} us  x{ratio:.2f}  {verdict}")
@@ -0,0 +1,249 @@
+# ************************************** CAPTURE MODULE **************************************
+
+import mmap
+import os
+import struct
+import threading
+import time
+
+# Capture log: a header, then for every frame its receive time (nanoseconds since 1970), its length and its raw bytes.
+# The index file '<log>.idx' holds the offset of every record, so frames can be reached without scanning the log.
+MAGIC = b'LBCAP'
+VERSION = 1
+HEADER = struct.Struct('<5sB')
+RECORD = struct.Struct('<qI')
+INDEX = struct.Struct('<Q')
+
+
+class CaptureFormatError(Exception):
+    """
+    Exception raised when a capture log is not valid.
+    """
+
+    def __init__(self, message="Invalid capture log"):
+        """
+        Constructor for CaptureFormatError exception.
+
+        Args:
+            message (str, optional): Custom error message. Defaults to "Invalid capture log".
+        """
+        self.message = message
+        super().__init__(self.message)
+
+
+def index_path(path: str) -> str:
+    """
+    Returns the path of the index of a capture log.
+    """
+    return path + '.idx'
+
+
+class CaptureWriter:
+    """
+    Appends the raw frames received by the TCP modules, with their receive time, to a capture log and its index.
+    Writes are buffered and flushed every 'flush_interval' seconds by a background thread; the log can be replayed by 'capture.replay'.
+
+    Attributes:
+        path (str): The path of the capture log.
+        flush_interval (float): Max seconds between two flushes of the buffered records.
+        frames (int): Number of frames captured by this writer.
+        bytes (int): Number of frame bytes captured by this writer.
+    """
+
+    def __init__(self, path: str, flush_interval: float = 1):
+        """
+        Constructor for CaptureWriter class: opens the capture log and its index. An existing log is appended to,
+        after dropping a truncated last record and rebuilding its index.
+
+        Args:
+            path (str): The path of the capture log.
+            flush_interval (float, optional): Max seconds between two flushes of the buffered records. Default is 1.
+
+        Raises:
+            CaptureFormatError: If the file exists and is not a capture log.
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.path = path
+        self.flush_interval = flush_interval
+        self.frames = 0
+        self.bytes = 0
+        self.lock = threading.Lock()
+
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            reader = CaptureReader(path)
+            offsets = reader.offsets
+            end = reader.end
+            reader.close()
+
+            os.truncate(path, end)
+            with open(index_path(path), 'wb') as index:
+                index.write(struct.pack(f'<{len(offsets)}Q', *offsets))
+
+        self.log = open(path, 'ab')
+        if self.log.tell() == 0:
+            self.log.write(HEADER.pack(MAGIC, VERSION))
+        self.offset = self.log.tell()
+        self.index = open(index_path(path), 'ab')
+        self.closed = False
+
+        threading.Thread(target=self.flusher, name="capture-flusher", daemon=True).start()
+
+    def append(self, frame, timestamp: int = None):
+        """
+        Appends a frame to the log.
+
+        Args:
+            frame (bytes | memoryview): The raw Libellium frame.
+            timestamp (int, optional): Receive time in nanoseconds since 1970. Default is the current time.
+        """
+        if timestamp is None:
+            timestamp = time.time_ns()
+
+        with self.lock:
+            self.log.write(RECORD.pack(timestamp, len(frame)))
+            self.log.write(frame)
+            self.index.write(INDEX.pack(self.offset))
+            self.offset += RECORD.size + len(frame)
+            self.frames += 1
+            self.bytes += len(frame)
+
+    def flush(self):
+        """
+        Writes the buffered records to disk.
+        """
+        with self.lock:
+            self.log.flush()
+            self.index.flush()
+
+    def flusher(self):
+        """
+        Body of the flushing thread: flushes the buffered records every 'flush_interval' seconds until the writer is closed.
+        """
+        while True:
+            time.sleep(self.flush_interval)
+            with self.lock:
+                if self.closed:
+                    return
+                self.log.flush()
+                self.index.flush()
+
+    def stats(self) -> dict:
+        """
+        Returns the counters of the writer.
+        """
+        with self.lock:
+            return {"frames": self.frames, "bytes": self.bytes}
+
+    def close(self):
+        """
+        Flushes and closes the log and its index.
+        """
+        with self.lock:
+            self.closed = True
+            self.log.close()
+            self.index.close()
+
+
+class CaptureReader:
+    """
+    Memory-mapped, read-only view of a capture log. Records are located through the index; an index that is
+    missing or behind the log (e.g. after a crash) is rebuilt by scanning the log, and a truncated last record is ignored.
+
+    Attributes:
+        path (str): The path of the capture log.
+        offsets (list): The offset of every record.
+        end (int): The offset of the end of the last whole record.
+    """
+
+    def __init__(self, path: str):
+        """
+        Constructor for CaptureReader class: maps the log and loads its index.
+
+        Args:
+            path (str): The path of the capture log.
+
+        Raises:
+            CaptureFormatError: If the file is not a capture log.
+        """
+        self.path = path
+        with open(path, 'rb') as file:
+            size = os.fstat(file.fileno()).st_size
+            if size < HEADER.size:
+                raise CaptureFormatError(f"'{path}' is not a capture log.")
+            self.map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version = HEADER.unpack_from(self.map, 0)
+        if magic != MAGIC or version != VERSION:
+            self.map.close()
+            raise CaptureFormatError(f"'{path}' is not a capture log.")
+
+        self.offsets, self.end = self.load_index()
+
+    def complete(self, offset: int) -> bool:
+        """
+        Returns whether a whole record starts at the given offset.
+        """
+        if offset + RECORD.size > len(self.map):
+            return False
+        length = RECORD.unpack_from(self.map, offset)[1]
+        return offset + RECORD.size + length <= len(self.map)
+
+    def load_index(self) -> tuple:
+        """
+        Returns the offsets of the records (those of the index, then those found by scanning the rest of the log)
+        and the offset of the end of the last record.
+        """
+        offsets = []
+        try:
+            with open(index_path(self.path), 'rb') as file:
+                data = file.read()
+            count = len(data) // INDEX.size
+            offsets = list(struct.unpack_from(f'<{count}Q', data))
+        except FileNotFoundError:
+            pass
+
+        # Drop the entries beyond the end of the log, then scan what the index does not cover
+        while offsets and not self.complete(offsets[-1]):
+            offsets.pop()
+        if offsets:
+            offset = offsets[-1] + RECORD.size + RECORD.unpack_from(self.map, offsets[-1])[1]
+        else:
+            offset = HEADER.size
+        while self.complete(offset):
+            offsets.append(offset)
+            offset += RECORD.size + RECORD.unpack_from(self.map, offset)[1]
+        return offsets, offset
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def record(self, number: int) -> tuple:
+        """
+        Returns a record of the log.
+
+        Args:
+            number (int): The number of the record, from 0.
+
+        Returns:
+            tuple: The receive time in nanoseconds since 1970 and the frame (a memoryview of the mapped log).
+        """
+        offset = self.offsets[number]
+        timestamp, length = RECORD.unpack_from(self.map, offset)
+        start = offset + RECORD.size
+        return timestamp, memoryview(self.map)[start:start + length]
+
+    def __iter__(self):
+        for number in range(len(self.offsets)):
+            yield self.record(number)
+
+    def close(self):
+        """
+        Unmaps the log, unless frames returned by record are still referenced (it is then unmapped with them).
+        """
+        try:
+            self.map.close()
+        except BufferError:
+            pass
@@ -0,0 +1,178 @@
+# ************************************** REPLAY MODULE **************************************
+
+import argparse
+import json
+import socket
+import time
+import capture.capture as capture
+
+# Frames sent per write when replaying at maximum speed
+MAX_SPEED_CHUNK = 64
+
+
+def encode(frame, encoding: str) -> bytes:
+    """
+    Encodes a raw frame for the given ingest mode of the TCP module.
+
+    Args:
+        frame (bytes | memoryview): The raw Libellium frame.
+        encoding (str): 'hex' (hexadecimal text) or 'binary' (raw bytes).
+    """
+    if encoding == 'hex':
+        return bytes(frame).hex().upper().encode('ascii')
+    return bytes(frame)
+
+
+class Replayer:
+    """
+    Re-sends the frames of a capture log to a TCP module over one or more connections (frames are spread
+    round robin), preserving the gaps between their receive times divided by 'speed', or as fast as possible.
+    Connections that fail are reopened; the frames that could not be sent are counted as errors.
+
+    Attributes:
+        reader (capture.CaptureReader): The capture log.
+        host (str): The address of the TCP module.
+        port (int): The port of the TCP module.
+        speed (float): Replay speed: 1 for the captured rate, N for N times faster, 0 for maximum speed.
+        encoding (str): 'hex' or 'binary', as the ingest mode of the port.
+        connections (int): Number of connections.
+    """
+
+    def __init__(self, reader, host: str, port: int, speed: float = 1, encoding: str = 'hex', connections: int = 1):
+        """
+        Constructor for Replayer class.
+
+        Args:
+            reader (capture.CaptureReader): The capture log.
+            host (str): The address of the TCP module.
+            port (int): The port of the TCP module.
+            speed (float, optional): Replay speed (0 for maximum speed). Default is 1.
+            encoding (str, optional): 'hex' or 'binary'. Default is 'hex'.
+            connections (int, optional): Number of connections. Default is 1.
+        """
+        self.reader = reader
+        self.host = host
+        self.port = port
+        self.speed = speed
+        self.encoding = encoding
+        self.connections = connections
+        self.sockets = [None] * connections
+        self.sent = 0
+        self.bytes = 0
+        self.errors = 0
+        self.reconnects = 0
+        self.max_lag = 0.0
+
+    def send(self, number: int, data: bytes, frames: int = 1):
+        """
+        Sends data on a connection, (re)opening it if needed.
+
+        Args:
+            number (int): The number of the connection.
+            data (bytes): The encoded frames.
+            frames (int, optional): The number of frames in the data. Default is 1.
+        """
+        try:
+            if self.sockets[number] is None:
+                self.sockets[number] = socket.create_connection((self.host, self.port))
+                self.sockets[number].setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                self.reconnects += 1
+            self.sockets[number].sendall(data)
+            self.sent += frames
+            self.bytes += len(data)
+        except OSError:
+            self.errors += frames
+            if self.sockets[number] is not None:
+                self.sockets[number].close()
+                self.sockets[number] = None
+
+    def run(self, limit: int = None) -> dict:
+        """
+        Replays the log.
+
+        Args:
+            limit (int, optional): Max number of frames to replay. Default is None (all).
+
+        Returns:
+            dict: The report (see report).
+        """
+        count = len(self.reader) if limit is None else min(limit, len(self.reader))
+        start = time.monotonic()
+
+        if self.speed <= 0:
+            # Maximum speed: frames are written in chunks, round robin over the connections
+            for first in range(0, count, MAX_SPEED_CHUNK):
+                last = min(first + MAX_SPEED_CHUNK, count)
+                data = b''.join(encode(self.reader.record(n)[1], self.encoding) for n in range(first, last))
+                self.send((first // MAX_SPEED_CHUNK) % self.connections, data, last - first)
+        else:
+            origin = None
+            for n in range(count):
+                timestamp, frame = self.reader.record(n)
+                if origin is None:
+                    origin = timestamp
+
+                due = start + (timestamp - origin) / 1e9 / self.speed
+                delay = due - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                else:
+                    self.max_lag = max(self.max_lag, -delay)
+                self.send(n % self.connections, encode(frame, self.encoding))
+
+        elapsed = time.monotonic() - start
+        for sock in self.sockets:
+            if sock is not None:
+                sock.close()
+        return self.report(count, elapsed)
+
+    def report(self, count: int, elapsed: float) -> dict:
+        """
+        Returns the report of a replay: frames, bytes, errors, elapsed seconds, achieved throughput and,
+        for timed replays, the max lag behind the schedule in seconds.
+
+        Args:
+            count (int): Number of frames replayed.
+            elapsed (float): Duration of the replay, in seconds.
+        """
+        first = self.reader.record(0)[0] if count else 0
+        last = self.reader.record(count - 1)[0] if count else 0
+        return {
+            "frames": count,
+            "sent": self.sent,
+            "errors": self.errors,
+            "connections_opened": self.reconnects,
+            "bytes": self.bytes,
+            "captured_seconds": round((last - first) / 1e9, 3),
+            "elapsed_seconds": round(elapsed, 3),
+            "frames_per_second": round(self.sent / elapsed, 1) if elapsed > 0 else None,
+            "megabytes_per_second": round(self.bytes / elapsed / 1e6, 3) if elapsed > 0 else None,
+            "max_lag_seconds": round(self.max_lag, 3)
+        }
+
+
+def parse_speed(text: str) -> float:
+    """
+    Parses a replay speed: '1x' or '1' (captured rate), 'Nx' or 'N' (N times faster), 'max' (as fast as possible).
+    """
+    if text == 'max':
+        return 0
+    return float(text.rstrip('x'))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Replays a capture log to a TCP module.")
+    parser.add_argument('log', help="path of the capture log")
+    parser.add_argument('--host', default='127.0.0.1', help="address of the TCP module (default 127.0.0.1)")
+    parser.add_argument('--port', type=int, default=8080, help="port of the TCP module (default 8080)")
+    parser.add_argument('--speed', type=parse_speed, default=1, help="'1x', 'Nx' or 'max' (default 1x)")
+    parser.add_argument('--encoding', choices=('hex', 'binary'), default='hex', help="ingest mode of the port (default hex)")
+    parser.add_argument('--connections', type=int, default=1, help="number of connections (default 1)")
+    parser.add_argument('--limit', type=int, default=None, help="max number of frames to replay")
+    args = parser.parse_args()
+
+    reader = capture.CaptureReader(args.log)
+    print(f"[REPLAY] {len(reader)} frames to <{args.host}, {args.port}> ({args.encoding}, "
+          f"{'max speed' if args.speed <= 0 else f'{args.speed:g}x'}, {args.connections} connections)")
+    report = Replayer(reader, args.host, args.port, args.speed, args.encoding, args.connections).run(args.limit)
+    print(json.dumps(report, indent=4))
@@ -1,28 +1,419 @@
-# import mqttx.py
-from ..mqttx.mqttx import *
-from  edge.config import *
+# ************************************** CLOUD SENDER MODULE **************************************
+
+import threading
+import time
+import traceback
 import requests
-import json
-
-mqtt_client = Client(BROKER_IP_ADDRESS, TOPIC_MEASUREMENTS)
-# Convertire i dati JSON in una stringa
-json_data = json.dumps(data_to_send)
-
-# Definire l'URL di destinazione
-url = "http://127.0.0.1/display_json"  # Sostituisci con l'URL effettivo
-
-# Impostare le intestazioni HTTP (opzionale)
-headers = {
-    "Content-Type": "application/json",
-    "Authorization": "Bearer YourAccessToken"  # Aggiungi l'autorizzazione se necessario
-}
-
-# Effettuare la richiesta HTTP POST con i dati JSON nel corpo
-response = requests.post(url, data=json_data, headers=headers)
-
-# Verificare la risposta
-if response.status_code == 200:
-    print("Richiesta inviata con successo.")
-else:
-    print("Errore nella richiesta:", response.status_code)
-    print(response.text)  # Puoi stampare la risposta per ottenere ulteriori dettagli sull'errore, se presente
\ No newline at end of file
+from requests.adapters import HTTPAdapter
+import wire.wire as wire
+import metrics.metrics as metrics
+import logs.logs as logs
+
+UPLOADER = logs.get_logger('uploader')
+
+# Client errors worth retrying (timeout, rate limit): the other 4xx reject a batch for good
+TRANSIENT_STATUS_CODES = (408, 429)
+
+
+def is_permanent(status_code: int) -> bool:
+    """
+    Returns whether an HTTP status rejects a request for good, so that sending it again cannot succeed.
+
+    Args:
+        status_code (int): The status code of the response.
+    """
+    return 400 <= status_code < 500 and status_code not in TRANSIENT_STATUS_CODES
+
+
+def rejected_positions(response, size: int) -> list:
+    """
+    Returns the positions of the records listed as rejected by a successful response of the bulk endpoint:
+    {"created": n, "rejected": [{"index": i, "error": "..."}]}.
+
+    Args:
+        response (requests.Response): The response of the bulk endpoint.
+        size (int): Number of records of the batch.
+    """
+    try:
+        rejected = response.json().get("rejected", [])
+        positions = {entry["index"] for entry in rejected}
+    except (ValueError, AttributeError, KeyError, TypeError):
+        return []
+    return sorted(p for p in positions if isinstance(p, int) and 0 <= p < size)
+
+
+class CloudSender:
+    """
+    Sends measurements to the cloud backend over a pooled keep-alive HTTP session,
+    so that each upload is a single request on an already open connection.
+    The session is shared by all the threads of the process.
+
+    Attributes:
+        url (str): The URL of the cloud ingestion endpoint.
+        timeout (tuple): The (connect, read) timeouts of a request, in seconds.
+        session (requests.Session): The keep-alive session with its connection pool.
+    """
+
+    def __init__(self, url: str, pool_size: int = 10, connect_timeout: float = 3, read_timeout: float = 10, retries: int = 2):
+        """
+        Constructor for CloudSender class.
+
+        Args:
+            url (str): The URL of the cloud ingestion endpoint.
+            pool_size (int, optional): Max number of open connections kept in the pool. Default is 10.
+            connect_timeout (float, optional): Seconds to wait for a connection. Default is 3.
+            read_timeout (float, optional): Seconds to wait for a response. Default is 10.
+            retries (int, optional): Number of retries of a failed connection. Default is 2.
+        """
+        self.url = url
+        self.timeout = (connect_timeout, read_timeout)
+
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retries, pool_block=True)
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update({"Content-Type": "application/json"})
+
+        self.lock = threading.Lock()
+        self.sent = 0
+        self.failed = 0
+
+    def send(self, data, headers: dict = None, url: str = None) -> requests.Response:
+        """
+        Posts data to the cloud backend.
+
+        Args:
+            data (str | bytes): The body of the request.
+            headers (dict, optional): Headers added to the session's ones. Default is None.
+            url (str, optional): The URL to post to. Default is the sender's URL.
+
+        Returns:
+            requests.Response: The response of the cloud backend.
+
+        Raises:
+            requests.RequestException: If the request could not be completed.
+        """
+        start = time.perf_counter()
+        try:
+            response = self.session.post(url or self.url, data=data, headers=headers, timeout=self.timeout)
+        except requests.RequestException:
+            metrics.HTTP_REQUESTS.inc("error")
+            with self.lock:
+                self.failed += 1
+            raise
+
+        metrics.HTTP_UPLOAD_SECONDS.since(start)
+        metrics.HTTP_REQUESTS.inc("ok" if response.status_code == 200 else "rejected")
+        with self.lock:
+            if response.status_code == 200:
+                self.sent += 1
+            else:
+                self.failed += 1
+        return response
+
+    def stats(self) -> dict:
+        """
+        Returns the counters of the sender.
+        """
+        with self.lock:
+            return {"sent": self.sent, "failed": self.failed}
+
+    def close(self):
+        """
+        Closes all the pooled connections.
+        """
+        self.session.close()
+
+
+class BatchUploader:
+    """
+    Combines the measurements to upload into batches, sent to the cloud's bulk endpoint as a JSON array.
+    A batch is flushed as soon as it holds 'batch_size' records or its oldest record has waited 'linger_ms',
+    whichever comes first, so that latency stays bounded while each request carries many records.
+
+    With an outbox, every record is persisted before its upload and removed once acknowledged: records whose
+    upload failed stay on disk and are replayed in large batches, at a limited rate, as soon as the cloud answers again.
+    Only connection errors and server errors (5xx) are retried: records the cloud rejects as invalid (4xx, or listed
+    as rejected in a successful response) are moved to the outbox's dead-letter table, so they never block the backlog.
+
+    Attributes:
+        sender (CloudSender): The pooled HTTP session the batches are posted with.
+        url (str): The URL of the cloud bulk ingestion endpoint.
+        batch_size (int): Max number of records in a batch.
+        linger (float): Max seconds a record waits before its batch is flushed.
+        outbox (outbox.Outbox): The durable queue of the records to upload. Default is None (records are lost on failure).
+        replay_batch_size (int): Max number of records in a replayed batch.
+        replay_rate (float): Max number of records replayed per second (0 for no limit).
+        retry_max (float): Max seconds between two attempts to reach the cloud while it is down.
+        codec (wire.Codec): Serializes the batches, as JSON arrays or compact messages.
+        batch (list): The (id, record) pairs of the batch being filled.
+        online (bool): Whether the last upload succeeded.
+        batches (int): Number of batches flushed.
+        records (int): Number of records uploaded.
+        replayed (int): Number of records uploaded by the replay.
+        failed (int): Number of records whose upload failed.
+        rejected (int): Number of records rejected for good by the cloud.
+    """
+
+    def __init__(self, sender: CloudSender, url: str, batch_size: int = 100, linger_ms: float = 200, outbox=None,
+                 replay_batch_size: int = 1000, replay_rate: float = 1000, retry_max: float = 60, codec=None):
+        """
+        Constructor for BatchUploader class.
+
+        Args:
+            sender (CloudSender): The pooled HTTP session the batches are posted with.
+            url (str): The URL of the cloud bulk ingestion endpoint.
+            batch_size (int, optional): Max number of records in a batch. Default is 100.
+            linger_ms (float, optional): Max milliseconds a record waits before its batch is flushed. Default is 200.
+            outbox (outbox.Outbox, optional): The durable queue of the records to upload. Default is None.
+            replay_batch_size (int, optional): Max number of records in a replayed batch. Default is 1000.
+            replay_rate (float, optional): Max number of records replayed per second (0 for no limit). Default is 1000.
+            retry_max (float, optional): Max seconds between two attempts to reach the cloud while it is down. Default is 60.
+            codec (wire.Codec, optional): Serializes the batches. Default is JSON arrays.
+        """
+        self.sender = sender
+        self.url = url
+        self.batch_size = batch_size
+        self.linger = linger_ms / 1000
+        self.outbox = outbox
+        self.replay_batch_size = replay_batch_size
+        self.replay_rate = replay_rate
+        self.retry_max = retry_max
+        self.codec = codec if codec is not None else wire.Codec('json')
+
+        self.batch = []
+        self.deadline = None
+        self.inflight = None
+        self.online = True
+        self.condition = threading.Condition()
+        self.batches = 0
+        self.records = 0
+        self.replayed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.started = False
+
+    def start(self):
+        """
+        Starts the flushing thread and, with an outbox, the replay thread (only once).
+        """
+        with self.condition:
+            if self.started:
+                return
+            self.started = True
+
+        threading.Thread(target=self.worker, name="uploader", daemon=True).start()
+        if self.outbox is not None:
+            threading.Thread(target=self.replay, name="uploader-replay", daemon=True).start()
+
+    def add(self, record: str):
+        """
+        Appends a record to the current batch, after persisting it in the outbox (if any).
+
+        Args:
+            record (str | bytes): The record, already serialized by the codec.
+        """
+        with self.condition:
+            rowid = self.outbox.append(record) if self.outbox is not None else None
+
+            if not self.batch:
+                self.deadline = time.monotonic() + self.linger
+            self.batch.append((rowid, record))
+            if len(self.batch) >= self.batch_size:
+                self.condition.notify_all()
+
+    def take(self) -> list:
+        """
+        Waits until the current batch is full or has lingered long enough, then takes it.
+
+        Returns:
+            list: The (id, record) pairs of the batch.
+        """
+        with self.condition:
+            while True:
+                if len(self.batch) >= self.batch_size:
+                    break
+                if self.batch:
+                    remaining = self.deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self.condition.wait(remaining)
+                else:
+                    self.condition.wait()
+
+            batch = self.batch[:self.batch_size]
+            del self.batch[:self.batch_size]
+            self.deadline = time.monotonic() + self.linger if self.batch else None
+            self.inflight = batch[0][0]
+            return batch
+
+    def live_floor(self):
+        """
+        Returns the id of the oldest record still handled by the live path (in flight or waiting in the batch),
+        or None if there is none: records older than it are left to the replay (the condition must be held).
+        """
+        if self.inflight is not None:
+            return self.inflight
+        if self.batch:
+            return self.batch[0][0]
+        return None
+
+    def post(self, batch: list) -> bool:
+        """
+        Uploads a batch as a single JSON array (or compact message) and settles its records in the outbox:
+        the accepted ones are acknowledged, the ones rejected for good are dead-lettered. After a connection error
+        or a server error (5xx), the records stay in the outbox to be sent again.
+
+        Args:
+            batch (list): The (id, record) pairs of the batch.
+
+        Returns:
+            bool: Whether the batch is settled (accepted, or rejected for good); False if it must be sent again.
+        """
+        body, headers = self.codec.batch([record for _, record in batch])
+        rejected = []
+        reason = None
+        try:
+            response = self.sender.send(body, headers, self.url)
+            reachable = True
+            if response.status_code == 200:
+                # The cloud saves the valid records of a batch and lists the positions of the others
+                settled = True
+                rejected = rejected_positions(response, len(batch))
+                reason = "rejected by the cloud"
+            elif is_permanent(response.status_code):
+                settled = True
+                rejected = list(range(len(batch)))
+                reason = f"{response.status_code} {response.text[:200]}"
+            else:
+                # Server error: the replay backs off as if the cloud were down
+                reachable = settled = False
+                UPLOADER.warning("Batch of %d records not accepted: %s", len(batch), response.status_code)
+        except requests.RequestException as e:
+            UPLOADER.warning("Batch of %d records not sent: %s", len(batch), e)
+            reachable = settled = False
+
+        if settled:
+            metrics.UPLOADED_RECORDS.inc(amount=len(batch) - len(rejected))
+            if rejected:
+                UPLOADER.warning("%d of %d records rejected for good: %s", len(rejected), len(batch), reason)
+            if self.outbox is not None:
+                positions = set(rejected)
+                self.outbox.reject([batch[position][0] for position in rejected], reason)
+                self.outbox.ack([rowid for position, (rowid, _) in enumerate(batch) if position not in positions])
+
+        with self.condition:
+            self.batches += 1
+            if settled:
+                self.records += len(batch) - len(rejected)
+                self.rejected += len(rejected)
+            else:
+                self.failed += len(batch)
+            if reachable != self.online:
+                self.online = reachable
+                if reachable:
+                    UPLOADER.info("Cloud reachable again.")
+                else:
+                    UPLOADER.warning("Cloud unreachable.")
+                self.condition.notify_all()
+        return settled
+
+    def flush(self, batch: list) -> bool:
+        """
+        Uploads a batch of the live path; if it fails, its records stay in the outbox for the replay.
+
+        Args:
+            batch (list): The (id, record) pairs of the batch.
+
+        Returns:
+            bool: Whether the batch is settled.
+        """
+        try:
+            return self.post(batch)
+        finally:
+            with self.condition:
+                self.inflight = None
+                self.condition.notify_all()
+
+    def worker(self):
+        """
+        Body of the flushing thread: uploads batches forever. An unexpected error (e.g. of the codec) is logged
+        and the thread goes on; with an outbox, the records of the failed batch are left to the replay.
+        """
+        while True:
+            try:
+                self.flush(self.take())
+            except Exception:
+                UPLOADER.error("Batch not uploaded: %s", traceback.format_exc())
+
+    def replay(self):
+        """
+        Body of the replay thread: uploads the backlog of the outbox (records left by failed uploads or by a
+        previous run) in large batches, oldest first, without exceeding the replay rate.
+        While the cloud is down, or after an unexpected error, it retries with an exponential backoff,
+        up to 'retry_max' seconds.
+        """
+        delay = 1
+        while True:
+            try:
+                delay = self.replay_once(delay)
+            except Exception:
+                UPLOADER.error("Backlog not replayed: %s", traceback.format_exc())
+                time.sleep(delay)
+                delay = min(delay * 2, self.retry_max)
+
+    def replay_once(self, delay: float) -> float:
+        """
+        One round of the replay: uploads the oldest batch of the backlog, if there is one.
+
+        Args:
+            delay (float): Seconds to wait before probing the cloud, if it is down.
+
+        Returns:
+            float: The delay of the next round.
+        """
+        # Read while 'add' cannot append: a record appended after the floor was taken would be replayed and sent live
+        with self.condition:
+            batch = self.outbox.read(self.replay_batch_size, self.live_floor())
+
+        if not batch:
+            # Nothing to replay: wait for the next failure of the live path
+            with self.condition:
+                self.condition.wait(1)
+            return delay
+
+        with self.condition:
+            online = self.online
+        if not online:
+            # Probe the cloud even without live traffic
+            time.sleep(delay)
+            delay = min(delay * 2, self.retry_max)
+
+        start = time.monotonic()
+        if not self.post(batch):
+            return delay
+
+        with self.condition:
+            self.replayed += len(batch)
+
+        if self.replay_rate > 0:
+            # Rate limit, so that the backlog does not swamp the live traffic
+            time.sleep(max(0, len(batch) / self.replay_rate - (time.monotonic() - start)))
+        return 1
+
+    def stats(self) -> dict:
+        """
+        Returns the counters of the uploader, the number of records waiting in the current batch and the outbox's counters.
+        """
+        with self.condition:
+            stats = {
+                "pending": len(self.batch),
+                "batches": self.batches,
+                "records": self.records,
+                "replayed": self.replayed,
+                "failed": self.failed,
+                "rejected": self.rejected
+            }
+        if self.outbox is not None:
+            stats["outbox"] = self.outbox.stats()
+        return stats
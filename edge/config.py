@@ -7,6 +7,38 @@ IP_ADDRESS = os.environ.get('SERVER_IP_ADDRESS', '0.0.0.0')
 PORT_NUMBER = os.environ.get('SERVER_PORT_NUMBER', '8080')
 BUFFER_SIZE = os.environ.get('SERVER_BUFFER_SIZE', '1024')
 
+# SET THE ENCODING OF THE RECEIVED FRAMES: 'hex' (hexadecimal text), 'binary' (raw bytes) OR 'auto' (detected per connection)
+INGEST_MODE = os.environ.get('SERVER_INGEST_MODE', 'hex')
+
+# SET AN OPTIONAL SECOND PORT FOR GATEWAYS SENDING RAW BINARY FRAMES (EMPTY TO DISABLE)
+BINARY_PORT_NUMBER = os.environ.get('SERVER_BINARY_PORT_NUMBER', '')
+
+# SET THE SERVER MODE: 'thread' (ONE THREAD PER CONNECTION) OR 'asyncio' (ONE EVENT LOOP FOR ALL CONNECTIONS)
+SERVER_MODE = os.environ.get('SERVER_MODE', 'thread')
+
+# SET THE MAX NUMBER OF PENDING CONNECTIONS AND THE IDLE TIMEOUT OF A CONNECTION IN SECONDS (EMPTY TO DISABLE)
+BACKLOG = os.environ.get('SERVER_BACKLOG', '128')
+IDLE_TIMEOUT = os.environ.get('SERVER_IDLE_TIMEOUT', '300')
+
+# SET THE NUMBER OF THREADS OF THE DECODE AND PUBLISH STAGES, AND THE CAPACITY OF THE QUEUE IN FRONT OF EACH STAGE
+DECODE_WORKERS = os.environ.get('SERVER_DECODE_WORKERS', '4')
+PUBLISH_WORKERS = os.environ.get('SERVER_PUBLISH_WORKERS', '2')
+QUEUE_SIZE = os.environ.get('SERVER_QUEUE_SIZE', '1024')
+
+# SET THE NUMBER OF WORKER PROCESSES STARTED BY THE LAUNCHER (SHARING THE PORTS THROUGH SO_REUSEPORT)
+WORKERS = os.environ.get('SERVER_WORKERS', str(os.cpu_count() or 1))
+
+# SET THE INTERVAL IN SECONDS BETWEEN TWO REPORTS OF THE WORKERS' STATISTICS
+STATS_INTERVAL = os.environ.get('SERVER_STATS_INTERVAL', '10')
+
+# SET THE NUMBER OF DECODER PROCESSES PER WORKER (0 TO DECODE IN THE WORKER ITSELF), FED THROUGH A SHARED MEMORY RING BUFFER
+RING_DECODERS = os.environ.get('RING_DECODERS', '0')
+
+# SET THE NUMBER OF SLOTS OF THE RING BUFFER, THE MAX SIZE OF A FRAME AND THE OVERFLOW POLICY ('block' OR 'drop-oldest')
+RING_SLOTS = os.environ.get('RING_SLOTS', '4096')
+RING_SLOT_SIZE = os.environ.get('RING_SLOT_SIZE', '512')
+RING_POLICY = os.environ.get('RING_POLICY', 'block')
+
 # SET ROOM NAME
 ROOM = os.environ.get('ROOM_NAME', 'DTLab')
 
@@ -14,10 +46,88 @@ ROOM = os.environ.get('ROOM_NAME', 'DTLab')
 BROKER_IP_ADDRESS = os.environ.get('BROKER_IP_ADDRESS', '127.0.0.1')
 BROKER_PORT_NUMBER = os.environ.get('BROKER_PORT_NUMBER', '1883')
 
+# SET THE MQTT CONNECTION: KEEPALIVE AND DELAYS BETWEEN RECONNECTION ATTEMPTS, IN SECONDS
+MQTT_KEEPALIVE = os.environ.get('MQTT_KEEPALIVE', '60')
+MQTT_RECONNECT_MIN_DELAY = os.environ.get('MQTT_RECONNECT_MIN_DELAY', '1')
+MQTT_RECONNECT_MAX_DELAY = os.environ.get('MQTT_RECONNECT_MAX_DELAY', '60')
+
 CLOUD_IP_ADDRESS = os.environ.get('CLOUD_IP_ADDRESS', '127.0.0.1')
+CLOUD_PORT_NUMBER = os.environ.get('CLOUD_PORT_NUMBER', '8000')
+CLOUD_URL = f"http://{CLOUD_IP_ADDRESS}:{CLOUD_PORT_NUMBER}/display_json/"
+CLOUD_BULK_URL = f"http://{CLOUD_IP_ADDRESS}:{CLOUD_PORT_NUMBER}/display_json/bulk/"
+
+# SET THE BATCHES UPLOADED TO THE CLOUD: MAX RECORDS PER BATCH (1 TO UPLOAD EACH RECORD ALONE) AND MAX WAIT IN MILLISECONDS
+UPLOAD_BATCH_SIZE = os.environ.get('UPLOAD_BATCH_SIZE', '1')
+UPLOAD_LINGER_MS = os.environ.get('UPLOAD_LINGER_MS', '500')
+
+# SET THE REPORTING FILTER ('on' OR 'off'), THE DEFAULT HEARTBEAT IN SECONDS AND THE DEADBANDS OVERRIDING 'sensor.json',
+# WRITTEN AS 'ascii_id:band[%][@heartbeat]' SEPARATED BY COMMAS, E.G. 'TC:0.2,HUM:1%,PRES:10@600'
+REPORT_FILTER = os.environ.get('REPORT_FILTER', 'off')
+REPORT_HEARTBEAT = os.environ.get('REPORT_HEARTBEAT', '300')
+DEADBANDS = os.environ.get('DEADBANDS', '')
+
+# SET THE FORMAT OF THE PUBLISHED AND UPLOADED RECORDS ('json' OR 'compact') AND THE COMPRESSION OF THE BATCHES ('none', 'zlib' OR 'zstd')
+WIRE_FORMAT = os.environ.get('WIRE_FORMAT', 'json')
+WIRE_COMPRESSION = os.environ.get('WIRE_COMPRESSION', 'none')
+
+# SET THE LOG LEVEL ('DEBUG', 'INFO', 'WARNING' OR 'ERROR'), THE SAMPLING OF THE HOT PATH'S MESSAGES, WRITTEN AS 'class:N'
+# SEPARATED BY COMMAS (ONE MESSAGE OUT OF N IS LOGGED), AND THE MAX NUMBER OF MESSAGES WAITING FOR THE OUTPUT (THE OTHERS ARE DROPPED)
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
+LOG_SAMPLING = os.environ.get('LOG_SAMPLING', 'frames:1000,records:1000,publish:100,stages:100')
+LOG_QUEUE_SIZE = os.environ.get('LOG_QUEUE_SIZE', '10000')
+
+# SET THE METRICS ('on' OR 'off'), THE ADDRESS OF THEIR PROMETHEUS ENDPOINT (EMPTY PORT TO DISABLE IT) AND THE MAX SERIES PER METRIC
+METRICS = os.environ.get('METRICS', 'on')
+METRICS_IP_ADDRESS = os.environ.get('METRICS_IP_ADDRESS', '127.0.0.1')
+METRICS_PORT_NUMBER = os.environ.get('METRICS_PORT_NUMBER', '9100')
+METRICS_MAX_SERIES = os.environ.get('METRICS_MAX_SERIES', '1024')
+
+# SET THE TRACE LOG: DIRECTORY, FRACTION OF THE FRAMES WHOSE SPANS ARE LOGGED (0 TO DISABLE IT) AND SIZE IN BYTES AT WHICH IT IS ROTATED
+TRACE_DIR = os.environ.get('TRACE_DIR', '/home/traces')
+TRACE_SAMPLE_RATE = os.environ.get('TRACE_SAMPLE_RATE', '0')
+TRACE_MAX_BYTES = os.environ.get('TRACE_MAX_BYTES', str(64 * 1024 * 1024))
+
+# SET THE ADMISSION CONTROL OF THE ROUTINE (INFORMATION, TIMEOUT...) FRAMES: FRAMES PER SECOND AND BURST ALLOWED PER NODE
+# (0 TO DISABLE IT) AND MAX NUMBER OF NODES TRACKED. ALARM AND EVENT FRAMES ARE ALWAYS ADMITTED AND OVERTAKE ROUTINE FRAMES
+ADMISSION_RATE = os.environ.get('ADMISSION_RATE', '0')
+ADMISSION_BURST = os.environ.get('ADMISSION_BURST', '50')
+ADMISSION_MAX_NODES = os.environ.get('ADMISSION_MAX_NODES', '65536')
+
+# SET THE FLEET STATE: MAX NUMBER OF NODES TRACKED (0 TO DISABLE IT), SECONDS DURING WHICH A REPEATED SEQUENCE NUMBER IS A RETRANSMISSION,
+# AND THE SECONDS WITHOUT FRAMES AND THE BATTERY LEVEL BELOW WHICH A NODE IS REPORTED AS UNHEALTHY
+# (WITH DECODER PROCESSES, EACH WORKER TRACKS ITS NODES FROM THE FRAME HEADERS, WITHOUT THEIR BATTERY LEVEL)
+FLEET_MAX_NODES = os.environ.get('FLEET_MAX_NODES', '65536')
+FLEET_DUPLICATE_WINDOW = os.environ.get('FLEET_DUPLICATE_WINDOW', '60')
+FLEET_STALE_AFTER = os.environ.get('FLEET_STALE_AFTER', '3600')
+FLEET_LOW_BATTERY = os.environ.get('FLEET_LOW_BATTERY', '20')
+
+# SET THE DIRECTORY WHERE THE RECEIVED FRAMES ARE CAPTURED FOR REPLAY (EMPTY TO DISABLE THE CAPTURE)
+CAPTURE_DIR = os.environ.get('CAPTURE_DIR', '')
+
+# SET THE JSON FILE OF THE AES KEYS OF THE NODES, USED TO DECRYPT THE ENCRYPTED FRAMES (EMPTY TO DISABLE THE DECRYPTION)
+AES_KEYS_FILE = os.environ.get('AES_KEYS_FILE', '')
+
+# SET THE DURABLE OUTBOX OF THE RECORDS TO UPLOAD: DIRECTORY (EMPTY TO DISABLE IT) AND DISK BUDGET IN BYTES
+OUTBOX_DIR = os.environ.get('OUTBOX_DIR', '')
+OUTBOX_MAX_BYTES = os.environ.get('OUTBOX_MAX_BYTES', str(256 * 1024 * 1024))
+
+# SET THE REPLAY OF THE OUTBOX: RECORDS PER BATCH, MAX RECORDS PER SECOND AND MAX SECONDS BETWEEN TWO RETRIES
+REPLAY_BATCH_SIZE = os.environ.get('REPLAY_BATCH_SIZE', '1000')
+REPLAY_RATE = os.environ.get('REPLAY_RATE', '1000')
+REPLAY_RETRY_MAX = os.environ.get('REPLAY_RETRY_MAX', '60')
+
+# SET THE HTTP CONNECTION POOL: MAX OPEN CONNECTIONS, TIMEOUTS IN SECONDS AND RETRIES OF A FAILED CONNECTION
+HTTP_POOL_SIZE = os.environ.get('HTTP_POOL_SIZE', '10')
+HTTP_CONNECT_TIMEOUT = os.environ.get('HTTP_CONNECT_TIMEOUT', '3')
+HTTP_READ_TIMEOUT = os.environ.get('HTTP_READ_TIMEOUT', '10')
+HTTP_RETRIES = os.environ.get('HTTP_RETRIES', '2')
 
 # SET THE TOPIC WHERE MEASUREMENTS WILL BE PUBLISHED
 TOPIC_MEASUREMENTS  = f"{ROOM}/measurements"
 
 # SET THE TOPIC WHERE COMMANDS FOR THE ACTUATORS WILL BE PUBLISHED
-TOPIC_COMMANDS = f"{ROOM}/commands"
\ No newline at end of file
+TOPIC_COMMANDS = f"{ROOM}/commands"
+
+# SET HOW MEASUREMENTS ARE PUBLISHED: 'record' (ONE RECORD OF EVERY SENSOR ON TOPIC_MEASUREMENTS), 'sensor' (ONE RETAINED
+# MESSAGE PER SENSOR ON TOPIC_MEASUREMENTS/ascii_id, SO THAT NEW SUBSCRIBERS GET THE LAST VALUES AT ONCE) OR 'both'
+MQTT_TOPIC_MODE = os.environ.get('MQTT_TOPIC_MODE', 'record')
@@ -0,0 +1,241 @@
+# ************************************** FLEET MODULE **************************************
+
+import array
+import threading
+import time
+from collections import OrderedDict
+
+# Frame sequence numbers are one byte and wrap around
+SEQUENCE_MODULO = 256
+# A sequence number at most this far behind the last one is a late (reordered or retransmitted) frame
+LATE_WINDOW = SEQUENCE_MODULO // 2
+
+# Outcomes of FleetTable.observe
+NEW, DUPLICATE, LATE = 'new', 'duplicate', 'late'
+
+NO_BATTERY = -1.0
+
+
+class FleetTable:
+    """
+    Compact, bounded state of the fleet of Waspmotes: for every node (identified by its serial ID),
+    the last frame sequence number, the last time it was seen, its last battery level and its frame,
+    duplicate and gap counters. The state lives in fixed-size arrays allocated once, so memory does not
+    grow with the traffic: when the table is full, the node not seen for the longest time is evicted.
+
+    A frame with the same sequence number as the last one, received within the duplicate window,
+    is a retransmission and should be dropped. A jump forward counts the skipped numbers as gaps;
+    a frame slightly behind the last one is late (e.g. reordered by parallel decoders) and fills a gap.
+
+    Attributes:
+        capacity (int): Max number of nodes tracked.
+        duplicate_window (float): Seconds during which a repeated sequence number is a retransmission.
+        evicted (int): Number of nodes evicted because the table was full.
+    """
+
+    def __init__(self, capacity: int = 65536, duplicate_window: float = 60):
+        """
+        Constructor for FleetTable class.
+
+        Args:
+            capacity (int, optional): Max number of nodes tracked. Default is 65536.
+            duplicate_window (float, optional): Seconds during which a repeated sequence number is a retransmission. Default is 60.
+        """
+        self.capacity = capacity
+        self.duplicate_window = duplicate_window
+        self.evicted = 0
+        self.lock = threading.Lock()
+
+        # {serial_id: slot}, least recently seen first
+        self.slots = OrderedDict()
+        self.free = list(range(capacity - 1, -1, -1))
+
+        self.waspmote_ids = [None] * capacity
+        self.sequences = array.array('h', [-1]) * capacity
+        self.last_seen = array.array('d', [0.0]) * capacity
+        self.batteries = array.array('f', [NO_BATTERY]) * capacity
+        self.frames = array.array('L', [0]) * capacity
+        self.duplicates = array.array('L', [0]) * capacity
+        self.gaps = array.array('L', [0]) * capacity
+
+    def slot(self, serial_id: int, waspmote_id: str) -> int:
+        """
+        Returns the slot of a node, allocating one (and evicting the least recently seen node if needed)
+        for a new node. The lock must be held.
+
+        Args:
+            serial_id (int): The serial ID of the node.
+            waspmote_id (str): The Waspmote ID of the node.
+        """
+        slot = self.slots.get(serial_id)
+        if slot is not None:
+            self.slots.move_to_end(serial_id)
+            self.waspmote_ids[slot] = waspmote_id
+            return slot
+
+        if self.free:
+            slot = self.free.pop()
+        else:
+            _, slot = self.slots.popitem(last=False)
+            self.evicted += 1
+
+        self.slots[serial_id] = slot
+        self.waspmote_ids[slot] = waspmote_id
+        self.sequences[slot] = -1
+        self.batteries[slot] = NO_BATTERY
+        self.frames[slot] = 0
+        self.duplicates[slot] = 0
+        self.gaps[slot] = 0
+        return slot
+
+    def observe(self, serial_id: int, waspmote_id: str, sequence: int, battery=None, now: float = None) -> str:
+        """
+        Updates the state of a node with a received frame.
+
+        Args:
+            serial_id (int): The serial ID of the node.
+            waspmote_id (str): The Waspmote ID of the node.
+            sequence (int): The frame sequence number.
+            battery (float, optional): The battery level carried by the frame. Default is None (none).
+            now (float, optional): Wall clock time of the frame, in seconds since 1970. Default is the current time.
+
+        Returns:
+            str: NEW for a new frame, DUPLICATE for a retransmission (to drop) or LATE for a late frame.
+        """
+        if now is None:
+            now = time.time()
+
+        with self.lock:
+            slot = self.slot(serial_id, waspmote_id)
+            last = self.sequences[slot]
+            recent = now - self.last_seen[slot] < self.duplicate_window
+            self.last_seen[slot] = now
+
+            if last >= 0 and recent:
+                distance = (sequence - last) % SEQUENCE_MODULO
+                if distance == 0:
+                    self.duplicates[slot] += 1
+                    return DUPLICATE
+                if distance > SEQUENCE_MODULO - LATE_WINDOW:
+                    # Behind the last one: it fills one of the gaps counted when the sequence jumped
+                    if self.gaps[slot]:
+                        self.gaps[slot] -= 1
+                    self.frames[slot] += 1
+                    if battery is not None:
+                        self.batteries[slot] = battery
+                    return LATE
+                self.gaps[slot] += distance - 1
+
+            # First frame, or first frame after a long silence (the node may have restarted): no gap counted
+            self.sequences[slot] = sequence
+            self.frames[slot] += 1
+            if battery is not None:
+                self.batteries[slot] = battery
+            return NEW
+
+    def node(self, serial_id: int) -> dict:
+        """
+        Returns the state of a node, or None if it is not tracked.
+
+        Args:
+            serial_id (int): The serial ID of the node.
+        """
+        with self.lock:
+            slot = self.slots.get(serial_id)
+            if slot is None:
+                return None
+            return self.describe(serial_id, slot)
+
+    def describe(self, serial_id: int, slot: int) -> dict:
+        """
+        Returns the state stored in a slot (the lock must be held).
+        """
+        battery = self.batteries[slot]
+        return {
+            "serial_id": serial_id,
+            "waspmote_id": self.waspmote_ids[slot],
+            "sequence": self.sequences[slot],
+            "last_seen": self.last_seen[slot],
+            "battery": round(battery, 2) if battery != NO_BATTERY else None,
+            "frames": self.frames[slot],
+            "duplicates": self.duplicates[slot],
+            "gaps": self.gaps[slot]
+        }
+
+    def nodes(self, stale_after: float = None, low_battery: float = None, now: float = None) -> list:
+        """
+        Returns the state of the tracked nodes, least recently seen first, optionally only the unhealthy ones.
+
+        Args:
+            stale_after (float, optional): Only the nodes not seen for this many seconds. Default is None.
+            low_battery (float, optional): Only the nodes whose battery level is below this one. Default is None.
+            now (float, optional): Wall clock time of the query. Default is the current time.
+
+        Returns:
+            list: The states of the nodes (see node).
+        """
+        if now is None:
+            now = time.time()
+
+        with self.lock:
+            result = []
+            for serial_id, slot in self.slots.items():
+                if stale_after is not None and now - self.last_seen[slot] < stale_after:
+                    continue
+                if low_battery is not None and not (NO_BATTERY < self.batteries[slot] < low_battery):
+                    continue
+                result.append(self.describe(serial_id, slot))
+            return result
+
+    def snapshot(self, stale_after: float = 3600, low_battery: float = 20, now: float = None) -> dict:
+        """
+        Returns the health of the fleet: the number of nodes tracked, stale (not seen for 'stale_after' seconds)
+        and with a low battery, and the total number of frames, duplicates and gaps.
+
+        Args:
+            stale_after (float, optional): Seconds without frames after which a node is stale. Default is 3600.
+            low_battery (float, optional): Battery level below which a node is reported. Default is 20.
+            now (float, optional): Wall clock time of the query. Default is the current time.
+        """
+        if now is None:
+            now = time.time()
+
+        with self.lock:
+            stale = 0
+            battery_low = 0
+            for slot in self.slots.values():
+                if now - self.last_seen[slot] >= stale_after:
+                    stale += 1
+                if NO_BATTERY < self.batteries[slot] < low_battery:
+                    battery_low += 1
+
+            return {
+                "nodes": len(self.slots),
+                "evicted": self.evicted,
+                "stale": stale,
+                "low_battery": battery_low,
+                "frames": sum(self.frames),
+                "duplicates": sum(self.duplicates),
+                "gaps": sum(self.gaps)
+            }
+
+
+if __name__ == '__main__':
+    import tracemalloc
+
+    # Memory and speed with tens of thousands of nodes
+    nodes = 50000
+    tracemalloc.start()
+    table = FleetTable(nodes)
+    for serial_id in range(nodes):
+        table.observe(serial_id, f"node_{serial_id}", 0, 90.0, now=0)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{nodes} nodes: {size / nodes:.0f} bytes per node (including the Waspmote ID strings)")
+
+    start = time.perf_counter()
+    for sequence in range(1, 5):
+        for serial_id in range(nodes):
+            table.observe(serial_id, f"node_{serial_id}", sequence, 90.0, now=sequence)
+    print(f"observe: {(time.perf_counter() - start) / (4 * nodes) * 1e6:.2f} us per frame")
+
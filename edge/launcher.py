@@ -0,0 +1,271 @@
+import multiprocessing
+import os
+import queue
+import threading
+import time
+import config as config
+import ringbuffer.ringbuffer as ringbuffer
+import metrics.metrics as metrics
+import logs.logs as logs
+
+LAUNCHER = logs.get_logger('launcher')
+
+
+def report(name, modules, stats_queue, interval):
+    """
+    Starts a thread periodically sending the statistics of the modules' pipelines, and the process' metrics, to the supervisor.
+
+    Args:
+        name (str): The name of the process.
+        modules (list): The TcpModule objects of the process.
+        stats_queue (multiprocessing.Queue): The queue where statistics are sent to the supervisor.
+        interval (float): Seconds between two reports.
+    """
+    import libellium.libellium as libellium
+
+    def loop():
+        while True:
+            time.sleep(interval)
+            stats = merge([module.pipeline.stats() for module in modules])
+
+            # The modules of a process share the same uploader, filter, tracer, admission, capture and fleet table: count them once
+            uploader = modules[-1].uploader
+            if uploader is not None:
+                stats["uploader"] = uploader.stats()
+            report_filter = modules[-1].report_filter
+            if report_filter is not None:
+                stats["report_filter"] = report_filter.stats()
+            tracer = modules[-1].tracer
+            if tracer is not None:
+                stats["tracer"] = tracer.stats()
+            admission = modules[-1].admission
+            if admission is not None:
+                stats["admission"] = admission.stats()
+            capture_writer = modules[-1].capture_writer
+            if capture_writer is not None:
+                stats["capture"] = capture_writer.stats()
+            fleet_table = modules[-1].fleet_table
+            if fleet_table is not None:
+                stats["fleet"] = fleet_table.snapshot(float(config.FLEET_STALE_AFTER), float(config.FLEET_LOW_BATTERY))
+            if config.AES_KEYS_FILE != '':
+                stats["aes"] = libellium.KEY_STORE.stats()
+
+            stats["logs"] = logs.stats()
+            stats["metrics"] = metrics.REGISTRY.snapshot()
+            stats_queue.put((name, os.getpid(), stats))
+
+    threading.Thread(target=loop, daemon=True).start()
+
+
+def run_worker(name, stats_queue, interval, ring=None):
+    """
+    Body of a worker process: starts its own TCP modules bound with SO_REUSEPORT,
+    and periodically sends the statistics of their pipelines to the supervisor.
+
+    Args:
+        name (str): The name of the worker.
+        stats_queue (multiprocessing.Queue): The queue where statistics are sent to the supervisor.
+        interval (float): Seconds between two reports.
+        ring (ringbuffer.RingBuffer, optional): Ring buffer towards the worker's decoder processes. Default is None.
+    """
+    # Imported here, so that every worker process loads its own modules
+    import tcp_module
+
+    modules = tcp_module.from_config(reuse_port=True, ring=ring, name=name)
+    report(name, modules, stats_queue, interval)
+
+    LAUNCHER.info("%s started (pid %d).", name, os.getpid())
+    tcp_module.run(modules)
+
+
+def run_decoder(name, stats_queue, interval, ring):
+    """
+    Body of a decoder process: decodes and publishes the frames written into the ring buffer by its worker.
+
+    Args:
+        name (str): The name of the decoder.
+        stats_queue (multiprocessing.Queue): The queue where statistics are sent to the supervisor.
+        interval (float): Seconds between two reports.
+        ring (ringbuffer.RingBuffer): The ring buffer filled by the worker.
+    """
+    import tcp_module
+
+    # The fleet table is kept by the worker, which sees all the frames of its decoders
+    module = tcp_module.from_config(name=name, track_fleet=False)[-1]
+    report(name, [module], stats_queue, interval)
+
+    LAUNCHER.info("%s started (pid %d).", name, os.getpid())
+    module.consume(ring)
+
+
+def merge(stats: list) -> dict:
+    """
+    Sums a list of (nested) statistics dictionaries field by field.
+
+    Args:
+        stats (list): The dictionaries to sum.
+
+    Returns:
+        dict: A dictionary with the same structure, holding the sums.
+    """
+    total = {}
+    for entry in stats:
+        for key, value in entry.items():
+            if isinstance(value, dict):
+                total[key] = merge([total.get(key, {}), value])
+            else:
+                total[key] = total.get(key, 0) + value
+    return total
+
+
+class Supervisor:
+    """
+    Starts N worker processes, each one running its own TcpModule on the same port through SO_REUSEPORT,
+    so that the kernel spreads gateway connections across CPU cores. Optionally, each worker only receives
+    frames and writes them into a shared memory ring buffer read by its own decoder processes.
+    Dead processes are restarted, and their statistics are aggregated. The metrics of all the processes
+    are summed and served in Prometheus text format.
+
+    Attributes:
+        workers (int): Number of worker processes.
+        decoders (int): Number of decoder processes per worker (0 to decode in the workers).
+        interval (float): Seconds between two statistics reports.
+        rings (list): The ring buffers of the workers (empty without decoders).
+        processes (dict): The running processes: {name: (process, target, args)}.
+        restarts (int): Number of processes restarted after dying.
+        stats (dict): The last statistics received from every process: {name: dict}.
+        metrics (dict): The last metrics received from every process: {name: dict}.
+        retired (dict): The last metrics of the processes that died, so that counters never go backwards.
+        stats_queue (multiprocessing.Queue): The queue where processes send their statistics.
+    """
+
+    def __init__(self, workers: int = 1, interval: float = 10, decoders: int = 0):
+        """
+        Constructor for Supervisor class.
+
+        Args:
+            workers (int, optional): Number of worker processes. Default is 1.
+            interval (float, optional): Seconds between two statistics reports. Default is 10.
+            decoders (int, optional): Number of decoder processes per worker. Default is 0.
+        """
+        self.workers = workers
+        self.decoders = decoders
+        self.interval = interval
+        self.rings = []
+        self.processes = {}
+        self.restarts = 0
+        self.stats = {}
+        self.metrics = {}
+        self.retired = {}
+        self.lock = threading.Lock()
+        self.stats_queue = multiprocessing.Queue()
+
+    def spawn(self, name: str, target, args: tuple):
+        """
+        Starts (or restarts) a supervised process.
+
+        Args:
+            name (str): The name of the process.
+            target (callable): The body of the process.
+            args (tuple): The arguments of the body, after the name, the statistics queue and the interval.
+        """
+        process = multiprocessing.Process(target=target, args=(name, self.stats_queue, self.interval) + args,
+                                          name=name, daemon=True)
+        process.start()
+        self.processes[name] = (process, target, args)
+
+    def check(self):
+        """
+        Restarts every process that is not alive anymore, after freeing the ring buffer slots it was reading.
+        """
+        for name, (process, target, args) in list(self.processes.items()):
+            if not process.is_alive():
+                LAUNCHER.warning("%s (pid %d) died with exit code %s: restarting.", name, process.pid, process.exitcode)
+                for ring in args:
+                    if isinstance(ring, ringbuffer.RingBuffer):
+                        freed = ring.reclaim(process.pid)
+                        if freed:
+                            LAUNCHER.warning("%d ring buffer slots read by %s freed (frames dropped).", freed, name)
+                self.stats.pop(name, None)
+                with self.lock:
+                    self.retired = merge([self.retired, self.metrics.pop(name, {})])
+                self.restarts += 1
+                self.spawn(name, target, args)
+
+    def collect(self):
+        """
+        Reads all the statistics received from the processes, keeping the last one of each process.
+        """
+        while True:
+            try:
+                name, pid, stats = self.stats_queue.get_nowait()
+            except queue.Empty:
+                break
+            if name in self.processes and self.processes[name][0].pid == pid:
+                with self.lock:
+                    self.metrics[name] = stats.pop("metrics", {})
+                self.stats[name] = stats
+
+    def aggregate(self) -> dict:
+        """
+        Returns the statistics summed over all the processes, plus the supervisor's own counters.
+        """
+        total = merge(list(self.stats.values()))
+        total["processes"] = sum(1 for process, _, _ in self.processes.values() if process.is_alive())
+        total["restarts"] = self.restarts
+        if self.rings:
+            total["ring"] = merge([ring.stats() for ring in self.rings])
+        return total
+
+    def render(self) -> str:
+        """
+        Returns the metrics summed over all the processes, in Prometheus text format.
+        """
+        with self.lock:
+            snapshot = merge([self.retired] + list(self.metrics.values()))
+        return metrics.REGISTRY.render(snapshot)
+
+    def start(self):
+        """
+        Starts all the processes and supervises them forever.
+        """
+        # Configured before the processes are forked: each of them sets up its own output again
+        logs.configure(config.LOG_LEVEL, logs.parse_sampling(config.LOG_SAMPLING), int(config.LOG_QUEUE_SIZE))
+
+        for index in range(self.workers):
+            if self.decoders > 0:
+                ring = ringbuffer.RingBuffer(int(config.RING_SLOTS), int(config.RING_SLOT_SIZE), config.RING_POLICY)
+                self.rings.append(ring)
+
+                self.spawn(f"worker-{index}", run_worker, (ring,))
+                for decoder in range(self.decoders):
+                    self.spawn(f"decoder-{index}.{decoder}", run_decoder, (ring,))
+            else:
+                self.spawn(f"worker-{index}", run_worker, ())
+
+        if config.METRICS_PORT_NUMBER != '':
+            metrics.serve(config.METRICS_IP_ADDRESS, int(config.METRICS_PORT_NUMBER), self.render)
+
+        LAUNCHER.info("Supervising %d workers (%d decoders each) on port %s.", self.workers, self.decoders, config.PORT_NUMBER)
+
+        try:
+            last_report = time.monotonic()
+            while True:
+                time.sleep(1)
+                self.check()
+
+                if time.monotonic() - last_report >= self.interval:
+                    last_report = time.monotonic()
+                    self.collect()
+                    LAUNCHER.info("Stats: %s", self.aggregate())
+
+        except KeyboardInterrupt:
+            for process, _, _ in self.processes.values():
+                process.terminate()
+            for ring in self.rings:
+                ring.close()
+
+
+if __name__ == '__main__':
+    supervisor = Supervisor(int(config.WORKERS), float(config.STATS_INTERVAL), int(config.RING_DECODERS))
+    supervisor.start()
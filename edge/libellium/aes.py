@@ -0,0 +1,283 @@
+# ************************************** AES MODULE **************************************
+
+import json
+import threading
+from collections import OrderedDict
+
+try:
+    from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+except ImportError:
+    Cipher = None
+
+
+# Encrypted frame types, with their key size in bytes (None: any AES key size, given by the node's key).
+# An encrypted frame is '<=>', its type, its number of bytes, then for the v15 types the serial ID of the node
+# in clear (8 bytes, big endian), then the whole plaintext frame encrypted with AES-ECB and padded to 16 bytes.
+KEY_SIZES = {0x60: None, 0x61: 16, 0x62: 24, 0x63: 32, 0x64: 16, 0x65: 16}
+CLEAR_SERIAL_ID = (0x60, 0x64)
+
+# Offsets of the encrypted frame's header
+TYPE_OFFSET = 3
+SERIAL_ID_START = 5
+SERIAL_ID_END = 13
+
+BLOCK_SIZE = 16
+STARTER = b'<=>'
+
+
+class DecryptionError(Exception):
+    """
+    Exception raised when an encrypted frame cannot be decrypted.
+    """
+
+    def __init__(self, message="Encrypted frame not decrypted"):
+        """
+        Constructor for DecryptionError exception.
+
+        Args:
+            message (str, optional): Custom error message. Defaults to "Encrypted frame not decrypted".
+        """
+        self.message = message
+        super().__init__(self.message)
+
+
+def is_encrypted(frame) -> bool:
+    """
+    Returns whether a raw frame is one of the encrypted frame types.
+
+    Args:
+        frame (bytes | memoryview): The raw Libellium frame.
+    """
+    return len(frame) > TYPE_OFFSET and frame[TYPE_OFFSET] in KEY_SIZES
+
+
+def parse_key(text: str) -> bytes:
+    """
+    Parses an AES key written in hexadecimal (32, 48 or 64 digits).
+
+    Raises:
+        ValueError: If the key is not hexadecimal or not 16, 24 or 32 bytes long.
+    """
+    key = bytes.fromhex(text)
+    if len(key) not in (16, 24, 32):
+        raise ValueError(f"AES keys are 16, 24 or 32 bytes long, not {len(key)}.")
+    return key
+
+
+class KeyStore:
+    """
+    The AES keys of the nodes, with the decryption contexts built from them.
+    A node's key is found by its serial ID (sent in clear by the v15 encrypted frames); frames without a clear
+    serial ID (v12) and nodes without their own key use the default key. Key schedules are expanded once per key:
+    the decryption contexts are cached (at most 'max_ciphers', the least recently used first dropped).
+    AES-ECB has no chaining, so a cached context decrypts any number of frames.
+
+    Attributes:
+        keys (dict): The keys of the nodes: {serial_id: bytes}.
+        default (bytes): The default key, None if there is none.
+        max_ciphers (int): Max number of cached decryption contexts.
+        decrypted (int): Number of frames decrypted.
+        failures (int): Number of frames that could not be decrypted.
+    """
+
+    def __init__(self, keys: dict = None, default: bytes = None, max_ciphers: int = 65536):
+        """
+        Constructor for KeyStore class.
+
+        Args:
+            keys (dict, optional): The keys of the nodes: {serial_id: bytes}. Default is no keys.
+            default (bytes, optional): The default key. Default is None.
+            max_ciphers (int, optional): Max number of cached decryption contexts. Default is 65536.
+        """
+        self.keys = dict(keys or {})
+        self.default = default
+        self.max_ciphers = max_ciphers
+        self.ciphers = OrderedDict()
+        self.decrypted = 0
+        self.failures = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def load(self, path: str):
+        """
+        Replaces the keys with those of a JSON file: {"default": "<hex key>", "nodes": {"<serial ID>": "<hex key>"}},
+        serial IDs being written in decimal. The cached contexts are dropped.
+
+        Args:
+            path (str): The path of the key file.
+
+        Raises:
+            ValueError: If a serial ID or a key is malformed.
+        """
+        with open(path) as file:
+            content = json.load(file)
+
+        default = parse_key(content['default']) if content.get('default') else None
+        keys = {int(serial_id): parse_key(key) for serial_id, key in content.get('nodes', {}).items()}
+
+        with self.lock:
+            self.default = default
+            self.keys = keys
+            self.ciphers.clear()
+
+    def decryptor(self, serial_id, key_size: int = None):
+        """
+        Returns the cached decryption context of a node, building it on first use. The lock must be held.
+
+        Args:
+            serial_id (int): The serial ID of the node, None if the frame does not carry it.
+            key_size (int, optional): The key size required by the frame type. Default is None (any).
+
+        Raises:
+            DecryptionError: If no AES library is installed, or there is no key of the right size for the node.
+        """
+        key = self.keys.get(serial_id, self.default) if serial_id is not None else self.default
+        if key is None:
+            raise DecryptionError(f"No AES key for node {serial_id}.")
+        if key_size is not None and len(key) != key_size:
+            raise DecryptionError(f"The AES key of node {serial_id} is {len(key)} bytes long, the frame needs {key_size}.")
+
+        context = self.ciphers.get(key)
+        if context is not None:
+            self.ciphers.move_to_end(key)
+            self.hits += 1
+            return context
+
+        if Cipher is None:
+            raise DecryptionError("Encrypted frames require the 'cryptography' package.")
+        self.misses += 1
+        context = self.ciphers[key] = Cipher(algorithms.AES(key), modes.ECB()).decryptor()
+        while len(self.ciphers) > self.max_ciphers:
+            self.ciphers.popitem(last=False)
+        return context
+
+    def decrypt(self, frame) -> bytes:
+        """
+        Decrypts an encrypted frame into the plaintext frame it carries.
+
+        Args:
+            frame (bytes | memoryview): The raw encrypted frame.
+
+        Returns:
+            bytes: The raw plaintext frame.
+
+        Raises:
+            DecryptionError: If there is no key for the frame, its ciphertext is not a whole number of blocks,
+                             or the plaintext is not a frame of the same node (e.g. wrong key).
+        """
+        frame_type = frame[TYPE_OFFSET]
+        serial_id = None
+        start = SERIAL_ID_START
+        if frame_type in CLEAR_SERIAL_ID:
+            serial_id = int.from_bytes(frame[SERIAL_ID_START:SERIAL_ID_END], 'big')
+            start = SERIAL_ID_END
+
+        ciphertext = frame[start:]
+        try:
+            if not ciphertext or len(ciphertext) % BLOCK_SIZE:
+                raise DecryptionError(f"Ciphertext of {len(ciphertext)} bytes is not a whole number of AES blocks.")
+            with self.lock:
+                plaintext = self.decryptor(serial_id, KEY_SIZES[frame_type]).update(ciphertext)
+
+            # The plaintext frame gives its own length: the padding (PKCS#5 or zeros) after it is dropped
+            if plaintext[:3] != STARTER or plaintext[4] + 5 > len(plaintext):
+                raise DecryptionError(f"Frame of node {serial_id} not decrypted: wrong key or corrupted frame.")
+            plaintext = plaintext[:plaintext[4] + 5]
+            if serial_id is not None and int.from_bytes(plaintext[SERIAL_ID_START:SERIAL_ID_END], 'big') != serial_id:
+                raise DecryptionError(f"Frame of node {serial_id} carries another serial ID.")
+        except DecryptionError:
+            with self.lock:
+                self.failures += 1
+            raise
+
+        with self.lock:
+            self.decrypted += 1
+        return plaintext
+
+    def header(self, frame):
+        """
+        Decrypts only the first block of an encrypted frame, which holds the header of the plaintext frame
+        (its type and serial ID), e.g. to schedule the frame before it is decoded. The frame is not checked further.
+
+        Args:
+            frame (bytes | memoryview): The raw encrypted frame.
+
+        Returns:
+            bytes: The first 16 bytes of the plaintext frame, None if there is no key for the frame,
+                   no AES library, or the first block is missing or does not start a frame (e.g. wrong key).
+        """
+        frame_type = frame[TYPE_OFFSET]
+        serial_id = None
+        start = SERIAL_ID_START
+        if frame_type in CLEAR_SERIAL_ID:
+            serial_id = int.from_bytes(frame[SERIAL_ID_START:SERIAL_ID_END], 'big')
+            start = SERIAL_ID_END
+
+        block = frame[start:start + BLOCK_SIZE]
+        if len(block) < BLOCK_SIZE:
+            return None
+        try:
+            with self.lock:
+                # ECB: a whole block leaves nothing buffered in the shared context
+                plaintext = self.decryptor(serial_id, KEY_SIZES[frame_type]).update(block)
+        except DecryptionError:
+            return None
+        return plaintext if plaintext[:3] == STARTER else None
+
+    def stats(self) -> dict:
+        """
+        Returns the counters of the key store.
+        """
+        with self.lock:
+            return {
+                "decrypted": self.decrypted,
+                "failures": self.failures,
+                "cipher_hits": self.hits,
+                "cipher_misses": self.misses
+            }
+
+
+def encrypt_frame(frame: bytes, key: bytes, frame_type: int = 0x60) -> bytes:
+    """
+    Encrypts a plaintext frame as a Waspmote does (PKCS#5 padding), e.g. to test the decoders.
+
+    Args:
+        frame (bytes): The raw plaintext frame.
+        key (bytes): The AES key.
+        frame_type (int, optional): The encrypted frame type. Default is 0x60 (AES-ECB v15).
+
+    Returns:
+        bytes: The raw encrypted frame.
+    """
+    if Cipher is None:
+        raise DecryptionError("Encrypted frames require the 'cryptography' package.")
+
+    padding = BLOCK_SIZE - len(frame) % BLOCK_SIZE
+    encryptor = Cipher(algorithms.AES(key), modes.ECB()).encryptor()
+    body = encryptor.update(frame + bytes([padding]) * padding) + encryptor.finalize()
+    if frame_type in CLEAR_SERIAL_ID:
+        body = frame[SERIAL_ID_START:SERIAL_ID_END] + body
+    return STARTER + bytes([frame_type, len(body)]) + body
+
+
+if __name__ == '__main__':
+    import time
+
+    frame = bytes.fromhex("3C3D3E06451B20B4BD3C195E206E6F64655F3031231434641500000000006185EB3F0100000000"
+                          "046179913E4A7B14C4414C005462424DBFD0C647460000000047000000004800000000")
+    serial_id = int.from_bytes(frame[SERIAL_ID_START:SERIAL_ID_END], 'big')
+    key = bytes(range(32))
+    store = KeyStore({serial_id: key})
+    encrypted = encrypt_frame(frame, key, 0x60)
+    runs = 100000
+    start = time.perf_counter()
+    for _ in range(runs):
+        store.decrypt(encrypted)
+    print(f"Decryption of a {len(encrypted)} bytes frame: {(time.perf_counter() - start) / runs * 1e6:.2f} us "
+          f"with a cached context, {store.stats()}")
+
+    start = time.perf_counter()
+    for _ in range(runs // 10):
+        Cipher(algorithms.AES(key), modes.ECB()).decryptor().update(encrypted[SERIAL_ID_END:])
+    print(f"Building the context for every frame instead: {(time.perf_counter() - start) / (runs // 10) * 1e6:.2f} us")
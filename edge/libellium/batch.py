@@ -0,0 +1,261 @@
+# ************************************** BATCH DECODING MODULE **************************************
+
+import time
+
+import numpy as np
+
+import libellium.libellium as libellium
+import libellium.plan as plan
+import libellium.sensor as sensor
+
+
+# NumPy little-endian dtypes of the supported numeric field types
+NUMPY_DTYPES = {
+    'uint8_t': '<u1',
+    'uint16_t': '<u2',
+    'uint32_t': '<u4',
+    'uint64_t': '<u8',
+    'float': '<f4',
+}
+
+
+class FrameBatch:
+    """
+    Columnar result of a batch decode: one array of values per sensor instead of one list of (Sensor, value) tuples per frame.
+
+    Attributes:
+        count (int): Number of frames in the batch.
+        serial_id (list): The serial ID of every frame (None if the frame could not be decoded).
+        waspmote_id (list): The Waspmote ID of every frame (None if the frame could not be decoded).
+        frame_sequence (list): The frame sequence number of every frame (None if the frame could not be decoded).
+        columns (dict): The measurements of every sensor: {ascii_id: numpy.ndarray}.
+        rows (dict): The position in the batch of the frame of every measurement: {ascii_id: numpy.ndarray}.
+        errors (list): Tuples (row, exception) of the frames that could not be decoded.
+    """
+
+    def __init__(self, count: int):
+        """
+        Constructor for FrameBatch class.
+
+        Args:
+            count (int): Number of frames in the batch.
+        """
+        self.count = count
+        self.serial_id = [None] * count
+        self.waspmote_id = [None] * count
+        self.frame_sequence = [None] * count
+        self.columns = {}
+        self.rows = {}
+        self.errors = []
+
+    def __str__(self) -> str:
+        """
+        String representation of the batch.
+        """
+        return f"<Batch: {self.count} frames, {len(self.columns)} sensors, {len(self.errors)} errors>"
+
+
+def plan_dtype(decode_plan: plan.DecodePlan) -> np.dtype:
+    """
+    Builds the packed structured dtype of a payload from its decode plan.
+
+    Args:
+        decode_plan (plan.DecodePlan): The plan of the payload.
+
+    Returns:
+        numpy.dtype: A dtype with the fields 'id<i>' and 'value<i>' for every measurement.
+    """
+    fields = []
+    for i, s in enumerate(decode_plan.sensors):
+        fields.append((f"id{i}", '<u1'))
+        fields.append((f"value{i}", NUMPY_DTYPES[s.fields_type]))
+    return np.dtype(fields)
+
+
+def float_from_bits(bits: np.ndarray) -> np.ndarray:
+    """
+    Vectorized 'sensor.float_from_bits': rebuilds single-precision floats from their 32 bits
+    with the formula of 'Sensor.little_endian_conversion'.
+
+    Args:
+        bits (numpy.ndarray): The 32 bits of the floats as unsigned integers.
+
+    Returns:
+        numpy.ndarray: The converted values as float64.
+    """
+    bits = bits.astype(np.uint32)
+    sign = np.where(bits >> 31, -1.0, 1.0)
+    exponent = ((bits >> 23) & 0xFF).astype(np.int32) - 127
+    fraction = 1.0 + (bits & 0x7FFFFF) / 0x800000
+    return np.ldexp(sign * fraction, exponent)
+
+
+def decode_group(decode_plan: plan.DecodePlan, payloads: list) -> tuple:
+    """
+    Decodes in one step the payloads of a group of frames that share the same size.
+
+    Args:
+        decode_plan (plan.DecodePlan): The plan expected for the group.
+        payloads (list): The raw payloads of the group.
+
+    Returns:
+        tuple: A boolean mask of the payloads matching the plan's layout and the list of value columns (one per measurement).
+    """
+    dtype = plan_dtype(decode_plan)
+    records = np.frombuffer(b''.join(payloads), dtype=dtype)
+
+    matches = np.ones(len(payloads), dtype=bool)
+    for i, sensor_id in enumerate(decode_plan.layout):
+        matches &= records[f"id{i}"] == sensor_id
+
+    columns = []
+    for i, s in enumerate(decode_plan.sensors):
+        raw = records[f"value{i}"][matches]
+
+        if s.fields_type == 'float':
+            with np.errstate(invalid='ignore'):
+                values = raw.astype(np.float64)
+            magnitudes = np.abs(values)
+            abnormal = ~((magnitudes >= sensor.FLOAT_MIN_NORMAL) & (magnitudes <= sensor.FLOAT_MAX))
+            if abnormal.any():
+                values[abnormal] = float_from_bits(raw.view('<u4')[abnormal])
+        else:
+            values = raw.astype(np.int64 if s.fields_type != 'uint64_t' else np.uint64)
+
+        columns.append(values)
+
+    return matches, columns
+
+
+def decode_batch(frames) -> FrameBatch:
+    """
+    Decodes many Libellium frames at once.
+    Frames are grouped by (waspmote_id, payload size), the first frame of each group is decoded
+    by the scalar decoder to compile the group's plan, then all the group's numeric fields are
+    decoded together with 'numpy.frombuffer'. Frames that do not match their group's layout,
+    or whose layout has variable-length fields, fall back to the scalar decoder.
+    Encrypted frames are decrypted first, with the keys of 'libellium.KEY_STORE'.
+
+    Args:
+        frames (iterable): The frames, in hexadecimal format or as raw bytes.
+
+    Returns:
+        FrameBatch: The columnar measurements of the batch.
+    """
+    frames = list(frames)
+    batch = FrameBatch(len(frames))
+
+    groups = {}
+    fields_types = {}
+
+    # Values decoded one by one (Python objects) and group by group (arrays), per sensor
+    scalar_values = {}
+    scalar_rows = {}
+    array_values = {}
+    array_rows = {}
+
+    def append(row, measurements):
+        for s, measure in measurements:
+            fields_types[s.ascii_id] = s.fields_type
+            scalar_values.setdefault(s.ascii_id, []).append(measure)
+            scalar_rows.setdefault(s.ascii_id, []).append(row)
+
+    def decode_scalar(row, frame):
+        try:
+            measurement = libellium.Libellium(frame)
+            measurement.parse()
+        except Exception as e:
+            batch.errors.append((row, e))
+            return None
+        append(row, measurement.measurements)
+        return measurement
+
+    # Header of every frame, payloads grouped by layout key
+    for row, frame in enumerate(frames):
+        if isinstance(frame, str):
+            frame = bytes.fromhex(frame)
+        frames[row] = frame
+
+        header = libellium.Libellium(frame)
+        try:
+            # Encrypted frames are replaced by their plaintext, read by both the header pass and the group decoding
+            header.decrypt()
+            frame = frames[row] = header.frame
+            index = header.parse_header_bytes(memoryview(frame))
+        except Exception as e:
+            batch.errors.append((row, e))
+            continue
+
+        batch.serial_id[row] = header.serial_id
+        batch.waspmote_id[row] = header.waspmote_id
+        batch.frame_sequence[row] = header.frame_sequence
+
+        groups.setdefault((header.waspmote_id, len(frame) - index), []).append((row, index))
+
+    # Group decoding
+    for entries in groups.values():
+        first_row, _ = entries[0]
+        first = decode_scalar(first_row, frames[first_row])
+        if first is None or len(entries) == 1:
+            for row, _ in entries[1:]:
+                decode_scalar(row, frames[row])
+            continue
+
+        try:
+            decode_plan = plan.DecodePlan([measure[0] for measure in first.measurements])
+        except ValueError:
+            for row, _ in entries[1:]:
+                decode_scalar(row, frames[row])
+            continue
+
+        others = entries[1:]
+        matches, columns = decode_group(decode_plan, [memoryview(frames[row])[index:] for row, index in others])
+
+        group_rows = np.array([row for row, _ in others], dtype=np.intp)
+        for s, column in zip(decode_plan.sensors, columns):
+            array_values.setdefault(s.ascii_id, []).append(column)
+            array_rows.setdefault(s.ascii_id, []).append(group_rows[matches])
+
+        for row in group_rows[~matches]:
+            decode_scalar(int(row), frames[row])
+
+    # Columns in frame order
+    for ascii_id, fields_type in fields_types.items():
+        # Strings are kept as objects: NumPy's unicode arrays would drop their trailing '\0'
+        dtype = object if fields_type == "string" else None
+        column_rows = np.concatenate([np.array(scalar_rows[ascii_id], dtype=np.intp)] + array_rows.get(ascii_id, []))
+        column_values = np.concatenate([np.array(scalar_values[ascii_id], dtype=dtype)] + array_values.get(ascii_id, []))
+
+        order = np.argsort(column_rows, kind='stable')
+        batch.rows[ascii_id] = column_rows[order]
+        batch.columns[ascii_id] = column_values[order]
+
+    return batch
+
+
+if __name__ == '__main__':
+    # Benchmark: scalar decoding against batch decoding of the same frames
+    frame = bytes.fromhex("3C3D3E06451B20B4BD3C195E206E6F64655F3031231434641500000000006185EB3F0100000000046179913E4A7B14C4414C005462424DBFD0C647460000000047000000004800000000")
+    sequence_index = frame.index(b'#') + 1
+
+    frames = []
+    for i in range(100000):
+        raw = bytearray(frame)
+        raw[sequence_index] = i % 256
+        frames.append(bytes(raw))
+
+    start = time.perf_counter()
+    scalar = []
+    for raw in frames:
+        measurement = libellium.Libellium(raw)
+        measurement.parse()
+        scalar.append(measurement.measurements)
+    scalar_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batch = decode_batch(frames)
+    batch_time = time.perf_counter() - start
+
+    print(batch)
+    print(f"[LIBELLIUM] Scalar: {len(frames) / scalar_time:.0f} frames/s ({scalar_time:.3f} s)")
+    print(f"[LIBELLIUM] Batch:  {len(frames) / batch_time:.0f} frames/s ({batch_time:.3f} s)")
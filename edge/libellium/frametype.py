@@ -1,4 +1,10 @@
 
+# Scheduling priorities of the frames, highest first: alarms and events are never shed or delayed behind routine frames
+PRIORITY_ALARM, PRIORITY_EVENT, PRIORITY_ROUTINE = range(3)
+PRIORITY_NAMES = ('alarm', 'event', 'routine')
+PRIORITIES = {'Alarm': PRIORITY_ALARM, 'Event': PRIORITY_EVENT}
+
+
 class FrameType:
     """
     Defines a simple structure to identify the frame's type.
@@ -14,6 +20,7 @@ class FrameType:
         """
         self.encoding = encoding
         self.type = type
+        self.priority = PRIORITIES.get(type, PRIORITY_ROUTINE)
 
     def __str__(self) -> str:
         """
@@ -55,6 +62,18 @@ FRAME_TYPES = {
 }
 
 
+def priority(frame_type_id: int) -> int:
+    """
+    Returns the scheduling priority of a frame type: PRIORITY_ALARM, PRIORITY_EVENT or PRIORITY_ROUTINE
+    (unknown types, e.g. encrypted frames, are routine).
+
+    Args:
+        frame_type_id (int): The ID of the frame type.
+    """
+    frame_type = FRAME_TYPES.get(frame_type_id)
+    return frame_type.priority if frame_type is not None else PRIORITY_ROUTINE
+
+
 class FrameTypeNotExists(Exception):
     """
     Defines an exception for an invalid type, related to the FRAME_TYPES dictionary.
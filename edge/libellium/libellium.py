@@ -2,9 +2,29 @@
 
 import libellium.sensor as sensor
 import libellium.frametype as ft
+import libellium.plan as plan
+import libellium.measurement as measurement
+import libellium.registry as registry
+import libellium.aes as aes
 
+# Decoder modes: 'tokens' is the original binary-string parser, 'bytes' decodes offsets of the raw frame
+DECODE_MODES = ('tokens', 'bytes')
 
-SENSORS = sensor.read_sensors("libellium/sensor.json")
+# Decode plans compiled for the payload layouts of the known Waspmotes ('bytes' mode only)
+PLAN_CACHE = plan.PlanCache(max_size=1024)
+
+# AES keys of the nodes, used to decrypt the encrypted frame types (see aes.KeyStore)
+KEY_STORE = aes.KeyStore()
+
+
+def __getattr__(name: str):
+    """
+    Returns the lazily loaded module attributes: SENSORS, the sensors of 'sensor.json' by binary ID,
+    is only read on first use (see registry.SensorRegistry).
+    """
+    if name == 'SENSORS':
+        return registry.REGISTRY.by_binary_id
+    raise AttributeError(f"module '{__name__}' has no attribute '{name}'")
 
 
 class Libellium:
@@ -12,22 +32,23 @@ class Libellium:
     Represents a Libellium frame and provides methods for parsing it.
 
     Attributes:
-        frame (str): The input Libellium frame in hexadecimal format.
+        frame (str | bytes): The input Libellium frame, in hexadecimal format or as raw bytes.
         type (FrameType): The type of the Libellium frame.
         number_of_bytes (int): The number of bytes in the frame.
         serial_id (str): The serial ID of the frame.
         waspmote_id (str): The Waspmote ID associated with the frame.
         frame_sequence (int): The frame sequence number.
-        measurements (list): A list of tuples containing (Sensor, measurement) pairs.
+        encryption (FrameType): The type of the encrypted frame that carried this one, None if it was sent in clear.
+        measurements (measurement.MeasurementSet): The (Sensor, measurement) pairs, stored as columns.
     """
 
 
-    def __init__(self, frame: str):
+    def __init__(self, frame):
         """
         Constructor for Libellium class.
 
         Args:
-            frame (str): The input Libellium frame in hexadecimal format.
+            frame (str | bytes | bytearray | memoryview): The input Libellium frame, in hexadecimal format or as raw bytes.
         """
         self.frame = frame
         self.type = -1
@@ -35,7 +56,8 @@ class Libellium:
         self.serial_id = ''
         self.waspmote_id = ''
         self.frame_sequence = 0
-        self.measurements = []
+        self.encryption = None
+        self.measurements = measurement.MeasurementSet()
 
 
 
@@ -173,13 +195,14 @@ class Libellium:
         """
 
         tokens = self.tokenize(self.frame)
+        sensors = registry.REGISTRY.by_binary_id
 
         end_of_frame = False
         while not end_of_frame:
             try:
                 sensor_id = int(tokens[index], 2)
                 index += 1
-                sensor_obj = SENSORS[sensor_id]
+                sensor_obj = sensors[sensor_id]
 
                 # Read strings of variable length until '\0'
                 if sensor_obj.fields_type == "string":
@@ -212,15 +235,138 @@ class Libellium:
 
 
 
-    def parse(self):
+    def parse_header_bytes(self, view: memoryview) -> int:
+
+        """
+        Parses the header of a raw Libellium frame and populates the relevant attributes.
+        Same result as 'parse_header', but fields are read by offset from the frame's bytes.
+
+        Args:
+            view (memoryview): The raw Libellium frame.
+
+        Returns:
+            int: The offset of the first byte of the payload after parsing the header.
+        """
+
+        starter = bytes(view[0:3]).decode('latin-1')
+
+        if starter != "<=>":
+            raise sensor.UnexpectedTokenException("0-2", starter, "<=>")
+
+        try:
+            self.type = ft.FRAME_TYPES[view[3]]
+        except KeyError:
+            raise ft.FrameTypeNotExists(view[3])
+
+        self.number_of_bytes = view[4]
+        self.serial_id = int.from_bytes(view[5:13], 'big')
+
+        index = 13
+        length = len(view)
+        while index < length and view[index] != 0x23:  # 0x23 = 35 = '#'
+            index += 1
+
+        if index >= length:
+            raise sensor.UnexpectedTokenException(index, '', "#")
+
+        self.waspmote_id = bytes(view[13:index]).decode('latin-1')
+
+        index += 1
+        self.frame_sequence = view[index]
+        index += 1
+
+        return index
+
+
+
+    def parse_payload_bytes(self, view: memoryview, index: int):
+
+        """
+        Parses the payload of a raw Libellium frame and populates the measurements list.
+        Same result as 'parse_payload', but values are unpacked in place with 'struct'.
+        A payload matching the layout last seen for its Waspmote is decoded by a cached plan,
+        any other payload goes through the generic decoder and its plan is compiled for next frames.
+
+        Args:
+            view (memoryview): The raw Libellium frame.
+            index (int): The offset of the first byte of the payload.
+        """
+
+        length = len(view)
+        key = (self.waspmote_id, length - index)
+
+        measurements = PLAN_CACHE.decode(key, view, index)
+        if measurements is not None:
+            self.measurements = measurements
+            return
+
+        sensors = registry.REGISTRY.by_binary_id
+        while index < length:
+            sensor_id = view[index]
+            index += 1
+
+            try:
+                sensor_obj = sensors[sensor_id]
+            except KeyError:
+                raise sensor.SensorIdNotExists(sensor_id)
+
+            measure, index = sensor_obj.unpack_from(view, index)
+            self.measurements.append((sensor_obj, measure))
+
+        PLAN_CACHE.compile(key, self.measurements)
+
+
+
+    def decrypt(self):
+        """
+        Replaces an encrypted frame with the plaintext frame it carries, decrypted with the node's key.
+        Frames sent in clear are left as they are.
+
+        Raises:
+            aes.DecryptionError: If the frame cannot be decrypted.
+        """
+        frame = self.frame
+        if isinstance(frame, str):
+            frame_type = int(frame[6:8], 16) if len(frame) > 7 else None
+        else:
+            frame_type = frame[aes.TYPE_OFFSET] if len(frame) > aes.TYPE_OFFSET else None
+
+        if frame_type in aes.KEY_SIZES:
+            self.encryption = ft.FRAME_TYPES[frame_type]
+            self.frame = KEY_STORE.decrypt(bytes.fromhex(frame) if isinstance(frame, str) else frame)
+
+
+
+    def parse(self, mode: str = 'bytes'):
         """
         Parses the Libellium frame and populates the class attributes accordingly.
         It works by calling two distinct functions to decode header and then payload,
-        by resuming from the same index in the tokens' list.
+        by resuming from the same index in the tokens' list (or in the frame's bytes).
+        Encrypted frames are decrypted first.
+
+        Args:
+            mode (str, optional): The decoder to use, one of DECODE_MODES. Default is 'bytes'.
+
+        Raises:
+            ValueError: If the decoder mode is not supported.
+            aes.DecryptionError: If the frame is encrypted and cannot be decrypted.
         """
-        
-        index_payload = self.parse_header()
-        self.parse_payload(index_payload)
+        self.decrypt()
+
+        if mode == 'bytes':
+            frame = bytes.fromhex(self.frame) if isinstance(self.frame, str) else self.frame
+            view = memoryview(frame)
+            index_payload = self.parse_header_bytes(view)
+            self.parse_payload_bytes(view, index_payload)
+
+        elif mode == 'tokens':
+            if not isinstance(self.frame, str):
+                self.frame = bytes(self.frame).hex().upper()
+            index_payload = self.parse_header()
+            self.parse_payload(index_payload)
+
+        else:
+            raise ValueError(f"Decoder mode '{mode}' not supported. Use one of {DECODE_MODES}.")
 
 
 
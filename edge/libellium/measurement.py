@@ -0,0 +1,172 @@
+# ************************************** MEASUREMENT SET MODULE **************************************
+
+
+class MeasurementSet:
+    """
+    Columnar measurements of a frame: the sensors in one column and their decoded values in another,
+    in order of appearance. Frames decoded by a cached plan share the sensors column of the plan,
+    so a decoded frame only allocates its values list and this object.
+
+    It behaves as the list of (Sensor, measurement) pairs it replaces (iteration, indexing, equality),
+    and the wire codecs serialize it directly, without building a {ascii_id: {"value", "unit"}} dict per frame.
+    As in such a dict, when two sensors share an ASCII ID (e.g. the two STR sensors) the last value wins.
+
+    Attributes:
+        sensors (list | tuple): The Sensor objects (a tuple when shared with a decode plan).
+        values (list): The measurements, in the same order.
+        unique (bool): Whether the ASCII IDs are all different (None until computed).
+    """
+
+    __slots__ = ('sensors', 'values', 'unique')
+
+    def __init__(self, sensors=None, values: list = None, unique: bool = None):
+        """
+        Constructor for MeasurementSet class.
+
+        Args:
+            sensors (list | tuple, optional): The Sensor objects. Default is an empty list.
+            values (list, optional): The measurements, in the same order. Default is an empty list.
+            unique (bool, optional): Whether the ASCII IDs are all different, if known. Default is None.
+        """
+        self.sensors = sensors if sensors is not None else []
+        self.values = values if values is not None else []
+        self.unique = unique
+
+    def append(self, measure: tuple):
+        """
+        Adds a measurement.
+
+        Args:
+            measure (tuple): The (Sensor, measurement) pair.
+        """
+        self.sensors.append(measure[0])
+        self.values.append(measure[1])
+        self.unique = None
+
+    def is_unique(self) -> bool:
+        """
+        Returns whether the ASCII IDs of the sensors are all different (computed once).
+        """
+        if self.unique is None:
+            self.unique = len({s.ascii_id for s in self.sensors}) == len(self.sensors)
+        return self.unique
+
+    def get(self, ascii_id: str, default=None):
+        """
+        Returns the value of a sensor, or 'default' if the frame does not carry it.
+
+        Args:
+            ascii_id (str): The ASCII ID of the sensor.
+            default (optional): The value returned when it is missing. Default is None.
+        """
+        for position in range(len(self.sensors) - 1, -1, -1):
+            if self.sensors[position].ascii_id == ascii_id:
+                return self.values[position]
+        return default
+
+    def select(self, positions: list):
+        """
+        Returns the measurements at the given positions.
+
+        Args:
+            positions (list): The positions, in increasing order.
+
+        Returns:
+            MeasurementSet: The selected measurements.
+        """
+        return MeasurementSet([self.sensors[p] for p in positions], [self.values[p] for p in positions],
+                              True if self.unique else None)
+
+    def to_dict(self) -> dict:
+        """
+        Returns the measurements as a dictionary: {ascii_id: {"value", "unit"}}.
+        """
+        return {s.ascii_id: {"value": value, "unit": s.unit} for s, value in zip(self.sensors, self.values)}
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def __iter__(self):
+        return zip(self.sensors, self.values)
+
+    def __getitem__(self, position: int) -> tuple:
+        return self.sensors[position], self.values[position]
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, MeasurementSet):
+            return list(self.sensors) == list(other.sensors) and self.values == other.values
+        return list(self) == list(other)
+
+    def __repr__(self):
+        return f"MeasurementSet({', '.join(f'{s.ascii_id}={value!r}' for s, value in self)})"
+
+
+if __name__ == '__main__':
+    import sys
+    import time
+    import tracemalloc
+    import libellium.libellium as libellium
+    import loadgen.loadgen as loadgen
+    import wire.wire as wire
+
+    # Frames of a generated fleet, decoded as the pipeline does: plans are compiled by the first pass
+    builder = loadgen.FrameBuilder(seed=0)
+    frames = [builder.build(builder.node(number)) for number in range(1000)]
+    for frame in frames:
+        libellium.Libellium(frame).parse()
+    decoded = []
+    for frame in frames:
+        measurement = libellium.Libellium(frame)
+        measurement.parse()
+        decoded.append(measurement.measurements)
+
+    def as_tuples(measures):
+        return list(zip(measures.sensors, measures.values))
+
+    def as_dict(measures):
+        return {s.ascii_id: {"value": value, "unit": s.unit} for s, value in measures}
+
+    def deep_size(measures) -> int:
+        size = sys.getsizeof(measures)
+        if isinstance(measures, MeasurementSet):
+            return size + sys.getsizeof(measures.values)
+        for item in (measures.values() if isinstance(measures, dict) else measures):
+            size += sys.getsizeof(item)
+        return size
+
+    # Memory: the values (shared by every structure) are left out, as the Sensor objects
+    print(f"Measurements per frame: {sum(len(m) for m in decoded) / len(decoded):.1f}")
+    for name, convert in (("(Sensor, value) tuples", as_tuples), ("dict of dicts", as_dict), ("MeasurementSet", None)):
+        converted = [convert(m) for m in decoded] if convert is not None else decoded
+        print(f"{name:<24} {sum(deep_size(m) for m in converted) / len(converted):>6.0f} bytes per frame")
+
+    # Time and allocations of the serialization of a record, from the decoded measurements
+    codec = wire.Codec('json')
+    compact = wire.Codec('compact')
+    metadata = {"date": "2024-01-01", "time": "12:00:00.0", "room": "DTLab"}
+    now = wire.EPOCH
+
+    cases = (
+        ("json, dict of dicts", lambda m: codec.record(metadata, as_dict(m), now)),
+        ("json, MeasurementSet", lambda m: codec.record(metadata, m, now)),
+        ("compact, dict of dicts", lambda m: compact.record(metadata, as_dict(m), now)),
+        ("compact, MeasurementSet", lambda m: compact.record(metadata, m, now))
+    )
+
+    # Transient memory of a serialization: the peak above what was allocated before it, the record included
+    for name, serialize in cases:
+        tracemalloc.start()
+        transient = 0
+        for measures in decoded:
+            before = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            serialize(measures)
+            transient += tracemalloc.get_traced_memory()[1] - before
+        tracemalloc.stop()
+
+        start = time.perf_counter()
+        for _ in range(10):
+            for measures in decoded:
+                serialize(measures)
+        elapsed = (time.perf_counter() - start) / (10 * len(decoded))
+        print(f"{name:<24} {elapsed * 1e6:>6.2f} us per record, {transient / len(decoded):>6.0f} bytes allocated at peak")
@@ -0,0 +1,172 @@
+# ************************************** DECODE PLAN MODULE **************************************
+
+import struct
+import threading
+from collections import OrderedDict
+
+import libellium.sensor as sensor
+import libellium.measurement as measurement
+
+
+class DecodePlan:
+    """
+    Precompiled unpacker for a payload whose sequence of sensor IDs is known in advance.
+    The whole payload (IDs included) is decoded by a single 'struct.Struct' call.
+
+    Attributes:
+        layout (tuple): The sequence of sensor binary IDs of the payload.
+        sensors (tuple): The Sensor objects, in the same order as the layout (shared by the decoded frames).
+        unique (bool): Whether the ASCII IDs of the sensors are all different.
+        unpacker (struct.Struct): The little-endian unpacker of the whole payload.
+        float_fields (list): Tuples (field index, byte offset) of the float measurements.
+    """
+
+    def __init__(self, sensors: list):
+        """
+        Constructor for DecodePlan class.
+
+        Args:
+            sensors (list): The Sensor objects of the payload, in order of appearance.
+
+        Raises:
+            ValueError: If a sensor has a field type without a fixed size (e.g. 'string').
+        """
+        self.layout = tuple(s.binary_id for s in sensors)
+        self.sensors = tuple(sensors)
+        self.unique = len({s.ascii_id for s in sensors}) == len(self.sensors)
+        self.float_fields = []
+
+        fmt = '<'
+        offset = 0
+        for i, s in enumerate(sensors):
+            try:
+                unpacker = sensor.STRUCT_FORMATS[s.fields_type]
+            except KeyError:
+                raise ValueError(f"Sensor '{s.ascii_id}' has no fixed-size field type.")
+
+            # One byte for the sensor ID, then the measurement itself
+            fmt += 'B' + unpacker.format[1:]
+            offset += 1
+            if s.fields_type == 'float':
+                self.float_fields.append((i, offset))
+            offset += unpacker.size
+
+        self.unpacker = struct.Struct(fmt)
+
+    def unpack(self, view: memoryview, offset: int):
+        """
+        Decodes the payload if it still matches the compiled layout.
+
+        Args:
+            view (memoryview): The raw Libellium frame.
+            offset (int): The offset of the first byte of the payload.
+
+        Returns:
+            measurement.MeasurementSet | None: The measurements, or None if the layout has changed.
+        """
+        if len(view) - offset != self.unpacker.size:
+            return None
+
+        values = self.unpacker.unpack_from(view, offset)
+        if values[0::2] != self.layout:
+            return None
+
+        measures = list(values[1::2])
+
+        # Zero, subnormal, infinite and NaN patterns are rebuilt as the generic decoder does
+        for i, float_offset in self.float_fields:
+            if not sensor.FLOAT_MIN_NORMAL <= abs(measures[i]) <= sensor.FLOAT_MAX:
+                bits = sensor.STRUCT_FORMATS['uint32_t'].unpack_from(view, offset + float_offset)[0]
+                measures[i] = sensor.float_from_bits(bits)
+
+        return measurement.MeasurementSet(self.sensors, measures, self.unique)
+
+
+class PlanCache:
+    """
+    Bounded LRU cache of decode plans, keyed by (waspmote_id, payload size).
+    A cached plan is used only when the payload's sensor IDs match its layout,
+    otherwise the caller falls back to the generic decoder and compiles a new plan.
+
+    Attributes:
+        max_size (int): Maximum number of plans kept in the cache.
+        plans (OrderedDict): The cached plans, from the least to the most recently used.
+        hits (int): Number of payloads decoded by a cached plan.
+        misses (int): Number of payloads left to the generic decoder.
+        evictions (int): Number of plans discarded to respect max_size.
+    """
+
+    def __init__(self, max_size: int = 1024):
+        """
+        Constructor for PlanCache class.
+
+        Args:
+            max_size (int, optional): Maximum number of plans kept in the cache. Default is 1024.
+        """
+        self.max_size = max_size
+        self.plans = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def decode(self, key: tuple, view: memoryview, offset: int):
+        """
+        Decodes a payload with the plan cached for the given key.
+
+        Args:
+            key (tuple): The (waspmote_id, payload size) of the frame.
+            view (memoryview): The raw Libellium frame.
+            offset (int): The offset of the first byte of the payload.
+
+        Returns:
+            measurement.MeasurementSet | None: The measurements, or None on a cache miss or a layout change.
+        """
+        with self.lock:
+            plan = self.plans.get(key)
+            if plan is not None:
+                self.plans.move_to_end(key)
+
+        measurements = plan.unpack(view, offset) if plan is not None else None
+
+        with self.lock:
+            if measurements is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+
+        return measurements
+
+    def compile(self, key: tuple, measurements: list):
+        """
+        Compiles and caches the plan of a payload decoded by the generic decoder.
+        Layouts with variable-length fields are not cached.
+
+        Args:
+            key (tuple): The (waspmote_id, payload size) of the frame.
+            measurements (measurement.MeasurementSet): The measurements of the payload.
+        """
+        try:
+            plan = DecodePlan([measure[0] for measure in measurements])
+        except ValueError:
+            return
+
+        with self.lock:
+            self.plans[key] = plan
+            self.plans.move_to_end(key)
+            while len(self.plans) > self.max_size:
+                self.plans.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self) -> dict:
+        """
+        Returns the cache counters.
+        """
+        with self.lock:
+            return {
+                "size": len(self.plans),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions
+            }
@@ -0,0 +1,285 @@
+# ************************************** SENSOR REGISTRY MODULE **************************************
+
+import hashlib
+import json
+import os
+import pickle
+import threading
+import time
+import libellium.sensor as sensor
+import logs.logs as logs
+
+# The sensors' definitions, next to this module (not relative to the working directory)
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'sensor.json')
+
+# Compiled registries are cached next to the bytecode, in files named after the hash of 'sensor.json'.
+# The version is part of the name: change it whenever the Sensor class or the cached form changes.
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '__pycache__')
+CACHE_VERSION = 1
+
+# Field types accepted in 'sensor.json' ('int' sensors are described but cannot be decoded yet)
+FIELD_TYPES = tuple(sensor.STRUCT_FORMATS) + ('string', 'int')
+
+REQUIRED_FIELDS = {'name': str, 'binary_id': int, 'ascii_id': str, 'fields_type': str, 'number_of_fields': int}
+OPTIONAL_FIELDS = {'reference': str, 'tag': str, 'size_per_field': (int, str), 'default_decimal_precision': (int, str),
+                   'unit': str, 'deadband': (int, float), 'relative_deadband': (int, float), 'heartbeat': (int, float)}
+
+
+class InvalidSensorFile(Exception):
+    """
+    Exception raised when 'sensor.json' does not define a valid set of sensors.
+    """
+
+    def __init__(self, message="Invalid sensor file"):
+        """
+        Constructor for InvalidSensorFile exception.
+
+        Args:
+            message (str, optional): Custom error message. Defaults to "Invalid sensor file".
+        """
+        self.message = message
+        super().__init__(self.message)
+
+
+def validate(definitions) -> list:
+    """
+    Checks the sensors' definitions read from 'sensor.json'.
+
+    Args:
+        definitions: The parsed content of the file.
+
+    Returns:
+        list: The definitions, unchanged.
+
+    Raises:
+        InvalidSensorFile: If the content is not a list of sensors, a field is missing, unknown or of the wrong type,
+                           a binary ID is out of range or repeated, or a field type or size is not supported.
+    """
+    if not isinstance(definitions, list):
+        raise InvalidSensorFile("The sensor file must contain a list of sensors.")
+
+    binary_ids = set()
+    for number, definition in enumerate(definitions):
+        if not isinstance(definition, dict):
+            raise InvalidSensorFile(f"Sensor {number} is not an object.")
+        where = f"Sensor {number} ({definition.get('ascii_id', '?')})"
+
+        for field in REQUIRED_FIELDS:
+            if field not in definition:
+                raise InvalidSensorFile(f"{where}: missing field '{field}'.")
+        for field, value in definition.items():
+            kind = REQUIRED_FIELDS.get(field) or OPTIONAL_FIELDS.get(field)
+            if kind is None:
+                raise InvalidSensorFile(f"{where}: unknown field '{field}'.")
+            if not isinstance(value, kind) or isinstance(value, bool):
+                raise InvalidSensorFile(f"{where}: field '{field}' has the wrong type.")
+
+        binary_id = definition['binary_id']
+        if not 0 <= binary_id <= 255:
+            raise InvalidSensorFile(f"{where}: binary ID {binary_id} is not a byte.")
+        if binary_id in binary_ids:
+            raise InvalidSensorFile(f"{where}: binary ID {binary_id} is repeated.")
+        binary_ids.add(binary_id)
+
+        fields_type = definition['fields_type']
+        if fields_type not in FIELD_TYPES:
+            raise InvalidSensorFile(f"{where}: field type '{fields_type}' not supported. Use one of {FIELD_TYPES}.")
+        unpacker = sensor.STRUCT_FORMATS.get(fields_type)
+        if unpacker is not None and definition.get('size_per_field', unpacker.size) != unpacker.size:
+            raise InvalidSensorFile(f"{where}: a '{fields_type}' field is {unpacker.size} bytes long.")
+
+        for field in ('deadband', 'relative_deadband', 'heartbeat'):
+            if definition.get(field, 0) < 0:
+                raise InvalidSensorFile(f"{where}: field '{field}' cannot be negative.")
+
+    return definitions
+
+
+class SensorRegistry:
+    """
+    The sensors of 'sensor.json', indexed by binary ID, ASCII ID and tag. Nothing is read until the first lookup,
+    so importing the decoder is cheap and does not depend on the working directory.
+
+    The file is validated once: the Sensor objects built from it are pickled in the cache directory under the hash
+    of the file, so later processes (e.g. the decoder processes of the launcher) only hash and unpickle it.
+    A changed file has a new hash and is validated again. When two sensors share an ASCII ID or a tag
+    (e.g. the two STR sensors), the index keeps the first one of the file; both remain reachable by binary ID.
+
+    Attributes:
+        path (str): The path of 'sensor.json'.
+        cache_dir (str): The directory of the compiled registries, None to disable the cache.
+        source (str): Where the sensors were loaded from: 'cache' or 'file' (None until loaded).
+        load_seconds (float): Time taken to load the sensors.
+    """
+
+    def __init__(self, path: str = DEFAULT_PATH, cache_dir: str = DEFAULT_CACHE_DIR):
+        """
+        Constructor for SensorRegistry class (the file is only read on first use).
+
+        Args:
+            path (str, optional): The path of 'sensor.json'. Default is the file next to this module.
+            cache_dir (str, optional): The directory of the compiled registries, None to disable it. Default is '__pycache__'.
+        """
+        self.path = path
+        self.cache_dir = cache_dir
+        self.source = None
+        self.load_seconds = 0.0
+        self.lock = threading.Lock()
+        self.binary_ids = None
+        self.ascii_ids = None
+        self.tags = None
+
+    def cache_path(self, digest: str) -> str:
+        """
+        Returns the path of the compiled registry of a version of the file.
+
+        Args:
+            digest (str): The SHA-256 of the file.
+        """
+        return os.path.join(self.cache_dir, f"sensors.v{CACHE_VERSION}.{digest[:32]}.pickle")
+
+    def compile(self, data: bytes) -> list:
+        """
+        Validates the content of the file and builds its sensors.
+
+        Args:
+            data (bytes): The content of 'sensor.json'.
+
+        Returns:
+            list: The Sensor objects, in the order of the file.
+
+        Raises:
+            InvalidSensorFile: If the file is not valid JSON or does not define a valid set of sensors.
+        """
+        try:
+            definitions = json.loads(data)
+        except ValueError as e:
+            raise InvalidSensorFile(f"'{self.path}' is not valid JSON: {e}")
+        return [sensor.Sensor(**definition) for definition in validate(definitions)]
+
+    def read(self) -> list:
+        """
+        Returns the sensors of the file, from its compiled registry when there is one.
+        """
+        with open(self.path, 'rb') as file:
+            data = file.read()
+
+        if self.cache_dir is None:
+            self.source = 'file'
+            return self.compile(data)
+
+        cached = self.cache_path(hashlib.sha256(data).hexdigest())
+        try:
+            with open(cached, 'rb') as file:
+                sensors = pickle.load(file)
+            self.source = 'cache'
+            return sensors
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, TypeError):
+            pass
+
+        sensors = self.compile(data)
+        self.source = 'file'
+
+        # Written to a temporary file and renamed, so that concurrent processes never read a partial registry
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            temporary = f"{cached}.{os.getpid()}.tmp"
+            with open(temporary, 'wb') as file:
+                pickle.dump(sensors, file, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temporary, cached)
+        except OSError as e:
+            logs.get_logger('sensors').warning("Compiled sensor registry not cached: %s", e)
+        return sensors
+
+    def load(self):
+        """
+        Loads and indexes the sensors (only once, also when several threads ask for them at the same time).
+
+        Returns:
+            SensorRegistry: The registry itself.
+
+        Raises:
+            InvalidSensorFile: If 'sensor.json' is not valid.
+        """
+        if self.binary_ids is not None:
+            return self
+
+        with self.lock:
+            if self.binary_ids is None:
+                start = time.perf_counter()
+                sensors = self.read()
+
+                ascii_ids = {}
+                tags = {}
+                for loaded in sensors:
+                    ascii_ids.setdefault(loaded.ascii_id, loaded)
+                    if loaded.tag:
+                        tags.setdefault(loaded.tag, loaded)
+                self.ascii_ids = ascii_ids
+                self.tags = tags
+
+                self.load_seconds = time.perf_counter() - start
+                # Set last: the other threads only skip the lock once the indexes are complete
+                self.binary_ids = {loaded.binary_id: loaded for loaded in sensors}
+
+                logs.get_logger('sensors').debug("%d sensors loaded from %s in %.2f ms.", len(sensors), self.source,
+                                                 self.load_seconds * 1e3)
+        return self
+
+    @property
+    def by_binary_id(self) -> dict:
+        """
+        The sensors by binary ID: {binary_id: Sensor}.
+        """
+        return self.load().binary_ids
+
+    @property
+    def by_ascii_id(self) -> dict:
+        """
+        The sensors by ASCII ID: {ascii_id: Sensor}.
+        """
+        return self.load().ascii_ids
+
+    @property
+    def by_tag(self) -> dict:
+        """
+        The sensors by tag: {tag: Sensor}.
+        """
+        return self.load().tags
+
+    def __len__(self) -> int:
+        return len(self.by_binary_id)
+
+
+# The registry of the edge's 'sensor.json'
+REGISTRY = SensorRegistry()
+
+
+if __name__ == '__main__':
+    import subprocess
+    import sys
+    import tempfile
+
+    # Cold start of a new process: import only, first lookup reading the file, first lookup reading the cache
+    script = ("import time; start = time.perf_counter(); import libellium.libellium as libellium; "
+              "imported = time.perf_counter(); libellium.SENSORS[52]; "
+              "print(f'{(imported - start) * 1e3:.2f} {(time.perf_counter() - imported) * 1e3:.2f} "
+              "{libellium.registry.REGISTRY.source}')")
+    with tempfile.TemporaryDirectory() as directory:
+        environment = dict(os.environ, PYTHONDONTWRITEBYTECODE='1')
+        cold = (f"import libellium.registry as registry; "
+                f"registry.REGISTRY = registry.SensorRegistry(cache_dir={directory!r}); ")
+        for run in ('first', 'second'):
+            output = subprocess.run([sys.executable, '-c', cold + script], capture_output=True, text=True,
+                                    cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))), env=environment)
+            imported, loaded, source = output.stdout.split()
+            print(f"{run.capitalize()} process: import {imported} ms, first lookup {loaded} ms (from {source})")
+
+    registry = SensorRegistry(cache_dir=None).load()
+    runs = 1000000
+    for name, index, key in (("binary ID", registry.by_binary_id, 52), ("ASCII ID", registry.by_ascii_id, 'BAT'),
+                             ("tag", registry.by_tag, 'SENSOR_BAT')):
+        start = time.perf_counter()
+        for _ in range(runs):
+            index[key]
+        print(f"Lookup by {name}: {(time.perf_counter() - start) / runs * 1e9:.0f} ns")
@@ -1,4 +1,20 @@
 import json
+import struct
+import logs.logs as logs
+
+
+STRUCT_FORMATS = {
+    # Maps every supported numeric field type to its little-endian 'struct' unpacker.
+    'uint8_t': struct.Struct('<B'),
+    'uint16_t': struct.Struct('<H'),
+    'uint32_t': struct.Struct('<I'),
+    'uint64_t': struct.Struct('<Q'),
+    'float': struct.Struct('<f'),
+}
+
+# Smallest and largest magnitudes of a normal IEEE-754 single-precision float
+FLOAT_MIN_NORMAL = 1.1754943508222875e-38
+FLOAT_MAX = 3.4028234663852886e+38
 
 
 class Sensor:
@@ -16,8 +32,14 @@ class Sensor:
         size_per_field (int): Size per field in bytes.
         default_decimal_precision (int): Default decimal precision for floating-point fields.
         unit (str): Measurement unit of the sensor data.
+        deadband (float): Absolute change below which a new value is not reported (0 to report every value).
+        relative_deadband (float): Change below which a new value is not reported, as a fraction of the last reported one.
+        heartbeat (float): Max seconds without reporting a value, even if it did not change (0 for the filter's default).
     """
 
+    # Sensors are shared by every decoded frame: without a per-instance dict they are smaller and faster to read
+    __slots__ = ('name', 'reference', 'tag', 'binary_id', 'ascii_id', 'number_of_fields', 'fields_type', 'size_per_field',
+                 'default_decimal_precision', 'unit', 'deadband', 'relative_deadband', 'heartbeat')
 
     def __init__(
         self,
@@ -30,7 +52,10 @@ class Sensor:
         fields_type: str = '',
         size_per_field: int = 0,
         default_decimal_precision: int = 0,
-        unit: str = ''
+        unit: str = '',
+        deadband: float = 0,
+        relative_deadband: float = 0,
+        heartbeat: float = 0
     ):
         """
         Constructor for Sensor class.
@@ -46,6 +71,9 @@ class Sensor:
             size_per_field (int, optional): Size per field in bytes. Default is 0.
             default_decimal_precision (int, optional): Default decimal precision for floating-point fields. Default is 0.
             unit (str, optional): Measurement unit of the sensor data. Default is an empty string.
+            deadband (float, optional): Absolute change below which a new value is not reported. Default is 0.
+            relative_deadband (float, optional): Relative change below which a new value is not reported. Default is 0.
+            heartbeat (float, optional): Max seconds without reporting a value. Default is 0 (the filter's default).
         """
         self.name = name
         self.reference = reference
@@ -57,6 +85,9 @@ class Sensor:
         self.size_per_field = size_per_field
         self.default_decimal_precision = default_decimal_precision
         self.unit = unit
+        self.deadband = deadband
+        self.relative_deadband = relative_deadband
+        self.heartbeat = heartbeat
 
 
 
@@ -142,6 +173,51 @@ class Sensor:
             
 
 
+    def unpack_from(self, buffer, offset: int) -> tuple:
+
+        """
+        Decodes one measurement directly from a bytes-like frame, without tokenizing it.
+        It returns exactly the same values as 'string_convert' and 'little_endian_conversion'.
+
+        Args:
+            buffer (bytes | bytearray | memoryview): The raw Libellium frame.
+            offset (int): The position of the first byte of the measurement.
+
+        Returns:
+            tuple: The decoded measurement and the offset of the next byte in the frame.
+
+        Raises:
+            ValueError: If the data type is not supported or the frame ends before the measurement does.
+        """
+
+        if self.fields_type == "string":
+            # Read strings of variable length until '\0' (included, as 'string_convert' does)
+            end = offset
+            length = len(buffer)
+            while end < length:
+                end += 1
+                if buffer[end - 1] == 0:
+                    break
+            return bytes(buffer[offset:end]).decode('latin-1'), end
+
+        try:
+            unpacker = STRUCT_FORMATS[self.fields_type]
+        except KeyError:
+            raise ValueError(f"Unsupported data type '{self.fields_type}'. Use 'uint8_t', 'uint16_t', 'uint32_t', 'uint64_t' or 'float'.")
+
+        if offset + unpacker.size > len(buffer):
+            raise ValueError(f"Measurement of '{self.ascii_id}' exceeds the frame: {unpacker.size} bytes expected.")
+
+        value = unpacker.unpack_from(buffer, offset)[0]
+
+        # Zero, subnormal, infinite and NaN patterns are rebuilt as 'little_endian_conversion' does
+        if self.fields_type == 'float' and not FLOAT_MIN_NORMAL <= abs(value) <= FLOAT_MAX:
+            value = float_from_bits(STRUCT_FORMATS['uint32_t'].unpack_from(buffer, offset)[0])
+
+        return value, offset + unpacker.size
+
+
+
     def string_measure(self, measure) -> str:
 
         """
@@ -206,6 +282,24 @@ class UnexpectedTokenException(Exception):
 
 
 
+def float_from_bits(bits: int) -> float:
+    """
+    Rebuilds a single-precision float from its 32 bits with the formula used by 'little_endian_conversion',
+    which always assumes an implicit leading 1 and never yields zero, infinity or NaN.
+
+    Args:
+        bits (int): The 32 bits of the float as an unsigned integer.
+
+    Returns:
+        float: The converted floating-point value.
+    """
+    sign = -1 if bits >> 31 else 1
+    exponent = ((bits >> 23) & 0xFF) - 127
+    fraction = 1.0 + (bits & 0x7FFFFF) / 0x800000
+    return sign * fraction * 2 ** exponent
+
+
+
 def read_sensors(file_path):
     with open(file_path, 'r') as file:
         sensors = json.load(file)
@@ -216,6 +310,6 @@ def read_sensors(file_path):
             sensor = Sensor(**sensor_data)
             sensor_dict[binary_id] = sensor
 
-            print(str(sensor) + " read.")
+            logs.get_logger('sensors').debug("%s read.", sensor)
 
         return sensor_dict
\ No newline at end of file
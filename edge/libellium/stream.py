@@ -0,0 +1,163 @@
+# ************************************** STREAM MODULE **************************************
+
+STARTER = b"<=>"
+HEX_STARTER = b"3C3D3E"
+
+# Wire encodings: frames as hexadecimal text, as raw bytes, or detected from the first bytes of the stream
+ENCODINGS = ('hex', 'binary', 'auto')
+
+# Bytes kept while the encoding of an 'auto' stream is still unknown
+DETECTION_WINDOW = 64
+
+# Bytes before the payload counted by 'number_of_bytes': starter (3), frame type (1), number of bytes (1)
+HEADER_PREFIX_SIZE = 5
+
+
+class FrameSplitter:
+    """
+    Incremental splitter of a TCP stream into Libellium frames.
+    Frame boundaries are found from the '<=>' starter and the 'number_of_bytes' field of the header,
+    so frames split across TCP segments or sent back to back are rebuilt exactly.
+    Whatever the wire encoding, frames are always returned as raw bytes.
+
+    Attributes:
+        encoding (str): The wire encoding of the stream, one of ENCODINGS ('auto' until detected).
+        buffer (bytearray): Raw bytes received but not yet returned as frames (reused across feeds).
+        undetected (bytearray): Bytes received while the encoding is still unknown ('auto' streams only).
+        pending (bytes): Trailing hexadecimal digit not yet paired with the next one (hexadecimal streams only).
+        frames (int): Number of frames returned so far.
+        discarded (int): Number of bytes dropped while looking for a starter.
+    """
+
+    def __init__(self, encoding: str = 'hex'):
+        """
+        Constructor for FrameSplitter class.
+
+        Args:
+            encoding (str, optional): The wire encoding of the stream, one of ENCODINGS. Default is 'hex'.
+
+        Raises:
+            ValueError: If the encoding is not supported.
+        """
+        if encoding not in ENCODINGS:
+            raise ValueError(f"Encoding '{encoding}' not supported. Use one of {ENCODINGS}.")
+
+        self.encoding = encoding
+        self.buffer = bytearray()
+        self.undetected = bytearray()
+        self.pending = b''
+        self.frames = 0
+        self.discarded = 0
+
+    def decode_hex(self, data) -> bytes:
+        """
+        Converts a chunk of hexadecimal text into raw bytes, keeping an odd trailing digit for the next chunk.
+
+        Args:
+            data (bytes | bytearray | memoryview): The received chunk.
+
+        Returns:
+            bytes: The raw bytes of all the complete hexadecimal pairs.
+        """
+        text = self.pending + bytes(data).translate(None, b" \t\r\n")
+
+        even = len(text) - (len(text) % 2)
+        self.pending = text[even:]
+
+        try:
+            return bytes.fromhex(text[:even].decode('ascii'))
+        except ValueError:
+            # Not hexadecimal text: drop the chunk and resynchronize on the next starter
+            self.discarded += even // 2
+            self.pending = b''
+            return b''
+
+    def detect(self, data):
+        """
+        Detects the encoding of an 'auto' stream from the first starter found in it.
+
+        Args:
+            data (bytes | bytearray | memoryview): The received chunk.
+
+        Returns:
+            bytes | None: All the data received so far once the encoding is known, None otherwise.
+        """
+        self.undetected += data
+
+        binary_start = self.undetected.find(STARTER)
+        hex_start = self.undetected.upper().find(HEX_STARTER)
+
+        if binary_start < 0 and hex_start < 0:
+            if len(self.undetected) > DETECTION_WINDOW:
+                keep = len(HEX_STARTER) - 1
+                self.discarded += len(self.undetected) - keep
+                del self.undetected[:len(self.undetected) - keep]
+            return None
+
+        if hex_start < 0 or 0 <= binary_start < hex_start:
+            self.encoding = 'binary'
+            start = binary_start
+        else:
+            self.encoding = 'hex'
+            start = hex_start
+
+        # Anything before the first starter is dropped, it could not be decoded with either encoding
+        self.discarded += start
+        data = bytes(self.undetected[start:])
+        self.undetected.clear()
+        return data
+
+    def feed(self, data):
+        """
+        Appends received data to the buffer and yields every frame completed by it.
+
+        Args:
+            data (bytes | bytearray | memoryview): The received chunk.
+
+        Yields:
+            bytes: The raw bytes of each complete Libellium frame.
+        """
+        if self.encoding == 'auto':
+            data = self.detect(data)
+            if data is None:
+                return
+
+        if self.encoding == 'hex':
+            data = self.decode_hex(data)
+        self.buffer += data
+
+        buffer = self.buffer
+        while True:
+            start = buffer.find(STARTER)
+
+            if start < 0:
+                # Keep only what could be the beginning of a starter split across chunks
+                keep = len(STARTER) - 1
+                if len(buffer) > keep:
+                    self.discarded += len(buffer) - keep
+                    del buffer[:len(buffer) - keep]
+                return
+
+            if start > 0:
+                self.discarded += start
+                del buffer[:start]
+
+            if len(buffer) < HEADER_PREFIX_SIZE:
+                return
+
+            size = HEADER_PREFIX_SIZE + buffer[HEADER_PREFIX_SIZE - 1]
+            if len(buffer) < size:
+                return
+
+            frame = bytes(buffer[:size])
+            del buffer[:size]
+            self.frames += 1
+            yield frame
+
+    def reset(self):
+        """
+        Drops any partial frame, e.g. when the connection is closed.
+        """
+        self.buffer.clear()
+        self.undetected.clear()
+        self.pending = b''
@@ -0,0 +1,549 @@
+# ************************************** LOAD GENERATOR MODULE **************************************
+
+import argparse
+import json
+import math
+import random
+import struct
+import threading
+import time
+import urllib.request
+import libellium.libellium as libellium
+import libellium.sensor as sensor
+import capture.replay as replay
+import wire.wire as wire
+
+# Frame types of the generated frames: routine Information frames, and Alarm frames for 'alarm_ratio' of them
+INFORMATION = 0x06
+ALARM = 0x03
+
+# The battery level is always sent (the fleet table tracks it); a string sensor carries the latency marker
+BATTERY_ID = 52
+MARKER_ID = 61
+MARKER_PREFIX = 'lg'
+
+# Max size of a frame: the number of bytes after the header is a single byte
+MAX_FRAME_BYTES = 5 + 255
+
+# Histogram scraped from the TCP module when latencies cannot be measured through the broker
+FRAME_SECONDS = 'edge_frame_seconds'
+
+
+def payload_sensors(sensors: dict = None) -> list:
+    """
+    Returns the sensors that can appear in a generated payload: single-field sensors of a type
+    the decoders support (numbers and strings), one per ASCII ID, without the battery and the marker.
+
+    Args:
+        sensors (dict, optional): The sensors: {binary_id: Sensor}. Default is the sensors of 'sensor.json'.
+    """
+    sensors = sensors if sensors is not None else libellium.SENSORS
+    seen = {sensors[BATTERY_ID].ascii_id, sensors[MARKER_ID].ascii_id}
+    result = []
+    for binary_id in sorted(sensors):
+        candidate = sensors[binary_id]
+        supported = candidate.fields_type in sensor.STRUCT_FORMATS or candidate.fields_type == 'string'
+        if supported and candidate.number_of_fields == 1 and candidate.ascii_id not in seen:
+            seen.add(candidate.ascii_id)
+            result.append(candidate)
+    return result
+
+
+class Node:
+    """
+    A simulated Waspmote: a fixed payload layout and its own sequence numbers and battery level.
+
+    Attributes:
+        serial_id (int): The serial ID of the node.
+        waspmote_id (str): The Waspmote ID of the node.
+        layout (list): The sensors of its payload, in order.
+        sequence (int): The sequence number of its next frame.
+        battery (int): Its battery level.
+        random (random.Random): Its own random generator, for reproducible values.
+    """
+
+    __slots__ = ('serial_id', 'waspmote_id', 'layout', 'sequence', 'battery', 'random')
+
+    def __init__(self, serial_id: int, waspmote_id: str, layout: list, seed: int):
+        """
+        Constructor for Node class.
+
+        Args:
+            serial_id (int): The serial ID of the node.
+            waspmote_id (str): The Waspmote ID of the node.
+            layout (list): The sensors of its payload, in order.
+            seed (int): The seed of its random generator.
+        """
+        self.serial_id = serial_id
+        self.waspmote_id = waspmote_id
+        self.layout = layout
+        self.random = random.Random(seed)
+        self.sequence = self.random.randrange(256)
+        self.battery = self.random.randint(20, 100)
+
+
+class FrameBuilder:
+    """
+    Builds valid binary Libellium frames from the sensors of 'sensor.json'. Every node gets a random payload layout
+    (kept for all its frames, as a real Waspmote does) and random values; sequence numbers increase and wrap around.
+    The same seed always yields the same nodes and frames.
+
+    Attributes:
+        sensors (list): The sensors that can appear in a payload.
+        seed (int): The seed of the layouts and values.
+        min_sensors (int): Min number of sensors per layout (besides the battery).
+        max_sensors (int): Max number of sensors per layout (besides the battery).
+    """
+
+    def __init__(self, seed: int = 0, min_sensors: int = 3, max_sensors: int = 10, sensors: dict = None):
+        """
+        Constructor for FrameBuilder class.
+
+        Args:
+            seed (int, optional): The seed of the layouts and values. Default is 0.
+            min_sensors (int, optional): Min number of sensors per layout. Default is 3.
+            max_sensors (int, optional): Max number of sensors per layout. Default is 10.
+            sensors (dict, optional): The sensors: {binary_id: Sensor}. Default is the sensors of 'sensor.json'.
+        """
+        self.sensors = payload_sensors(sensors)
+        self.seed = seed
+        self.min_sensors = min_sensors
+        self.max_sensors = min(max_sensors, len(self.sensors))
+
+    def node(self, number: int) -> Node:
+        """
+        Returns the simulated node of the given number (the same one for the same seed).
+
+        Args:
+            number (int): The number of the node, from 0.
+        """
+        rng = random.Random(f"{self.seed}:{number}")
+        layout = rng.sample(self.sensors, rng.randint(self.min_sensors, self.max_sensors))
+        return Node(0x4000000000000000 + number, f"lg_{number:05d}", layout, rng.getrandbits(32))
+
+    def value(self, rng: random.Random, measured: sensor.Sensor) -> bytes:
+        """
+        Returns a random value of a sensor, encoded as the Waspmote sends it (little endian, strings ending with '\\0').
+
+        Args:
+            rng (random.Random): The random generator.
+            measured (sensor.Sensor): The sensor.
+        """
+        if measured.fields_type == 'string':
+            return ''.join(rng.choice('abcdefghijklmnopqrstuvwxyz0123456789') for _ in range(rng.randint(1, 8))).encode() + b'\0'
+        if measured.fields_type == 'float':
+            # Normal floats only: both decoders return them unchanged
+            return struct.pack('<f', rng.choice((-1, 1)) * rng.uniform(0.01, 1000))
+        unpacker = sensor.STRUCT_FORMATS[measured.fields_type]
+        return unpacker.pack(rng.getrandbits(8 * unpacker.size))
+
+    def build(self, node: Node, marker: str = None, frame_type: int = INFORMATION) -> bytes:
+        """
+        Builds the next frame of a node.
+
+        Args:
+            node (Node): The node.
+            marker (str, optional): If given, a value of the marker sensor (STR) identifying the frame. Default is None.
+            frame_type (int, optional): The frame type. Default is INFORMATION.
+
+        Returns:
+            bytes: The raw frame.
+        """
+        rng = node.random
+        node.battery = max(0, min(100, node.battery + rng.choice((-1, 0, 0, 0))))
+
+        payload = [bytes([BATTERY_ID, node.battery])]
+        if marker is not None:
+            payload.append(bytes([MARKER_ID]) + marker.encode('ascii') + b'\0')
+        for measured in node.layout:
+            payload.append(bytes([measured.binary_id]) + self.value(rng, measured))
+
+        body = (node.serial_id.to_bytes(8, 'big') + node.waspmote_id.encode('ascii') + b'#'
+                + bytes([node.sequence]) + b''.join(payload))
+        node.sequence = (node.sequence + 1) % 256
+
+        if len(body) > MAX_FRAME_BYTES - 5:
+            raise ValueError(f"Frame of {node.waspmote_id} too long ({len(body) + 5} bytes): use fewer sensors.")
+        return b'<=>' + bytes([frame_type, len(body)]) + body
+
+
+def quantile(values: list, q: float) -> float:
+    """
+    Returns a quantile of sorted values (nearest rank), or None if there are none.
+
+    Args:
+        values (list): The sorted values.
+        q (float): The quantile, between 0 and 1.
+    """
+    if not values:
+        return None
+    return values[min(len(values) - 1, max(0, math.ceil(q * len(values)) - 1))]
+
+
+def histogram_quantile(bounds: list, counts: list, q: float) -> float:
+    """
+    Returns a quantile of a histogram, interpolated linearly inside its bucket (as Prometheus does),
+    or None if the histogram is empty. Values above the last bound are reported as the last bound.
+
+    Args:
+        bounds (list): The upper bounds of the buckets, in increasing order.
+        counts (list): The count of every bucket (not cumulative), plus the count above the last bound.
+        q (float): The quantile, between 0 and 1.
+    """
+    total = sum(counts)
+    if total == 0:
+        return None
+
+    rank = q * total
+    cumulative = 0
+    for number, count in enumerate(counts):
+        if count and cumulative + count >= rank:
+            if number == len(bounds):
+                return bounds[-1]
+            lower = bounds[number - 1] if number > 0 else 0.0
+            return lower + (bounds[number] - lower) * (rank - cumulative) / count
+        cumulative += count
+    return bounds[-1]
+
+
+def scrape(url: str, name: str = FRAME_SECONDS) -> tuple:
+    """
+    Reads a histogram from a Prometheus endpoint, e.g. the edge's /metrics.
+
+    Args:
+        url (str): The URL of the endpoint.
+        name (str, optional): The name of the histogram. Default is FRAME_SECONDS.
+
+    Returns:
+        tuple: The upper bounds of its buckets and their counts (not cumulative), plus the count above the last bound.
+    """
+    with urllib.request.urlopen(url, timeout=5) as response:
+        text = response.read().decode()
+
+    cumulative = {}
+    for line in text.splitlines():
+        if line.startswith(name + '_bucket{'):
+            labels, value = line.rsplit(' ', 1)
+            bound = labels.split('le="', 1)[1].split('"', 1)[0]
+            bound = float('inf') if bound == '+Inf' else float(bound)
+            cumulative[bound] = cumulative.get(bound, 0) + float(value)
+
+    bounds = sorted(cumulative)
+    counts = []
+    previous = 0
+    for bound in bounds:
+        counts.append(cumulative[bound] - previous)
+        previous = cumulative[bound]
+    if bounds and bounds[-1] == float('inf'):
+        bounds.pop()
+    else:
+        counts.append(0)
+    return bounds, counts
+
+
+class LatencyProbe:
+    """
+    Measures the end-to-end latency of the generated frames: the time from their sending to the reception of
+    their record from the broker. Every frame carries a unique marker in its STR measurement; a subscriber to the
+    measurements topic matches the published records (JSON or compact) with the markers sent. With per-sensor topics,
+    it subscribes to the STR topic, whose JSON messages are the measurement itself: {"value", "unit", ...}.
+
+    Attributes:
+        sent (dict): The send time of the frames not received yet: {marker: time.perf_counter()}.
+        latencies (list): The latencies of the received frames, in seconds.
+        unknown (int): Number of records received without a known marker.
+    """
+
+    def __init__(self, broker: str, port: int, topic: str):
+        """
+        Constructor for LatencyProbe class.
+
+        Args:
+            broker (str): The address of the MQTT broker.
+            port (int): The port of the MQTT broker.
+            topic (str): The topic of the measurements.
+        """
+        import paho.mqtt.client as mqtt
+
+        self.sent = {}
+        self.latencies = []
+        self.unknown = 0
+        self.lock = threading.Lock()
+        self.connected = threading.Event()
+        self.topic = topic
+
+        if hasattr(mqtt, "CallbackAPIVersion"):
+            self.client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION1)
+        else:
+            self.client = mqtt.Client()
+        self.client.on_connect = self.on_connect
+        self.client.on_message = self.on_message
+        self.client.connect(broker, port)
+        self.client.loop_start()
+
+    def on_connect(self, client, userdata, flags, rc):
+        if rc == 0:
+            client.subscribe(self.topic, qos=0)
+            self.connected.set()
+
+    def on_message(self, client, userdata, msg):
+        now = time.perf_counter()
+        try:
+            records = wire.to_json_records(msg.payload)
+        except (ValueError, wire.WireFormatError):
+            return
+
+        with self.lock:
+            for record in records:
+                measure = record["data"].get("STR", {}) if "data" in record else record
+                marker = measure.get("value", "").rstrip('\0')
+                start = self.sent.pop(marker, None)
+                if start is None:
+                    self.unknown += 1
+                else:
+                    self.latencies.append(now - start)
+
+    def mark(self, marker: str):
+        """
+        Records the send time of a frame.
+        """
+        with self.lock:
+            self.sent[marker] = time.perf_counter()
+
+    def wait(self, timeout: float):
+        """
+        Waits until every frame sent was received, or for at most 'timeout' seconds.
+        """
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            with self.lock:
+                if not self.sent:
+                    return
+            time.sleep(0.05)
+
+    def close(self):
+        self.client.loop_stop()
+        self.client.disconnect()
+
+
+class LoadGenerator:
+    """
+    Simulates a fleet of Waspmotes sending frames to a TCP module through gateways. Each gateway is a thread
+    owning 'nodes / gateways' nodes and 'connections' TCP connections; it sends the frames of its nodes in turn,
+    round robin over its connections, so that the whole fleet sends 'rate' frames per second.
+    When a gateway falls behind the schedule it sends without pausing and its lag is reported.
+
+    Attributes:
+        host (str): The address of the TCP module.
+        port (int): The port of the TCP module.
+        gateways (int): Number of gateways.
+        connections (int): Number of connections per gateway.
+        rate (float): Frames per second sent by the whole fleet (0 for as fast as possible).
+        builder (FrameBuilder): Builds the frames of the nodes.
+        nodes (list): The simulated nodes.
+        encoding (str): 'hex' or 'binary', as the ingest mode of the port.
+        alarm_ratio (float): Fraction of the frames sent as Alarm frames.
+        probe (LatencyProbe): Matches the published records with the frames sent. Default is None (no matching).
+    """
+
+    def __init__(self, host: str, port: int, builder: FrameBuilder, nodes: int = 100, gateways: int = 1,
+                 connections: int = 1, rate: float = 1000, encoding: str = 'hex', alarm_ratio: float = 0, probe=None):
+        """
+        Constructor for LoadGenerator class.
+
+        Args:
+            host (str): The address of the TCP module.
+            port (int): The port of the TCP module.
+            builder (FrameBuilder): Builds the frames of the nodes.
+            nodes (int, optional): Number of simulated nodes. Default is 100.
+            gateways (int, optional): Number of gateways. Default is 1.
+            connections (int, optional): Number of connections per gateway. Default is 1.
+            rate (float, optional): Frames per second of the whole fleet (0 for maximum speed). Default is 1000.
+            encoding (str, optional): 'hex' or 'binary'. Default is 'hex'.
+            alarm_ratio (float, optional): Fraction of the frames sent as Alarm frames. Default is 0.
+            probe (LatencyProbe, optional): Matches the published records with the frames sent. Default is None.
+        """
+        self.host = host
+        self.port = port
+        self.builder = builder
+        self.nodes = [builder.node(number) for number in range(nodes)]
+        self.gateways = gateways
+        self.connections = connections
+        self.rate = rate
+        self.encoding = encoding
+        self.alarm_ratio = alarm_ratio
+        self.probe = probe
+        self.lock = threading.Lock()
+        self.sent = 0
+        self.bytes = 0
+        self.errors = 0
+        self.max_lag = 0.0
+
+    def gateway(self, number: int, duration: float, start: float):
+        """
+        Body of a gateway thread: sends the frames of its nodes until 'duration' seconds after 'start'.
+
+        Args:
+            number (int): The number of the gateway.
+            duration (float): Seconds of load.
+            start (float): Monotonic time of the start of the load.
+        """
+        nodes = self.nodes[number::self.gateways]
+        if not nodes:
+            return
+        rng = random.Random(f"{self.builder.seed}:gateway:{number}")
+        sender = replay.Replayer(None, self.host, self.port, 0, self.encoding, self.connections)
+        interval = self.gateways / self.rate if self.rate > 0 else 0
+        max_lag = 0.0
+        count = 0
+
+        while True:
+            due = start + count * interval
+            now = time.monotonic()
+            if now - start >= duration:
+                break
+            if due > now:
+                time.sleep(due - now)
+            else:
+                max_lag = max(max_lag, now - due)
+
+            node = nodes[count % len(nodes)]
+            frame_type = ALARM if self.alarm_ratio and rng.random() < self.alarm_ratio else INFORMATION
+            marker = None
+            if self.probe is not None:
+                marker = f"{MARKER_PREFIX}{number:03x}{count:010x}"
+            frame = self.builder.build(node, marker, frame_type)
+            if marker is not None:
+                self.probe.mark(marker)
+            sender.send(count % self.connections, replay.encode(frame, self.encoding))
+            count += 1
+
+        for sock in sender.sockets:
+            if sock is not None:
+                sock.close()
+        with self.lock:
+            self.sent += sender.sent
+            self.bytes += sender.bytes
+            self.errors += sender.errors
+            self.max_lag = max(self.max_lag, max_lag)
+
+    def run(self, duration: float) -> dict:
+        """
+        Sends the load for 'duration' seconds.
+
+        Returns:
+            dict: The frames and bytes sent, the errors, the achieved throughput and the max lag of the gateways.
+        """
+        start = time.monotonic()
+        threads = [threading.Thread(target=self.gateway, args=(number, duration, start), daemon=True)
+                   for number in range(self.gateways)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.monotonic() - start
+
+        return {
+            "nodes": len(self.nodes),
+            "gateways": self.gateways,
+            "connections": self.gateways * self.connections,
+            "target_frames_per_second": self.rate or None,
+            "sent": self.sent,
+            "errors": self.errors,
+            "bytes": self.bytes,
+            "elapsed_seconds": round(elapsed, 3),
+            "frames_per_second": round(self.sent / elapsed, 1) if elapsed > 0 else None,
+            "max_lag_seconds": round(self.max_lag, 3)
+        }
+
+
+def latency_report(latencies: list) -> dict:
+    """
+    Returns the count, p50, p99, p999 and max of latencies in seconds, in milliseconds.
+    """
+    latencies = sorted(latencies)
+    report = {"count": len(latencies)}
+    for name, q in (("p50", 0.5), ("p99", 0.99), ("p999", 0.999), ("max", 1.0)):
+        value = quantile(latencies, q)
+        report[f"{name}_ms"] = round(value * 1e3, 3) if value is not None else None
+    return report
+
+
+def histogram_report(before: tuple, after: tuple) -> dict:
+    """
+    Returns the count, p50, p99 and p999 of the observations of a histogram between two scrapes, in milliseconds.
+    """
+    bounds, counts = after
+    if before[0] == bounds:
+        counts = [now - then for now, then in zip(counts, before[1])]
+    report = {"count": int(sum(counts))}
+    for name, q in (("p50", 0.5), ("p99", 0.99), ("p999", 0.999)):
+        value = histogram_quantile(bounds, counts, q) if bounds else None
+        report[f"{name}_ms"] = round(value * 1e3, 3) if value is not None else None
+    return report
+
+
+if __name__ == '__main__':
+    import config as config
+
+    parser = argparse.ArgumentParser(description="Sends synthetic Waspmote frames to a TCP module and reports "
+                                                 "its throughput and end-to-end latency.")
+    parser.add_argument('--host', default='127.0.0.1', help="address of the TCP module (default 127.0.0.1)")
+    parser.add_argument('--port', type=int, default=int(config.PORT_NUMBER), help="port of the TCP module")
+    parser.add_argument('--encoding', choices=('hex', 'binary'), default='hex', help="ingest mode of the port (default hex)")
+    parser.add_argument('--nodes', type=int, default=1000, help="number of simulated nodes (default 1000)")
+    parser.add_argument('--gateways', type=int, default=4, help="number of gateways (default 4)")
+    parser.add_argument('--connections', type=int, default=1, help="connections per gateway (default 1)")
+    parser.add_argument('--rate', type=float, default=1000, help="frames per second of the fleet, 0 for max (default 1000)")
+    parser.add_argument('--duration', type=float, default=10, help="seconds of load (default 10)")
+    parser.add_argument('--seed', type=int, default=0, help="seed of the layouts and values (default 0)")
+    parser.add_argument('--alarm-ratio', type=float, default=0, help="fraction of Alarm frames (default 0)")
+    parser.add_argument('--latency', choices=('mqtt', 'metrics', 'none'), default='mqtt',
+                        help="'mqtt': frames matched on the measurements topic of the broker (default), "
+                             "'metrics': edge_frame_seconds scraped from the module's /metrics")
+    parser.add_argument('--broker', default=config.BROKER_IP_ADDRESS, help="address of the MQTT broker")
+    parser.add_argument('--broker-port', type=int, default=int(config.BROKER_PORT_NUMBER), help="port of the MQTT broker")
+    parser.add_argument('--metrics-url', default=f"http://{config.METRICS_IP_ADDRESS}:{config.METRICS_PORT_NUMBER}/metrics",
+                        help="metrics endpoint of the TCP module")
+    parser.add_argument('--drain', type=float, default=5, help="max seconds to wait for the last records (default 5)")
+    args = parser.parse_args()
+
+    probe = None
+    before = None
+    if args.latency == 'mqtt':
+        try:
+            topic = config.TOPIC_MEASUREMENTS if config.MQTT_TOPIC_MODE != 'sensor' else f"{config.TOPIC_MEASUREMENTS}/STR"
+            probe = LatencyProbe(args.broker, args.broker_port, topic)
+        except OSError:
+            probe = None
+        if probe is None or not probe.connected.wait(5):
+            raise SystemExit(f"[LOADGEN] Broker <{args.broker}, {args.broker_port}> not reachable: use --latency metrics.")
+    elif args.latency == 'metrics':
+        before = scrape(args.metrics_url)
+
+    generator = LoadGenerator(args.host, args.port, FrameBuilder(args.seed), args.nodes, args.gateways,
+                              args.connections, args.rate, args.encoding, args.alarm_ratio, probe)
+    print(f"[LOADGEN] {args.nodes} nodes, {args.gateways} gateways x {args.connections} connections to "
+          f"<{args.host}, {args.port}> ({args.encoding}), {args.rate:g} frames/s for {args.duration:g} s")
+    report = generator.run(args.duration)
+
+    if probe is not None:
+        probe.wait(args.drain)
+        probe.close()
+        report["latency"] = latency_report(probe.latencies)
+        report["latency"]["lost"] = len(probe.sent)
+        report["delivered_frames_per_second"] = round(len(probe.latencies) / report["elapsed_seconds"], 1)
+    elif before is not None:
+        # Published frames keep coming in until the pipeline is drained
+        after = scrape(args.metrics_url)
+        deadline = time.monotonic() + args.drain
+        while time.monotonic() < deadline:
+            time.sleep(0.5)
+            latest = scrape(args.metrics_url)
+            if sum(latest[1]) == sum(after[1]):
+                break
+            after = latest
+        report["latency"] = histogram_report(before, after)
+        report["delivered_frames_per_second"] = round(report["latency"]["count"] / report["elapsed_seconds"], 1)
+
+    print(json.dumps(report, indent=4))
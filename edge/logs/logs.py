@@ -0,0 +1,220 @@
+# ************************************** LOGS MODULE **************************************
+
+import itertools
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+
+ROOT = 'edge'
+FORMAT = '%(asctime)s %(levelname)s [%(name)s] %(message)s'
+
+
+def parse_sampling(text: str) -> dict:
+    """
+    Parses sampling rates written as 'class:N' separated by commas, e.g. 'frames:1000,records:100'
+    (one message out of N of that class is logged).
+
+    Args:
+        text (str): The sampling rates.
+
+    Returns:
+        dict: The rates: {class: N}.
+
+    Raises:
+        ValueError: If a rate is malformed.
+    """
+    rates = {}
+    for entry in text.split(','):
+        entry = entry.strip()
+        if entry == '':
+            continue
+
+        try:
+            name, every = entry.split(':')
+            every = int(every)
+            if every < 1:
+                raise ValueError
+        except ValueError:
+            raise ValueError(f"Malformed sampling rate '{entry}': use 'class:N' with N >= 1.")
+        rates[name.strip()] = every
+
+    return rates
+
+
+class SampledLogger:
+    """
+    Logger of a class of messages (e.g. frame dumps) that only logs one message out of 'every'.
+    Both the level and the sampling are checked before the message is built: the arguments are only
+    formatted (e.g. a frame's __str__ through '%s') for the messages that are actually logged.
+
+    Attributes:
+        logger (logging.Logger): The underlying logger, 'edge.<class>'.
+        every (int): One message out of 'every' is logged (1 logs them all).
+    """
+
+    __slots__ = ('logger', 'every', 'counter')
+
+    def __init__(self, name: str, every: int = 1):
+        """
+        Constructor for SampledLogger class.
+
+        Args:
+            name (str): The class of messages.
+            every (int, optional): One message out of 'every' is logged. Default is 1 (all).
+        """
+        self.logger = logging.getLogger(f"{ROOT}.{name}")
+        self.every = every
+        self.counter = itertools.count()
+
+    def log(self, level: int, message: str, *args):
+        """
+        Logs a message if its level is enabled and it is sampled.
+
+        Args:
+            level (int): The level of the message.
+            message (str): The message, with '%' placeholders for the arguments.
+            *args: The arguments of the message, formatted lazily.
+        """
+        if not self.logger.isEnabledFor(level):
+            return
+        # next() on an itertools.count is atomic, so concurrent threads never log the same sample twice
+        if self.every > 1 and next(self.counter) % self.every:
+            return
+        self.logger.log(level, message, *args)
+
+    def debug(self, message: str, *args):
+        self.log(logging.DEBUG, message, *args)
+
+    def info(self, message: str, *args):
+        self.log(logging.INFO, message, *args)
+
+    def warning(self, message: str, *args):
+        self.log(logging.WARNING, message, *args)
+
+    def error(self, message: str, *args):
+        self.log(logging.ERROR, message, *args)
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """
+    Queue handler that never blocks the logging thread: when the bounded queue is full
+    (the output is slower than the producers), the record is dropped and counted.
+
+    Attributes:
+        dropped (int): Number of records dropped because the queue was full.
+    """
+
+    def __init__(self, queue_size: int):
+        """
+        Constructor for DroppingQueueHandler class.
+
+        Args:
+            queue_size (int): Capacity of the queue.
+        """
+        super().__init__(queue.Queue(maxsize=queue_size))
+        self.dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+LOGGERS = {}
+HANDLER = None
+LISTENER = None
+# The process that started the listener: a forked child inherits the handler, not the listener's thread
+PID = None
+
+
+def get_logger(name: str) -> SampledLogger:
+    """
+    Returns the logger of a class of messages, created on first use. Its sampling rate is set by configure.
+
+    Args:
+        name (str): The class of messages, e.g. 'frames'.
+    """
+    logger = LOGGERS.get(name)
+    if logger is None:
+        logger = LOGGERS.setdefault(name, SampledLogger(name))
+    return logger
+
+
+def configure(level: str = 'INFO', sampling: dict = None, queue_size: int = 10000, stream=None):
+    """
+    Sets the level and the sampling rates of the edge's logs, and writes them to the stream from a background
+    thread through a bounded queue (only once per process: later calls just update the level and the rates).
+
+    Args:
+        level (str, optional): The minimum level, e.g. 'DEBUG', 'INFO' or 'WARNING'. Default is 'INFO'.
+        sampling (dict, optional): The sampling rates: {class: N}. Default is None (log every message).
+        queue_size (int, optional): Capacity of the queue in front of the output. Default is 10000.
+        stream (file, optional): The output. Default is the standard output.
+    """
+    global HANDLER, LISTENER, PID
+
+    root = logging.getLogger(ROOT)
+    root.setLevel(level.upper())
+    for name, every in (sampling or {}).items():
+        get_logger(name).every = every
+
+    if HANDLER is not None:
+        if PID == os.getpid():
+            return
+        root.removeHandler(HANDLER)
+
+    output = logging.StreamHandler(stream or sys.stdout)
+    output.setFormatter(logging.Formatter(FORMAT))
+
+    HANDLER = DroppingQueueHandler(queue_size)
+    root.addHandler(HANDLER)
+    root.propagate = False
+
+    LISTENER = logging.handlers.QueueListener(HANDLER.queue, output)
+    LISTENER.start()
+    PID = os.getpid()
+
+
+def stats() -> dict:
+    """
+    Returns the number of log records dropped because the output was too slow.
+    """
+    return {"dropped": HANDLER.dropped if HANDLER is not None else 0}
+
+
+if __name__ == '__main__':
+    import io
+    import time
+    import libellium.libellium as libellium
+
+    frame = bytes.fromhex("3C3D3E06451B20B4BD3C195E206E6F64655F3031231434641500000000006185EB3F0100000000"
+                          "046179913E4A7B14C4414C005462424DBFD0C647460000000047000000004800000000")
+    measurement = libellium.Libellium(frame)
+    measurement.parse()
+    runs = 100000
+
+    start = time.perf_counter()
+    for _ in range(runs // 100):
+        str(measurement)
+    print(f"Formatting a frame: {(time.perf_counter() - start) / (runs // 100) * 1e6:.2f} us")
+
+    output = io.StringIO()
+    configure('INFO', {'frames': 1000}, stream=output)
+    frames = get_logger('frames')
+
+    start = time.perf_counter()
+    for _ in range(runs):
+        frames.info("%s", measurement)
+    print(f"Sampled frame dump (1/1000): {(time.perf_counter() - start) / runs * 1e6:.2f} us per frame")
+
+    configure('WARNING')
+    start = time.perf_counter()
+    for _ in range(runs):
+        frames.info("%s", measurement)
+    print(f"Filtered frame dump: {(time.perf_counter() - start) / runs * 1e6:.2f} us per frame")
+
+    LISTENER.stop()
+    print(f"{output.getvalue().count('Frame:')} frames logged out of {2 * runs}, {stats()['dropped']} dropped")
@@ -0,0 +1,494 @@
+# ************************************** METRICS MODULE **************************************
+
+import bisect
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+# Upper bounds in seconds of the buckets of the latency histograms (from 50 us to 10 s)
+LATENCY_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+                   0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+# Label values beyond this number of series per metric are counted under 'other'
+MAX_SERIES = 1024
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def label_text(names: tuple, values: tuple) -> str:
+    """
+    Renders label values in the Prometheus text format, e.g. 'stage="decode"'.
+
+    Args:
+        names (tuple): The label names.
+        values (tuple): The label values.
+    """
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for value in values)
+    return ",".join(f'{name}="{value}"' for name, value in zip(names, escaped))
+
+
+class Metric:
+    """
+    Base of the metrics: a name, a help text, label names and one series per combination of label values.
+    To keep recording cheap, every thread records into its own shard without taking a lock;
+    shards are only summed when a snapshot is taken.
+
+    Attributes:
+        registry (Registry): The registry the metric belongs to.
+        name (str): The name of the metric.
+        help (str): The description of the metric.
+        labels (tuple): The label names.
+        series (dict): The series: {label values: rendered labels}.
+        shards (list): The (thread, shard) of every thread, a shard being {label values: values}.
+        retired (dict): The values of the threads that ended, folded into a single shard.
+    """
+
+    type = ''
+
+    def __init__(self, registry, name: str, help: str, labels: tuple = ()):
+        """
+        Constructor for Metric class.
+
+        Args:
+            registry (Registry): The registry the metric belongs to.
+            name (str): The name of the metric.
+            help (str): The description of the metric.
+            labels (tuple, optional): The label names. Default is no labels.
+        """
+        self.registry = registry
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.series = {}
+        self.shards = []
+        self.retired = {}
+        self.local = threading.local()
+        self.lock = threading.Lock()
+
+    def new(self) -> list:
+        """
+        Returns the initial values of a series.
+        """
+        raise NotImplementedError
+
+    def slot(self, values: tuple) -> list:
+        """
+        Returns the values of a series in the shard of the calling thread, creating the shard or the series if needed.
+        Past 'max_series' series, new label values are counted under 'other'.
+
+        Args:
+            values (tuple): The label values.
+        """
+        shard = getattr(self.local, 'shard', None)
+        if shard is None:
+            shard = self.local.shard = {}
+            with self.lock:
+                self.shards.append((threading.current_thread(), shard))
+
+        with self.lock:
+            if values not in self.series:
+                if len(self.series) >= self.registry.max_series:
+                    values = ('other',) * len(self.labels)
+                if values not in self.series:
+                    self.series[values] = label_text(self.labels, values)
+
+        slot = shard.get(values)
+        if slot is None:
+            slot = shard[values] = self.new()
+        return slot
+
+    def totals(self) -> dict:
+        """
+        Returns the values of every series summed over the shards: {rendered labels: values}.
+        The shards of the threads that ended (e.g. of closed connections) are folded into a single one.
+        """
+        totals = {}
+        with self.lock:
+            for thread, shard in [entry for entry in self.shards if not entry[0].is_alive()]:
+                self.shards.remove((thread, shard))
+                for values, slot in shard.items():
+                    retired = self.retired.get(values)
+                    if retired is None:
+                        self.retired[values] = list(slot)
+                    else:
+                        for index, value in enumerate(slot):
+                            retired[index] += value
+
+            shards = [shard for _, shard in self.shards] + [dict(self.retired)]
+            series = dict(self.series)
+
+        for shard in shards:
+            for values, slot in list(shard.items()):
+                key = series[values]
+                total = totals.get(key)
+                if total is None:
+                    totals[key] = list(slot)
+                else:
+                    for index, value in enumerate(slot):
+                        total[index] += value
+        return totals
+
+
+class Counter(Metric):
+    """
+    A monotonically increasing count, e.g. of frames or errors.
+    """
+
+    type = 'counter'
+
+    def new(self) -> list:
+        return [0]
+
+    def inc(self, *values, amount: float = 1):
+        """
+        Increments the series of the given label values.
+
+        Args:
+            *values: The label values, in the order of the label names.
+            amount (float, optional): The increment. Default is 1.
+        """
+        if not self.registry.enabled:
+            return
+        try:
+            self.local.shard[values][0] += amount
+        except (AttributeError, KeyError):
+            self.slot(values)[0] += amount
+
+    def snapshot(self) -> dict:
+        """
+        Returns the counts: {rendered labels: float}.
+        """
+        return {key: slot[0] for key, slot in self.totals().items()}
+
+
+class Histogram(Metric):
+    """
+    Distribution of observed values (e.g. latencies in seconds) over fixed buckets, with their sum and count.
+
+    Attributes:
+        buckets (tuple): The upper bounds of the buckets, in increasing order.
+    """
+
+    type = 'histogram'
+
+    def __init__(self, registry, name: str, help: str, labels: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        super().__init__(registry, name, help, labels)
+        self.buckets = buckets
+
+    def new(self) -> list:
+        # Count per bucket, count above the last bound, sum
+        return [0] * (len(self.buckets) + 2)
+
+    def observe(self, value: float, *values):
+        """
+        Records an observation in the series of the given label values.
+
+        Args:
+            value (float): The observed value.
+            *values: The label values, in the order of the label names.
+        """
+        if not self.registry.enabled:
+            return
+        try:
+            slot = self.local.shard[values]
+        except (AttributeError, KeyError):
+            slot = self.slot(values)
+        slot[bisect.bisect_left(self.buckets, value)] += 1
+        slot[-1] += value
+
+    def since(self, start: float, *values):
+        """
+        Records the seconds elapsed since a time.perf_counter() value.
+
+        Args:
+            start (float): The start time.
+            *values: The label values, in the order of the label names.
+        """
+        if not self.registry.enabled:
+            return
+        value = time.perf_counter() - start
+        try:
+            slot = self.local.shard[values]
+        except (AttributeError, KeyError):
+            slot = self.slot(values)
+        slot[bisect.bisect_left(self.buckets, value)] += 1
+        slot[-1] += value
+
+    def child(self, *values):
+        """
+        Returns the series of the given label values, bound once so that the hot paths skip the label lookup.
+
+        Args:
+            *values: The label values, in the order of the label names.
+
+        Returns:
+            HistogramChild: The bound series.
+        """
+        return HistogramChild(self, values)
+
+    def snapshot(self) -> dict:
+        """
+        Returns the series as {rendered labels: {upper bound: count, "sum": float}}; counts are not cumulative.
+        """
+        bounds = [str(bound) for bound in self.buckets] + ['+Inf', 'sum']
+        return {key: dict(zip(bounds, slot)) for key, slot in self.totals().items()}
+
+
+class HistogramChild:
+    """
+    A series of a histogram bound to its label values. Each thread keeps its slot of the series at hand,
+    so recording is a thread-local attribute read instead of packing and hashing the label values.
+
+    Attributes:
+        histogram (Histogram): The histogram of the series.
+        values (tuple): The label values.
+    """
+
+    __slots__ = ('histogram', 'values', 'local')
+
+    def __init__(self, histogram: Histogram, values: tuple):
+        """
+        Constructor for HistogramChild class.
+
+        Args:
+            histogram (Histogram): The histogram of the series.
+            values (tuple): The label values.
+        """
+        self.histogram = histogram
+        self.values = values
+        self.local = threading.local()
+
+    def observe(self, value: float):
+        """
+        Records an observation in the series.
+
+        Args:
+            value (float): The observed value.
+        """
+        histogram = self.histogram
+        if not histogram.registry.enabled:
+            return
+        try:
+            slot = self.local.slot
+        except AttributeError:
+            slot = self.local.slot = histogram.slot(self.values)
+        slot[bisect.bisect_left(histogram.buckets, value)] += 1
+        slot[-1] += value
+
+    def since(self, start: float):
+        """
+        Records the seconds elapsed since a time.perf_counter() value.
+
+        Args:
+            start (float): The start time.
+        """
+        histogram = self.histogram
+        if not histogram.registry.enabled:
+            return
+        value = time.perf_counter() - start
+        try:
+            slot = self.local.slot
+        except AttributeError:
+            slot = self.local.slot = histogram.slot(self.values)
+        slot[bisect.bisect_left(histogram.buckets, value)] += 1
+        slot[-1] += value
+
+
+class Registry:
+    """
+    The metrics of the process. Snapshots are plain nested dictionaries of numbers,
+    so the snapshots of several processes can be summed and rendered by the supervisor.
+
+    Attributes:
+        enabled (bool): Whether recording is on; when off, recording a value returns immediately.
+        max_series (int): Max number of series per metric.
+        metrics (dict): The metrics: {name: Metric}.
+    """
+
+    def __init__(self, enabled: bool = True, max_series: int = MAX_SERIES):
+        """
+        Constructor for Registry class.
+
+        Args:
+            enabled (bool, optional): Whether recording is on. Default is True.
+            max_series (int, optional): Max number of series per metric. Default is MAX_SERIES.
+        """
+        self.enabled = enabled
+        self.max_series = max_series
+        self.metrics = {}
+
+    def counter(self, name: str, help: str, labels: tuple = ()) -> Counter:
+        """
+        Declares a counter.
+        """
+        self.metrics[name] = Counter(self, name, help, labels)
+        return self.metrics[name]
+
+    def histogram(self, name: str, help: str, labels: tuple = (), buckets: tuple = LATENCY_BUCKETS) -> Histogram:
+        """
+        Declares a histogram.
+        """
+        self.metrics[name] = Histogram(self, name, help, labels, buckets)
+        return self.metrics[name]
+
+    def snapshot(self) -> dict:
+        """
+        Returns the values of all the metrics: {name: {rendered labels: value}}.
+        """
+        return {name: metric.snapshot() for name, metric in self.metrics.items()}
+
+    def render(self, snapshot: dict = None) -> str:
+        """
+        Renders a snapshot in the Prometheus text exposition format.
+
+        Args:
+            snapshot (dict, optional): The snapshot, possibly summed over processes. Default is the current one.
+
+        Returns:
+            str: The text.
+        """
+        if snapshot is None:
+            snapshot = self.snapshot()
+
+        lines = []
+        for name, metric in self.metrics.items():
+            lines.append(f"# HELP {name} {metric.help}")
+            lines.append(f"# TYPE {name} {metric.type}")
+
+            for key, value in snapshot.get(name, {}).items():
+                if metric.type == 'counter':
+                    lines.append(f"{name}{{{key}}} {value}" if key else f"{name} {value}")
+                    continue
+
+                separator = "," if key else ""
+                cumulative = 0
+                for bound in [str(bound) for bound in metric.buckets] + ['+Inf']:
+                    cumulative += value.get(bound, 0)
+                    lines.append(f'{name}_bucket{{{key}{separator}le="{bound}"}} {cumulative}')
+                labels = f"{{{key}}}" if key else ""
+                lines.append(f"{name}_sum{labels} {value.get('sum', 0)}")
+                lines.append(f"{name}_count{labels} {cumulative}")
+
+        return "\n".join(lines) + "\n"
+
+
+def serve(ip_address: str, port_number: int, render) -> ThreadingHTTPServer:
+    """
+    Serves the metrics on http://<ip_address>:<port_number>/metrics from a background thread.
+
+    Args:
+        ip_address (str): The IP address to bind.
+        port_number (int): The port to bind.
+        render (callable): Returns the Prometheus text to serve.
+
+    Returns:
+        ThreadingHTTPServer: The running server.
+    """
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0] != '/metrics':
+                self.send_error(404)
+                return
+
+            body = render().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', CONTENT_TYPE)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((ip_address, port_number), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    print(f"[METRICS] Serving on http://{ip_address}:{server.server_port}/metrics")
+    return server
+
+
+# ************************************** EDGE METRICS **************************************
+
+REGISTRY = Registry()
+
+FRAMES_RECEIVED = REGISTRY.counter(
+    "edge_frames_received_total", "Frames received, per gateway (client IP address).", ("gateway",))
+RECEIVE_SECONDS = REGISTRY.histogram(
+    "edge_receive_seconds", "Time to hand a received frame over to the decoders, including backpressure waits.")
+NODE_FRAMES = REGISTRY.counter(
+    "edge_node_frames_total", "Frames decoded, per waspmote.", ("node",))
+DUPLICATE_FRAMES = REGISTRY.counter(
+    "edge_duplicate_frames_total", "Retransmitted frames dropped (same sequence number as the last frame of their node).")
+SHED_FRAMES = REGISTRY.counter(
+    "edge_shed_frames_total", "Frames shed, per priority and reason (rate: over the node's rate, overload: full queue).",
+    ("priority", "reason"))
+STAGE_SECONDS = REGISTRY.histogram(
+    "edge_stage_seconds", "Time spent by a pipeline stage on a frame.", ("stage",))
+STAGE_FAILURES = REGISTRY.counter(
+    "edge_stage_failures_total", "Frames dropped by a pipeline stage because of an error.", ("stage",))
+FRAME_SECONDS = REGISTRY.histogram(
+    "edge_frame_seconds", "Time from the reception of a frame to the end of its publication.")
+MQTT_FAILURES = REGISTRY.counter(
+    "edge_mqtt_failures_total", "Records not published on MQTT.")
+MQTT_SENSOR_MESSAGES = REGISTRY.counter(
+    "edge_mqtt_sensor_messages_total", "Messages published on the per-sensor topics.")
+HTTP_UPLOAD_SECONDS = REGISTRY.histogram(
+    "edge_http_upload_seconds", "Time of an HTTP request to the cloud.")
+HTTP_REQUESTS = REGISTRY.counter(
+    "edge_http_requests_total", "HTTP requests to the cloud, per outcome.", ("outcome",))
+UPLOADED_RECORDS = REGISTRY.counter(
+    "edge_uploaded_records_total", "Records acknowledged by the cloud.")
+
+
+if __name__ == '__main__':
+    # Overhead of the instrumentation on the decoding and serialization of a frame
+    import libellium.libellium as libellium
+    import wire.wire as wire
+
+    frame = bytes.fromhex("3C3D3E06451B20B4BD3C195E206E6F64655F3031231434641500000000006185EB3F0100000000"
+                          "046179913E4A7B14C4414C005462424DBFD0C647460000000047000000004800000000")
+    codec = wire.Codec('json')
+    runs = 20000
+    decode, publish = STAGE_SECONDS.child("decode"), STAGE_SECONDS.child("publish")
+
+    def process(instrumented):
+        start = time.perf_counter()
+        for _ in range(runs):
+            received = begin = time.perf_counter()
+            measurement = libellium.Libellium(frame)
+            measurement.parse()
+            measures = {sensor.ascii_id: {"value": value, "unit": sensor.unit} for sensor, value in measurement.measurements}
+            if instrumented:
+                NODE_FRAMES.inc(measurement.waspmote_id)
+                decode.since(begin)
+
+            begin = time.perf_counter()
+            codec.record({"room": "DTLab"}, measures, None)
+            if instrumented:
+                publish.since(begin)
+                FRAME_SECONDS.since(received)
+        return time.perf_counter() - start
+
+    # Rounds interleaved so that a noisy machine penalizes both variants alike
+    process(True)
+    off, on = [], []
+    for _ in range(10):
+        REGISTRY.enabled = False
+        off.append(process(False))
+        REGISTRY.enabled = True
+        on.append(process(True))
+    off, on = min(off), min(on)
+    print(f"Decode and serialization: {off / runs * 1e6:.2f} us per frame without metrics, "
+          f"{on / runs * 1e6:.2f} us with metrics (overhead {(on - off) / off:.1%})")
+
+    start = time.perf_counter()
+    for _ in range(runs):
+        decode.since(start)
+    bound = (time.perf_counter() - start) / runs
+    start = time.perf_counter()
+    for _ in range(runs):
+        STAGE_SECONDS.since(start, "decode")
+    labeled = (time.perf_counter() - start) / runs
+    print(f"since(): {bound * 1e9:.0f} ns on a bound series, {labeled * 1e9:.0f} ns with the label values")
+    print(REGISTRY.render())
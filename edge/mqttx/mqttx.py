@@ -1,7 +1,9 @@
 # ************************************** MQTTX MODULE **************************************
 
 from random import randint
+import threading
 import paho.mqtt.client as mqtt
+import wire.wire as wire
 
 
 """
@@ -18,6 +20,10 @@ RETURN_CODES = {
     5: "FAILURE - not authorized",
 }
 
+# Publishing modes: one record of every sensor on the measurements topic ('record'), one retained message per sensor
+# on '<measurements topic>/<ascii_id>' ('sensor'), or both
+TOPIC_MODES = ('record', 'sensor', 'both')
+
 
 
 class MqttConnectionError(Exception):
@@ -90,31 +96,47 @@ class Client:
 
     This class defines methods for starting and stopping the client, publishing messages, and subscribing to topics.
     It also defines two event handlers: on_connect and on_message.
+    Once started, the client stays connected and reconnects automatically; it can be shared by many threads.
 
     Attributes:
         broker (str): The MQTT broker's address to connect to.
         topic (str): The topic to subscribe or publish to.
+        port (int): The MQTT broker's port.
+        keepalive (int): Max seconds between two messages exchanged with the broker.
         subscriptions (list): A list to store subscribed topics.
         client (mqtt.Client): The MQTT client instance.
     """
 
-    def __init__(self, broker: str, topic: str = ''):
+    def __init__(self, broker: str, topic: str = '', port: int = 1883, keepalive: int = 60,
+                 reconnect_min_delay: int = 1, reconnect_max_delay: int = 60):
         """
         Constructor for Client class.
 
         Args:
             broker (str): The MQTT broker's address to connect to.
             topic (str, optional): The topic to subscribe or publish to. Defaults to an empty string.
+            port (int, optional): The MQTT broker's port. Defaults to 1883.
+            keepalive (int, optional): Max seconds between two messages exchanged with the broker. Defaults to 60.
+            reconnect_min_delay (int, optional): Seconds before the first reconnection attempt. Defaults to 1.
+            reconnect_max_delay (int, optional): Max seconds between two reconnection attempts. Defaults to 60.
         """
-        # MQTT client configuration
-        self.client = mqtt.Client()
+        # MQTT client configuration (paho-mqtt 2.x requires the callback API version)
+        if hasattr(mqtt, "CallbackAPIVersion"):
+            self.client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION1)
+        else:
+            self.client = mqtt.Client()
         self.client.on_connect = self.on_connect
         self.client.on_message = self.on_message
+        self.client.reconnect_delay_set(reconnect_min_delay, reconnect_max_delay)
 
         # Initializing attributes
         self.broker = broker
         self.topic = topic
+        self.port = port
+        self.keepalive = keepalive
         self.subscriptions = []
+        self.started = False
+        self.lock = threading.Lock()
 
     def on_connect(self, client, userdata, flags, rc):
         """
@@ -139,19 +161,33 @@ class Client:
     def on_message(self, client, userdata, msg):
         """
         Callback when a new message on a subscribed topic is received.
+        Both JSON and compact payloads are accepted.
 
         Args:
             client: The MQTT client instance.
             userdata: User-defined data.
             msg (mqtt.MQTTMessage): The received message.
         """
-        print("[MQTTX MODULE] TOPIC: " + msg.topic + " - PAYLOAD: " + str(msg.payload))
+        payload = msg.payload
+        if wire.is_compact(payload):
+            # Compact messages are shown as the equivalent JSON records
+            try:
+                payload = wire.to_json_records(payload)
+            except wire.WireFormatError as e:
+                payload = "invalid compact message: " + str(e)
+        print("[MQTTX MODULE] TOPIC: " + msg.topic + " - PAYLOAD: " + str(payload))
 
     def start(self):
         """
-        Starts the connection to the MQTT broker.
+        Starts the connection to the MQTT broker (only once).
+        The network loop runs in a background thread and reconnects automatically if the connection is lost.
         """
-        self.client.connect(self.broker, 1883, 60)
+        with self.lock:
+            if self.started:
+                return
+            self.started = True
+
+        self.client.connect_async(self.broker, self.port, self.keepalive)
         self.client.loop_start()
 
     def publish(self, message: str, topic: str = ''):
@@ -173,9 +209,30 @@ class Client:
         else:
             raise MqttTopicNotSpecified
 
-        if message_id is None:
+        if message_id is None or message_id.rc != mqtt.MQTT_ERR_SUCCESS:
             raise MqttPublishError
 
+    def publish_many(self, messages: list, qos: int = 0, retain: bool = False):
+        """
+        Publishes a batch of messages, pipelined: all of them are queued to the network loop before any outcome
+        is checked, so that the loop writes them in a row instead of one message per wake-up.
+        Acknowledgments (QoS 1 and 2) are handled by the network loop, never waited for.
+
+        Args:
+            messages (list): The (topic, message) pairs, published in this order.
+            qos (int, optional): The quality of service of the messages. Defaults to 0.
+            retain (bool, optional): Whether the broker keeps the last message of each topic for new subscribers. Defaults to False.
+
+        Raises:
+            MqttPublishError: If a message could not be queued (the others are still published).
+        """
+        publish = self.client.publish
+        outcomes = [publish(topic, message, qos, retain) for topic, message in messages]
+
+        failed = sum(1 for outcome in outcomes if outcome is None or outcome.rc != mqtt.MQTT_ERR_SUCCESS)
+        if failed:
+            raise MqttPublishError(f"{failed} of {len(outcomes)} messages not published")
+
     def subscribe(self, topic: str):
         """
         Subscribes to a new topic.
@@ -193,5 +250,8 @@ class Client:
         """
         Stops the MQTT connection.
         """
-        self.client.loop_stop()
+        with self.lock:
+            self.started = False
+
         self.client.disconnect()
+        self.client.loop_stop()
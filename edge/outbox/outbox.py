@@ -0,0 +1,193 @@
+# ************************************** OUTBOX MODULE **************************************
+
+import os
+import sqlite3
+import threading
+import logs.logs as logs
+
+OUTBOX = logs.get_logger('outbox')
+
+
+class Outbox:
+    """
+    Disk-backed, append-only queue of the records to upload to the cloud, stored in SQLite (WAL journal).
+    Every record is persisted before its upload and deleted once the cloud has acknowledged it,
+    so measurements received while the cloud or the network is down survive until they can be replayed.
+    The disk budget is bounded: when it is exceeded, the oldest records are dropped.
+    Records the cloud rejected for good are moved to a dead-letter table (the last 'max_rejected' ones are kept),
+    so that they can be inspected without blocking the records behind them.
+
+    Attributes:
+        path (str): The path of the SQLite database.
+        max_bytes (int): Max total size in bytes of the stored records (0 for no limit).
+        size (int): Current total size in bytes of the stored records.
+        count (int): Current number of stored records.
+        dropped (int): Number of records dropped because of the disk budget.
+        rejected (int): Number of records moved to the dead-letter table.
+        connection (sqlite3.Connection): The connection, shared by all the threads of the process.
+    """
+
+    def __init__(self, path: str, max_bytes: int = 0, max_rejected: int = 10000):
+        """
+        Constructor for Outbox class: opens (or creates) the database and counts the records left by a previous run.
+
+        Args:
+            path (str): The path of the SQLite database.
+            max_bytes (int, optional): Max total size in bytes of the stored records. Default is 0 (no limit).
+            max_rejected (int, optional): Max number of records kept in the dead-letter table. Default is 10000.
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_rejected = max_rejected
+        self.dropped = 0
+        self.rejected = 0
+        self.lock = threading.Lock()
+
+        self.connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.connection.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        self.connection.execute("PRAGMA journal_mode = WAL")
+        # With WAL, NORMAL only loses the last transactions on power loss, never corrupts the database
+        self.connection.execute("PRAGMA synchronous = NORMAL")
+        self.connection.execute("CREATE TABLE IF NOT EXISTS outbox (id INTEGER PRIMARY KEY AUTOINCREMENT, record BLOB NOT NULL)")
+        self.connection.execute("CREATE TABLE IF NOT EXISTS rejected (id INTEGER PRIMARY KEY, record BLOB NOT NULL, "
+                                "reason TEXT NOT NULL)")
+
+        self.count, self.size = self.connection.execute(
+            "SELECT COUNT(*), COALESCE(SUM(LENGTH(record)), 0) FROM outbox").fetchone()
+
+    def append(self, record: str) -> int:
+        """
+        Persists a record at the end of the queue, dropping the oldest ones if the disk budget is exceeded.
+
+        Args:
+            record (str | bytes): The serialized record (JSON text or compact bytes).
+
+        Returns:
+            int: The id of the record.
+        """
+        with self.lock:
+            rowid = self.connection.execute("INSERT INTO outbox (record) VALUES (?)", (record,)).lastrowid
+            self.count += 1
+            self.size += len(record)
+
+            if self.max_bytes and self.size > self.max_bytes:
+                self.trim()
+            return rowid
+
+    def trim(self):
+        """
+        Drops the oldest records until the stored ones fit in 90% of the disk budget (the lock must be held),
+        so that the budget is not exceeded again by the next record.
+        """
+        target = self.max_bytes * 0.9
+        dropped = 0
+        while self.size > target and self.count > 1:
+            rows = self.connection.execute("SELECT id, LENGTH(record) FROM outbox ORDER BY id LIMIT 256").fetchall()
+            last_id = None
+            for rowid, length in rows:
+                if self.size <= target or self.count <= 1:
+                    break
+                last_id = rowid
+                self.size -= length
+                self.count -= 1
+                dropped += 1
+            if last_id is None:
+                break
+            self.connection.execute("DELETE FROM outbox WHERE id <= ?", (last_id,))
+
+        if dropped:
+            self.dropped += dropped
+            OUTBOX.warning("Disk budget exceeded: %d oldest records dropped.", dropped)
+
+    def read(self, limit: int, before: int = None) -> list:
+        """
+        Returns the oldest records of the queue, without removing them.
+
+        Args:
+            limit (int): Max number of records.
+            before (int, optional): Only records whose id is lower than this one. Default is None (all).
+
+        Returns:
+            list: The (id, record) pairs, oldest first.
+        """
+        with self.lock:
+            if before is None:
+                return self.connection.execute("SELECT id, record FROM outbox ORDER BY id LIMIT ?", (limit,)).fetchall()
+            return self.connection.execute("SELECT id, record FROM outbox WHERE id < ? ORDER BY id LIMIT ?",
+                                           (before, limit)).fetchall()
+
+    def ack(self, ids: list):
+        """
+        Removes the records acknowledged by the cloud. Once the queue is empty, the disk space is given back.
+
+        Args:
+            ids (list): The ids of the acknowledged records.
+        """
+        if not ids:
+            return
+
+        with self.lock:
+            self.connection.execute("BEGIN")
+            removed = 0
+            size = 0
+            for start in range(0, len(ids), 500):
+                chunk = ids[start:start + 500]
+                marks = ",".join("?" * len(chunk))
+                row = self.connection.execute(
+                    f"SELECT COUNT(*), COALESCE(SUM(LENGTH(record)), 0) FROM outbox WHERE id IN ({marks})", chunk).fetchone()
+                self.connection.execute(f"DELETE FROM outbox WHERE id IN ({marks})", chunk)
+                removed += row[0]
+                size += row[1]
+            self.connection.execute("COMMIT")
+
+            self.count -= removed
+            self.size -= size
+
+            if self.count == 0:
+                # Truncate: free the pages of the deleted records and empty the write-ahead log
+                self.connection.execute("PRAGMA incremental_vacuum")
+                self.connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def reject(self, ids: list, reason: str):
+        """
+        Moves records the cloud rejected for good (e.g. malformed ones) to the dead-letter table, out of the queue.
+
+        Args:
+            ids (list): The ids of the rejected records.
+            reason (str): Why they were rejected, e.g. the cloud's response.
+        """
+        if not ids:
+            return
+
+        with self.lock:
+            self.connection.execute("BEGIN")
+            for start in range(0, len(ids), 500):
+                chunk = ids[start:start + 500]
+                marks = ",".join("?" * len(chunk))
+                self.connection.execute(f"INSERT OR REPLACE INTO rejected (id, record, reason) "
+                                        f"SELECT id, record, ? FROM outbox WHERE id IN ({marks})", [reason] + chunk)
+            # Only the last 'max_rejected' records are kept
+            self.connection.execute("DELETE FROM rejected WHERE id NOT IN "
+                                    "(SELECT id FROM rejected ORDER BY id DESC LIMIT ?)", (self.max_rejected,))
+            self.connection.execute("COMMIT")
+            self.rejected += len(ids)
+
+        self.ack(ids)
+
+    def stats(self) -> dict:
+        """
+        Returns the counters of the outbox.
+        """
+        with self.lock:
+            return {"records": self.count, "bytes": self.size, "dropped": self.dropped, "rejected": self.rejected}
+
+    def close(self):
+        """
+        Closes the database.
+        """
+        with self.lock:
+            self.connection.close()
@@ -0,0 +1,383 @@
+# ************************************** PIPELINE MODULE **************************************
+
+import collections
+import queue
+import threading
+import time
+import libellium.frametype as ft
+import metrics.metrics as metrics
+import logs.logs as logs
+import tracing.tracing as tracing
+
+# Per-frame errors of the stages, sampled (see config.LOG_SAMPLING): every failure is counted by the stage metrics
+STAGES = logs.get_logger('stages')
+
+
+class FrameContext:
+    """
+    Carries one received frame, and everything derived from it, through the stages of the pipeline.
+    Each frame has its own context, so concurrent connections never share decoding state.
+
+    Attributes:
+        frame (bytes): The raw Libellium frame.
+        client_address (tuple): The (ip, port) of the connection the frame was received from.
+        received_at (float): Monotonic time of reception, in seconds.
+        node (str): The waspmote ID of the node that sent the frame, filled by the decode stage.
+        measures (libellium.measurement.MeasurementSet): The decoded measurements, filled by the decode stage.
+        trace_id (str): The ID of the frame's trace, stamped into the published record.
+        spans (list): The (name, start, end) monotonic spans of the frame if its trace is sampled, None otherwise.
+        priority (int): The scheduling priority of the frame (see libellium.frametype), confirmed by the decode stage.
+    """
+
+    __slots__ = ('frame', 'client_address', 'received_at', 'node', 'measures', 'trace_id', 'spans', 'priority')
+
+    def __init__(self, frame: bytes, client_address=None, priority: int = ft.PRIORITY_ROUTINE):
+        """
+        Constructor for FrameContext class.
+
+        Args:
+            frame (bytes): The raw Libellium frame.
+            client_address (tuple, optional): The (ip, port) of the connection. Default is None.
+            priority (int, optional): The scheduling priority of the frame. Default is PRIORITY_ROUTINE.
+        """
+        self.frame = frame
+        self.client_address = client_address
+        self.priority = priority
+        self.received_at = time.monotonic()
+        self.node = None
+        self.measures = None
+        self.trace_id = tracing.new_trace_id()
+        self.spans = None
+
+
+class PriorityQueue:
+    """
+    Bounded queue of frame contexts served by priority: alarms first, then events, then routine frames,
+    each priority in arrival order. When the queue is full, a context takes the place of the newest queued
+    context of a lower priority, which is shed; if there is none, the producer waits, so routine frames
+    are delayed by backpressure while alarms and events are never queued behind them.
+
+    Attributes:
+        maxsize (int): Capacity of the queue, all priorities included.
+        levels (list): One deque of contexts per priority.
+        shed (list): Number of contexts shed to make room for a higher priority one, per priority.
+    """
+
+    def __init__(self, maxsize: int, priorities: int = len(ft.PRIORITY_NAMES)):
+        """
+        Constructor for PriorityQueue class.
+
+        Args:
+            maxsize (int): Capacity of the queue.
+            priorities (int, optional): Number of priorities. Default is the number of frame priorities.
+        """
+        self.maxsize = maxsize
+        self.levels = [collections.deque() for _ in range(priorities)]
+        self.count = 0
+        self.shed = [0] * priorities
+        self.mutex = threading.Lock()
+        self.not_empty = threading.Condition(self.mutex)
+        self.not_full = threading.Condition(self.mutex)
+
+    def preempt(self, priority: int):
+        """
+        Removes the newest context of the lowest priority below the given one (the lock must be held).
+
+        Args:
+            priority (int): The priority of the context to make room for.
+
+        Returns:
+            FrameContext | None: The shed context, or None if all the queued contexts have the same or a higher priority.
+        """
+        for level in range(len(self.levels) - 1, priority, -1):
+            if self.levels[level]:
+                self.count -= 1
+                self.shed[level] += 1
+                return self.levels[level].pop()
+        return None
+
+    def put(self, context: FrameContext, block: bool = True, timeout: float = None):
+        """
+        Enqueues a context according to its priority.
+
+        Args:
+            context (FrameContext): The context.
+            block (bool, optional): Whether to wait for a free slot. Default is True.
+            timeout (float, optional): Max seconds to wait for a free slot. Default is None (forever).
+
+        Returns:
+            FrameContext | None: The lower priority context shed to make room, if any.
+
+        Raises:
+            queue.Full: If the queue is still full after waiting.
+        """
+        with self.not_full:
+            shed = None
+            if timeout is not None:
+                deadline = time.monotonic() + timeout
+            while self.count >= self.maxsize:
+                shed = self.preempt(context.priority)
+                if shed is not None:
+                    break
+                if not block:
+                    raise queue.Full
+                if timeout is None:
+                    self.not_full.wait()
+                else:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise queue.Full
+                    self.not_full.wait(remaining)
+
+            self.levels[context.priority].append(context)
+            self.count += 1
+            self.not_empty.notify()
+            return shed
+
+    def get(self) -> FrameContext:
+        """
+        Removes and returns the oldest context of the highest priority, waiting for one if the queue is empty.
+        """
+        with self.not_empty:
+            while not self.count:
+                self.not_empty.wait()
+            for level in self.levels:
+                if level:
+                    self.count -= 1
+                    self.not_full.notify()
+                    return level.popleft()
+
+    def task_done(self):
+        """
+        Same interface as queue.Queue: nothing to do, contexts are not joined.
+        """
+
+    def qsize(self) -> int:
+        """
+        Returns the number of queued contexts.
+        """
+        with self.mutex:
+            return self.count
+
+
+class Stage:
+    """
+    A stage of the pipeline: a bounded input queue served by a pool of worker threads.
+    Each worker passes the context to the handler and puts the result into the next stage's queue,
+    blocking while it is full so that backpressure propagates upstream instead of growing memory.
+
+    Attributes:
+        name (str): Name of the stage.
+        handler (callable): Function processing a FrameContext; it returns the context to forward, or None to drop it.
+        workers (int): Number of worker threads.
+        queue (PriorityQueue): The bounded input queue, served by priority.
+        next_stage (Stage): The stage receiving the handler's results. Default is None (last stage).
+        tracer (tracing.Tracer): Logs the spans of the sampled frames. Default is None (no trace log).
+        seconds (metrics.HistogramChild): The stage's series of the stage latency histogram.
+        processed (int): Number of contexts handled successfully.
+        failed (int): Number of contexts dropped because of an error.
+    """
+
+    def __init__(self, name: str, handler, workers: int = 1, queue_size: int = 1024):
+        """
+        Constructor for Stage class.
+
+        Args:
+            name (str): Name of the stage.
+            handler (callable): Function processing a FrameContext.
+            workers (int, optional): Number of worker threads. Default is 1.
+            queue_size (int, optional): Capacity of the input queue. Default is 1024.
+        """
+        self.name = name
+        self.handler = handler
+        self.workers = workers
+        self.queue = PriorityQueue(queue_size)
+        self.next_stage = None
+        self.tracer = None
+        self.seconds = metrics.STAGE_SECONDS.child(name)
+        self.processed = 0
+        self.failed = 0
+        self.lock = threading.Lock()
+        self.threads = []
+
+    def start(self):
+        """
+        Starts the worker threads of the stage.
+        """
+        for i in range(self.workers):
+            t = threading.Thread(target=self.worker, name=f"{self.name}-{i}", daemon=True)
+            t.start()
+            self.threads.append(t)
+
+    def put(self, context: FrameContext, block: bool = True, timeout: float = None):
+        """
+        Enqueues a context for this stage. If the queue is full, a lower priority context may be shed to make room.
+
+        Args:
+            context (FrameContext): The context to process.
+            block (bool, optional): Whether to wait for a free slot. Default is True.
+            timeout (float, optional): Max seconds to wait for a free slot. Default is None (forever).
+
+        Raises:
+            queue.Full: If the queue is still full after waiting.
+        """
+        shed = self.queue.put(context, block, timeout)
+        if shed is not None:
+            metrics.SHED_FRAMES.inc(ft.PRIORITY_NAMES[shed.priority], "overload")
+            if shed.spans is not None:
+                self.tracer.finish(shed, f'shed by {self.name}')
+
+    def handle(self, context: FrameContext):
+        """
+        Passes a context to the handler, counting successes and failures.
+
+        Args:
+            context (FrameContext): The context to process.
+
+        Returns:
+            FrameContext | None: The handler's result, or None if it failed.
+        """
+        start = time.perf_counter()
+        traced = context.spans is not None
+        if traced:
+            begin = time.monotonic()
+        try:
+            result = self.handler(context)
+        except Exception as e:
+            STAGES.warning("%s error: %s", self.name, e)
+            metrics.STAGE_FAILURES.inc(self.name)
+            with self.lock:
+                self.failed += 1
+            if traced:
+                context.spans.append((self.name, begin, time.monotonic()))
+                self.tracer.finish(context, 'failed')
+            return None
+
+        self.seconds.since(start)
+        with self.lock:
+            self.processed += 1
+
+        if traced:
+            context.spans.append((self.name, begin, time.monotonic()))
+            if result is None:
+                self.tracer.finish(context, f'dropped by {self.name}')
+            elif self.next_stage is None:
+                self.tracer.finish(context, 'published')
+        return result
+
+    def forward(self, result):
+        """
+        Puts a handler's result into the next stage's queue (blocking while it is full).
+
+        Args:
+            result (FrameContext | None): The result to forward; None is dropped.
+        """
+        if result is not None and self.next_stage is not None:
+            self.next_stage.put(result)
+
+    def worker(self):
+        """
+        Body of a worker thread: handles contexts forever and forwards them to the next stage.
+        """
+        while True:
+            context = self.queue.get()
+            try:
+                result = self.handle(context)
+            finally:
+                self.queue.task_done()
+
+            self.forward(result)
+
+    def stats(self) -> dict:
+        """
+        Returns the counters and the current queue depth of the stage.
+        """
+        with self.lock:
+            return {
+                "depth": self.queue.qsize(),
+                "capacity": self.queue.maxsize,
+                "workers": self.workers,
+                "processed": self.processed,
+                "failed": self.failed,
+                "shed": dict(zip(ft.PRIORITY_NAMES, self.queue.shed))
+            }
+
+
+class Pipeline:
+    """
+    A chain of stages connected by bounded queues: frames submitted by the receivers
+    flow through every stage in order.
+
+    Attributes:
+        stages (list): The stages, in processing order.
+        tracer (tracing.Tracer): Logs the spans of the sampled frames. Default is None (no trace log).
+        submitted (int): Number of frames submitted by the receivers.
+    """
+
+    def __init__(self, stages: list, tracer=None):
+        """
+        Constructor for Pipeline class.
+
+        Args:
+            stages (list): The stages, in processing order.
+            tracer (tracing.Tracer, optional): Logs the spans of the sampled frames. Default is None (no trace log).
+        """
+        self.stages = stages
+        self.tracer = tracer
+        for stage, next_stage in zip(stages, stages[1:]):
+            stage.next_stage = next_stage
+        for stage in stages:
+            stage.tracer = tracer
+
+        self.submitted = 0
+        self.lock = threading.Lock()
+        self.started = False
+
+    def start(self):
+        """
+        Starts the worker threads of every stage (only once).
+        """
+        with self.lock:
+            if self.started:
+                return
+            self.started = True
+
+        for stage in self.stages:
+            stage.start()
+
+    def submit(self, context: FrameContext, block: bool = True, timeout: float = None):
+        """
+        Submits a received frame to the first stage.
+
+        Args:
+            context (FrameContext): The context of the frame.
+            block (bool, optional): Whether to wait while the first stage is full. Default is True.
+            timeout (float, optional): Max seconds to wait for a free slot. Default is None (forever).
+
+        Raises:
+            queue.Full: If the first stage is still full after waiting.
+        """
+        self.trace(context)
+        self.stages[0].put(context, block, timeout)
+        with self.lock:
+            self.submitted += 1
+
+    def trace(self, context: FrameContext):
+        """
+        Starts collecting the spans of a frame entering the pipeline, if its trace is sampled.
+
+        Args:
+            context (FrameContext): The context of the frame.
+        """
+        if self.tracer is not None:
+            self.tracer.start(context)
+
+    def stats(self) -> dict:
+        """
+        Returns the number of submitted frames and the counters of every stage: {"received": int, stage_name: dict}.
+        """
+        with self.lock:
+            stats = {"received": self.submitted}
+        for stage in self.stages:
+            stats[stage.name] = stage.stats()
+        return stats
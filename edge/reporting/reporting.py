@@ -0,0 +1,215 @@
+# ************************************** REPORTING MODULE **************************************
+
+import json
+import threading
+import time
+
+
+class Deadband:
+    """
+    Reporting rule of a sensor: a new value is only reported if it moved out of the deadband
+    around the last reported one, or if nothing was reported for 'heartbeat' seconds.
+
+    Attributes:
+        absolute (float): Absolute change below which a value is suppressed (0 to ignore).
+        relative (float): Change below which a value is suppressed, as a fraction of the last reported one (0 to ignore).
+        heartbeat (float): Max seconds without reporting a value (0 for no heartbeat).
+    """
+
+    __slots__ = ('absolute', 'relative', 'heartbeat')
+
+    def __init__(self, absolute: float = 0, relative: float = 0, heartbeat: float = 0):
+        """
+        Constructor for Deadband class.
+
+        Args:
+            absolute (float, optional): Absolute change below which a value is suppressed. Default is 0.
+            relative (float, optional): Relative change below which a value is suppressed. Default is 0.
+            heartbeat (float, optional): Max seconds without reporting a value. Default is 0.
+        """
+        self.absolute = absolute
+        self.relative = relative
+        self.heartbeat = heartbeat
+
+    def inside(self, value, last) -> bool:
+        """
+        Returns whether a value is close enough to the last reported one to be suppressed.
+
+        Args:
+            value: The new value.
+            last: The last reported value.
+        """
+        if not isinstance(value, (int, float)) or not isinstance(last, (int, float)):
+            # Strings and other values are only suppressed while they do not change
+            return value == last
+
+        change = abs(value - last)
+        if self.absolute and change >= self.absolute:
+            return False
+        if self.relative and change >= self.relative * abs(last):
+            return False
+        return True
+
+    def __repr__(self):
+        return f"Deadband(absolute={self.absolute}, relative={self.relative}, heartbeat={self.heartbeat})"
+
+
+def parse_deadbands(text: str, heartbeat: float = 0) -> dict:
+    """
+    Parses deadbands written as 'ascii_id:band[%][@heartbeat]' separated by commas,
+    e.g. 'TC:0.2,HUM:1%,PRES:10@600' (a '%' makes the band relative to the last reported value).
+
+    Args:
+        text (str): The deadbands.
+        heartbeat (float, optional): The heartbeat of the deadbands that do not set their own. Default is 0.
+
+    Returns:
+        dict: The deadbands: {ascii_id: Deadband}.
+
+    Raises:
+        ValueError: If a deadband is malformed.
+    """
+    deadbands = {}
+    for entry in text.split(','):
+        entry = entry.strip()
+        if entry == '':
+            continue
+
+        try:
+            ascii_id, band = entry.split(':')
+            band, _, beat = band.partition('@')
+            beat = float(beat) if beat != '' else heartbeat
+
+            if band.endswith('%'):
+                deadbands[ascii_id.strip()] = Deadband(relative=float(band[:-1]) / 100, heartbeat=beat)
+            else:
+                deadbands[ascii_id.strip()] = Deadband(absolute=float(band), heartbeat=beat)
+        except ValueError:
+            raise ValueError(f"Malformed deadband '{entry}': use 'ascii_id:band[%][@heartbeat]'.")
+
+    return deadbands
+
+
+def deadbands_from_sensors(sensors: dict, heartbeat: float = 0) -> dict:
+    """
+    Collects the deadbands defined in 'sensor.json'.
+
+    Args:
+        sensors (dict): The sensors: {binary_id: Sensor}.
+        heartbeat (float, optional): The heartbeat of the sensors that do not set their own. Default is 0.
+
+    Returns:
+        dict: The deadbands: {ascii_id: Deadband}.
+    """
+    deadbands = {}
+    for sensor in sensors.values():
+        if sensor.deadband or sensor.relative_deadband:
+            deadbands[sensor.ascii_id] = Deadband(sensor.deadband, sensor.relative_deadband, sensor.heartbeat or heartbeat)
+    return deadbands
+
+
+class ReportFilter:
+    """
+    Change-based reporting filter: suppresses the measurements of each node whose value stays inside
+    the deadband of its sensor, while still reporting every value at least once per heartbeat.
+    Sensors without a deadband are always reported. It counts the values and the bytes it saved.
+
+    Frames are decoded by parallel workers, so the frames of a node can reach the filter out of order.
+    A value older than the last reported one of its sensor (by reception time) is reported as it is, without
+    replacing the state: deadbands are always compared with the newest value reported.
+
+    Attributes:
+        deadbands (dict): The reporting rules: {ascii_id: Deadband}.
+        last (dict): The last reported value of every sensor of every node, with its time and the time of the newest
+                     value received (reported or not): {(node, ascii_id): (value, time, newest)}.
+        values (int): Number of values received.
+        suppressed (int): Number of values suppressed.
+        records (int): Number of records received.
+        dropped (int): Number of records dropped because all their values were suppressed.
+        reordered (int): Number of values received after a newer value of their sensor.
+        saved_bytes (int): Approximate size in bytes of the JSON not sent because of the suppressed values.
+    """
+
+    def __init__(self, deadbands: dict):
+        """
+        Constructor for ReportFilter class.
+
+        Args:
+            deadbands (dict): The reporting rules: {ascii_id: Deadband}.
+        """
+        self.deadbands = deadbands
+        self.last = {}
+        self.lock = threading.Lock()
+        self.values = 0
+        self.suppressed = 0
+        self.records = 0
+        self.dropped = 0
+        self.reordered = 0
+        self.saved_bytes = 0
+
+    def apply(self, node, measures, now: float = None):
+        """
+        Filters the measurements of a record.
+
+        Args:
+            node: The identifier of the node the record comes from (e.g. its waspmote ID).
+            measures (measurement.MeasurementSet): The decoded measurements.
+            now (float, optional): Monotonic reception time of the record, in seconds. Default is the current time.
+
+        Returns:
+            measurement.MeasurementSet: The measurements to report (the same object if none is suppressed), possibly empty.
+        """
+        if now is None:
+            now = time.monotonic()
+
+        reported = []
+        saved = 0
+        with self.lock:
+            for position, (sensor, value) in enumerate(measures):
+                ascii_id = sensor.ascii_id
+                deadband = self.deadbands.get(ascii_id)
+                if deadband is None:
+                    reported.append(position)
+                    continue
+
+                key = (node, ascii_id)
+                last = self.last.get(key)
+
+                if last is not None and now < last[2]:
+                    # Overtaken by a newer frame of the node: reported, but the newer value stays the reference
+                    self.reordered += 1
+                    reported.append(position)
+                    continue
+
+                if last is not None and deadband.inside(value, last[0]) and \
+                        (not deadband.heartbeat or now - last[1] < deadband.heartbeat):
+                    # '"ascii_id": {"value": ..., "unit": ...}, ' as it would have appeared in the JSON record
+                    saved += len(ascii_id) + len(json.dumps(value)) + len(json.dumps(sensor.unit)) + 27
+                    self.last[key] = (last[0], last[1], now)
+                    continue
+
+                self.last[key] = (value, now, now)
+                reported.append(position)
+
+            self.records += 1
+            self.values += len(measures)
+            self.suppressed += len(measures) - len(reported)
+            self.saved_bytes += saved
+            if not reported:
+                self.dropped += 1
+
+        return measures if len(reported) == len(measures) else measures.select(reported)
+
+    def stats(self) -> dict:
+        """
+        Returns the counters of the filter.
+        """
+        with self.lock:
+            return {
+                "records": self.records,
+                "dropped": self.dropped,
+                "values": self.values,
+                "suppressed": self.suppressed,
+                "reordered": self.reordered,
+                "saved_bytes": self.saved_bytes
+            }
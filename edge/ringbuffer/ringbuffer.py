@@ -0,0 +1,309 @@
+# ************************************** RING BUFFER MODULE **************************************
+
+import multiprocessing
+import os
+import struct
+import time
+from multiprocessing import shared_memory
+
+
+# Policies applied by the producer when all the slots are taken
+OVERFLOW_POLICIES = ('block', 'drop-oldest')
+
+# Header of the shared memory: head (next sequence to write), tail (next sequence to read), written, dropped
+HEADER = struct.Struct('<QQQQ')
+
+# Header of every slot: length of the data, state of the slot (3 padding bytes), pid of the consumer reading it
+SLOT_HEADER = struct.Struct('<IB3xI')
+
+# States of a slot
+FREE = 0
+READY = 1
+READING = 2
+
+
+class RingBufferFull(Exception):
+    """
+    Exception raised when a frame cannot be written because the ring buffer is still full after waiting.
+    """
+
+    def __init__(self, message="Ring buffer full"):
+        """
+        Constructor for RingBufferFull exception.
+
+        Args:
+            message (str, optional): Custom error message. Defaults to "Ring buffer full".
+        """
+        self.message = message
+        super().__init__(self.message)
+
+
+class RingBufferEmpty(Exception):
+    """
+    Exception raised when no frame is available after waiting.
+    """
+
+    def __init__(self, message="Ring buffer empty"):
+        """
+        Constructor for RingBufferEmpty exception.
+
+        Args:
+            message (str, optional): Custom error message. Defaults to "Ring buffer empty".
+        """
+        self.message = message
+        super().__init__(self.message)
+
+
+class Slot:
+    """
+    A frame claimed by a consumer. Its data is a view on the shared memory (no copy),
+    valid until the slot is released; it can be used as a context manager.
+
+    Attributes:
+        ring (RingBuffer): The ring buffer owning the slot.
+        index (int): The index of the slot.
+        data (memoryview): The frame's bytes, in shared memory.
+    """
+
+    def __init__(self, ring, index: int, data: memoryview):
+        """
+        Constructor for Slot class.
+
+        Args:
+            ring (RingBuffer): The ring buffer owning the slot.
+            index (int): The index of the slot.
+            data (memoryview): The frame's bytes, in shared memory.
+        """
+        self.ring = ring
+        self.index = index
+        self.data = data
+
+    def release(self):
+        """
+        Gives the slot back to the producer. The data must not be used afterwards.
+        """
+        if self.data is not None:
+            self.data.release()
+            self.data = None
+            self.ring.release(self.index)
+
+    def __enter__(self):
+        return self.data
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
+
+
+class RingBuffer:
+    """
+    Fixed-size, single-producer/multi-consumer ring buffer of frames in shared memory.
+    The receiver writes each frame once into a slot, decoder processes read it in place,
+    so frames are never pickled through a multiprocessing.Queue.
+
+    Attributes:
+        slots (int): Number of slots.
+        slot_size (int): Max size in bytes of a frame.
+        policy (str): What the producer does when all the slots are taken: 'block' or 'drop-oldest'.
+        memory (shared_memory.SharedMemory): The shared memory block.
+        condition (multiprocessing.Condition): Lock and notifications shared by producer and consumers.
+    """
+
+    def __init__(self, slots: int = 4096, slot_size: int = 512, policy: str = 'block', name: str = None, condition=None):
+        """
+        Constructor for RingBuffer class: creates a new shared memory block, or attaches to an existing one if a name is given.
+
+        Args:
+            slots (int, optional): Number of slots. Default is 4096.
+            slot_size (int, optional): Max size in bytes of a frame. Default is 512.
+            policy (str, optional): Overflow policy, one of OVERFLOW_POLICIES. Default is 'block'.
+            name (str, optional): The name of an existing shared memory block. Default is None (create a new one).
+            condition (multiprocessing.Condition, optional): The condition of an existing ring buffer. Default is None.
+
+        Raises:
+            ValueError: If the overflow policy is not supported.
+        """
+        if policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Overflow policy '{policy}' not supported. Use one of {OVERFLOW_POLICIES}.")
+
+        self.slots = slots
+        self.slot_size = slot_size
+        self.policy = policy
+        self.stride = SLOT_HEADER.size + slot_size
+
+        if name is None:
+            self.memory = shared_memory.SharedMemory(create=True, size=HEADER.size + slots * self.stride)
+            self.condition = multiprocessing.Condition()
+            self.owner = True
+        else:
+            self.memory = shared_memory.SharedMemory(name=name)
+            self.condition = condition
+            self.owner = False
+
+    def __getstate__(self):
+        # Processes attach to the same shared memory block and share the same condition
+        return (self.slots, self.slot_size, self.policy, self.memory.name, self.condition)
+
+    def __setstate__(self, state):
+        slots, slot_size, policy, name, condition = state
+        self.__init__(slots, slot_size, policy, name, condition)
+
+    def offset(self, index: int) -> int:
+        """
+        Returns the offset in shared memory of the header of a slot.
+
+        Args:
+            index (int): The index of the slot.
+        """
+        return HEADER.size + index * self.stride
+
+    def state(self, index: int) -> int:
+        """
+        Returns the state of a slot (FREE, READY or READING).
+
+        Args:
+            index (int): The index of the slot.
+        """
+        return SLOT_HEADER.unpack_from(self.memory.buf, self.offset(index))[1]
+
+    def reclaim(self, pid: int) -> int:
+        """
+        Frees the slots a dead consumer was reading: it will never release them, and the producer
+        would otherwise wait for them forever once the ring wraps. Their frames are counted as dropped.
+
+        Args:
+            pid (int): The pid of the dead consumer.
+
+        Returns:
+            int: Number of slots freed.
+        """
+        buf = self.memory.buf
+        freed = 0
+        with self.condition:
+            for index in range(self.slots):
+                _, state, owner = SLOT_HEADER.unpack_from(buf, self.offset(index))
+                if state == READING and owner == pid:
+                    SLOT_HEADER.pack_into(buf, self.offset(index), 0, FREE, 0)
+                    freed += 1
+
+            if freed:
+                head, tail, written, dropped = HEADER.unpack_from(buf, 0)
+                HEADER.pack_into(buf, 0, head, tail, written, dropped + freed)
+                self.condition.notify_all()
+        return freed
+
+    def put(self, data, timeout: float = None):
+        """
+        Copies a frame into the next slot. When all the slots are taken, the producer waits
+        for a consumer ('block') or overwrites the oldest unread frame ('drop-oldest').
+        A slot still being read is never overwritten: the producer waits for it, whatever the policy
+        (the slots of a consumer that died while reading are freed by reclaim).
+
+        Args:
+            data (bytes | bytearray | memoryview): The frame.
+            timeout (float, optional): Max seconds to wait for a free slot. Default is None (forever).
+
+        Raises:
+            ValueError: If the frame is larger than a slot.
+            RingBufferFull: If no slot became free before the timeout.
+        """
+        length = len(data)
+        if length > self.slot_size:
+            raise ValueError(f"Frame of {length} bytes exceeds the slot size ({self.slot_size} bytes).")
+
+        buf = self.memory.buf
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        with self.condition:
+            while True:
+                head, tail, written, dropped = HEADER.unpack_from(buf, 0)
+                index = head % self.slots
+                state = self.state(index)
+
+                if state == FREE:
+                    break
+
+                if state == READY and self.policy == 'drop-oldest':
+                    # The slot holds the oldest unread frame (head - tail == slots): discard it
+                    SLOT_HEADER.pack_into(buf, self.offset(index), 0, FREE, 0)
+                    HEADER.pack_into(buf, 0, head, tail + 1, written, dropped + 1)
+                    break
+
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise RingBufferFull
+                self.condition.wait(remaining)
+
+            start = self.offset(index) + SLOT_HEADER.size
+            buf[start:start + length] = data
+            SLOT_HEADER.pack_into(buf, self.offset(index), length, READY, 0)
+
+            head, tail, written, dropped = HEADER.unpack_from(buf, 0)
+            HEADER.pack_into(buf, 0, head + 1, tail, written + 1, dropped)
+            self.condition.notify_all()
+
+    def get(self, timeout: float = None) -> Slot:
+        """
+        Claims the oldest unread frame. The returned slot must be released once the frame has been used.
+
+        Args:
+            timeout (float, optional): Max seconds to wait for a frame. Default is None (forever).
+
+        Returns:
+            Slot: The claimed slot, whose data is a view on the shared memory.
+
+        Raises:
+            RingBufferEmpty: If no frame arrived before the timeout.
+        """
+        buf = self.memory.buf
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        with self.condition:
+            while True:
+                head, tail, written, dropped = HEADER.unpack_from(buf, 0)
+                if tail < head:
+                    break
+
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise RingBufferEmpty
+                self.condition.wait(remaining)
+
+            index = tail % self.slots
+            length = SLOT_HEADER.unpack_from(buf, self.offset(index))[0]
+            SLOT_HEADER.pack_into(buf, self.offset(index), length, READING, os.getpid())
+            HEADER.pack_into(buf, 0, head, tail + 1, written, dropped)
+
+        start = self.offset(index) + SLOT_HEADER.size
+        return Slot(self, index, buf[start:start + length])
+
+    def release(self, index: int):
+        """
+        Marks a slot as free and wakes up a waiting producer.
+
+        Args:
+            index (int): The index of the slot.
+        """
+        with self.condition:
+            SLOT_HEADER.pack_into(self.memory.buf, self.offset(index), 0, FREE, 0)
+            self.condition.notify_all()
+
+    def stats(self) -> dict:
+        """
+        Returns the counters of the ring buffer.
+        """
+        with self.condition:
+            head, tail, written, dropped = HEADER.unpack_from(self.memory.buf, 0)
+        return {
+            "depth": head - tail,
+            "slots": self.slots,
+            "written": written,
+            "dropped": dropped
+        }
+
+    def close(self):
+        """
+        Detaches from the shared memory; the creator also frees it.
+        """
+        self.memory.close()
+        if self.owner:
+            self.memory.unlink()
@@ -1,3 +1,3 @@
 #!/bin/env /bin/bash
 emqx start
-python3 -u /home/tcp_module.py
\ No newline at end of file
+python3 -u /home/launcher.py
\ No newline at end of file
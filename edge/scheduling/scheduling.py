@@ -0,0 +1,195 @@
+# ************************************** SCHEDULING MODULE **************************************
+
+import threading
+import time
+from collections import OrderedDict
+import libellium.frametype as ft
+import libellium.aes as aes
+
+# Offsets of the raw Libellium header: '<=>', frame type, number of bytes, serial ID (8 bytes, big endian)
+TYPE_OFFSET = 3
+SERIAL_ID_START = 5
+SERIAL_ID_END = 13
+
+
+def peek(frame, key_store=None) -> tuple:
+    """
+    Reads the frame type and the serial ID of a raw Libellium frame without decoding it,
+    so that frames can be scheduled as soon as they are received. The header of an encrypted frame is read
+    by decrypting its first block only; if that is not possible, the frame is scheduled as an event
+    (never shed nor queued behind routine traffic) until the decode stage confirms its priority.
+
+    Args:
+        frame (bytes | memoryview): The raw Libellium frame.
+        key_store (aes.KeyStore, optional): The keys of the nodes, to read the encrypted frames. Default is None.
+
+    Returns:
+        tuple: The scheduling priority of the frame and the serial ID of its node (None if the frame is too short,
+               or encrypted and unreadable without its serial ID in clear).
+    """
+    if len(frame) < SERIAL_ID_END:
+        return ft.PRIORITY_ROUTINE, None
+    frame_type = frame[TYPE_OFFSET]
+    if frame_type in aes.KEY_SIZES:
+        header = key_store.header(frame) if key_store is not None else None
+        if header is not None:
+            frame = header
+        elif frame_type in aes.CLEAR_SERIAL_ID:
+            return ft.PRIORITY_EVENT, int.from_bytes(frame[SERIAL_ID_START:SERIAL_ID_END], 'big')
+        else:
+            return ft.PRIORITY_EVENT, None
+    return ft.priority(frame[TYPE_OFFSET]), int.from_bytes(frame[SERIAL_ID_START:SERIAL_ID_END], 'big')
+
+
+class TokenBucket:
+    """
+    Token bucket of a node: 'rate' tokens per second are added up to 'burst', and each admitted frame takes one.
+
+    Attributes:
+        tokens (float): The tokens left.
+        stamp (float): Monotonic time of the last refill, in seconds.
+    """
+
+    __slots__ = ('tokens', 'stamp')
+
+    def __init__(self, tokens: float, stamp: float):
+        """
+        Constructor for TokenBucket class.
+
+        Args:
+            tokens (float): The initial tokens.
+            stamp (float): Monotonic time of the creation, in seconds.
+        """
+        self.tokens = tokens
+        self.stamp = stamp
+
+    def take(self, rate: float, burst: float, now: float) -> bool:
+        """
+        Refills the bucket and takes a token if there is one.
+
+        Args:
+            rate (float): Tokens added per second.
+            burst (float): Max tokens.
+            now (float): Monotonic time, in seconds.
+
+        Returns:
+            bool: Whether a token was taken.
+        """
+        self.tokens = min(burst, self.tokens + (now - self.stamp) * rate)
+        self.stamp = now
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+
+class Admission:
+    """
+    Per-node admission control of the received frames: each node may send routine frames at 'rate' per second
+    (with bursts of 'burst'); the routine frames beyond that are shed before being queued. Alarm and event frames
+    are always admitted and do not take tokens. At most 'max_nodes' buckets are kept: the bucket of the node
+    not seen for the longest time is dropped first (that node then starts again with a full bucket).
+
+    Attributes:
+        rate (float): Routine frames per second admitted per node.
+        burst (float): Max routine frames admitted at once per node.
+        max_nodes (int): Max number of buckets.
+        admitted (list): Number of frames admitted, per priority.
+        shed (list): Number of frames shed, per priority.
+    """
+
+    def __init__(self, rate: float, burst: float = 10, max_nodes: int = 65536):
+        """
+        Constructor for Admission class.
+
+        Args:
+            rate (float): Routine frames per second admitted per node.
+            burst (float, optional): Max routine frames admitted at once per node. Default is 10.
+            max_nodes (int, optional): Max number of buckets. Default is 65536.
+        """
+        self.rate = rate
+        self.burst = burst
+        self.max_nodes = max_nodes
+        self.buckets = OrderedDict()
+        self.admitted = [0] * len(ft.PRIORITY_NAMES)
+        self.shed = [0] * len(ft.PRIORITY_NAMES)
+        self.lock = threading.Lock()
+
+    def admit(self, node, priority: int, now: float = None) -> bool:
+        """
+        Returns whether a frame is admitted.
+
+        Args:
+            node: The identifier of the node (e.g. its serial ID), None if unknown.
+            priority (int): The scheduling priority of the frame.
+            now (float, optional): Monotonic time of the frame, in seconds. Default is the current time.
+        """
+        if priority != ft.PRIORITY_ROUTINE or node is None:
+            with self.lock:
+                self.admitted[priority] += 1
+            return True
+
+        if now is None:
+            now = time.monotonic()
+
+        with self.lock:
+            bucket = self.buckets.get(node)
+            if bucket is None:
+                if len(self.buckets) >= self.max_nodes:
+                    self.buckets.popitem(last=False)
+                bucket = self.buckets[node] = TokenBucket(self.burst, now)
+            else:
+                self.buckets.move_to_end(node)
+
+            if bucket.take(self.rate, self.burst, now):
+                self.admitted[priority] += 1
+                return True
+            self.shed[priority] += 1
+            return False
+
+    def stats(self) -> dict:
+        """
+        Returns the number of frames admitted and shed, per priority: {"admitted": {priority: int}, "shed": {...}}.
+        """
+        with self.lock:
+            return {
+                "nodes": len(self.buckets),
+                "admitted": dict(zip(ft.PRIORITY_NAMES, self.admitted)),
+                "shed": dict(zip(ft.PRIORITY_NAMES, self.shed))
+            }
+
+
+if __name__ == '__main__':
+    import pipeline.pipeline as pipeline
+
+    frame = bytes.fromhex("3C3D3E06451B20B4BD3C195E206E6F64655F3031231434641500000000006185EB3F0100000000"
+                          "046179913E4A7B14C4414C005462424DBFD0C647460000000047000000004800000000")
+    alarm = frame[:TYPE_OFFSET] + bytes([0x03]) + frame[TYPE_OFFSET + 1:]
+
+    # Burst of routine frames in front of a slow stage, then an alarm: the alarm is served next
+    order = []
+
+    def slow(context):
+        time.sleep(0.001)
+        order.append(context.priority)
+        return context
+
+    stage = pipeline.Stage("publish", slow, workers=1, queue_size=100)
+    burst = pipeline.Pipeline([stage])
+    for _ in range(100):
+        burst.submit(pipeline.FrameContext(frame, priority=peek(frame)[0]))
+    burst.submit(pipeline.FrameContext(alarm, priority=peek(alarm)[0]))
+    burst.start()
+    while len(order) < 100:
+        time.sleep(0.01)
+    print(f"Alarm served in position {order.index(ft.PRIORITY_ALARM) + 1} after a burst of 100 routine frames, "
+          f"shed per priority: {stage.stats()['shed']}")
+
+    # One node sending 100 routine frames and 10 alarms at once: routine frames beyond the burst are shed
+    admission = Admission(rate=5, burst=10)
+    serial_id = peek(frame)[1]
+    for _ in range(100):
+        admission.admit(serial_id, ft.PRIORITY_ROUTINE, now=0)
+    for _ in range(10):
+        admission.admit(serial_id, ft.PRIORITY_ALARM, now=0)
+    print(f"Admission: {admission.stats()}")
@@ -1,25 +1,68 @@
 from datetime import datetime
+import asyncio
+import os
+import queue
 import socket
 import threading
-import json
+import time
 import libellium.libellium as libellium
+import libellium.stream as stream
+import libellium.frametype as ft
+import pipeline.pipeline as pipeline
+import ringbuffer.ringbuffer as ringbuffer
 import mqttx.mqttx as mqttx
+import cloud_sender.cloud_sender as cloud_sender
+import outbox.outbox as outbox
+import reporting.reporting as reporting
+import fleet.fleet as fleet
+import scheduling.scheduling as scheduling
+import capture.capture as capture
+import wire.wire as wire
+import metrics.metrics as metrics
+import logs.logs as logs
+import tracing.tracing as tracing
 import config as config
-import requests
+
+# Classes of log messages of the hot path, sampled as set by LOG_SAMPLING
+FRAMES = logs.get_logger('frames')
+RECORDS = logs.get_logger('records')
+PUBLISH = logs.get_logger('publish')
+# Connections of the gateways
+SERVER = logs.get_logger('server')
 
 
 class TcpModule:
     """
     TCP Module for handling Libellium frames received over TCP, parsing them, and publishing the measurements to an MQTT broker.
+    Received frames flow through a pipeline of stages (decode -> publish) connected by bounded queues.
 
     Attributes:
         ip_address (str): Host's IP address. Default is 'localhost'.
         port_number (int): Host's port number where it is listening. Default is 0 (gets the first available port).
         buffer_size (int): Max dimension in bytes readable from messages. Default is 1024 bytes.
-        buffer (str): An empty buffer where raw data will be written.
+        ingest_mode (str): Encoding of the received frames: 'hex' (hexadecimal text), 'binary' (raw Libellium frames) or 'auto'. Default is 'hex'.
+        backlog (int): Max number of connections waiting to be accepted. Default is 5.
+        idle_timeout (float): Seconds of silence after which a connection is closed. Default is None (never).
+        reuse_port (bool): Whether to bind with SO_REUSEPORT, so that several processes can share the port. Default is False.
+        ring (ringbuffer.RingBuffer): Shared memory ring buffer towards decoder processes. Default is None (decode in this process).
+        publisher (mqttx.Client): Long-lived MQTT client publishing the measurements, shared by all the threads.
+        sender (cloud_sender.CloudSender): Pooled keep-alive HTTP session uploading the measurements to the cloud.
+        uploader (cloud_sender.BatchUploader): Batches the measurements for the cloud's bulk endpoint. Default is None (one request per frame).
+        report_filter (reporting.ReportFilter): Suppresses the measurements that did not change enough. Default is None (report everything).
+        codec (wire.Codec): Serializes the published and uploaded records, as JSON or in the compact format. Default is JSON.
+        tracer (tracing.Tracer): Logs the spans of the sampled frames. Default is None (no trace log).
+        fleet_table (fleet.FleetTable): State of every node, used to drop retransmitted frames. Default is None (no tracking).
+        admission (scheduling.Admission): Per-node rate limit of the routine frames. Default is None (every frame is admitted).
+        capture_writer (capture.CaptureWriter): Records every received frame for replay. Default is None (no capture).
+        topic_mode (str): How measurements are published on MQTT, one of mqttx.TOPIC_MODES. Default is 'record'.
+        pipeline (pipeline.Pipeline): The decode and publish stages, with their worker threads.
     """
 
-    def __init__(self, ip_address='localhost', port_number=0, buffer_size=1024):
+    def __init__(self, ip_address='localhost', port_number=0, buffer_size=1024, ingest_mode='hex',
+                 backlog=5, idle_timeout=None, decode_workers=4, publish_workers=2, queue_size=1024, reuse_port=False,
+                 ring=None, publisher=None, sender=None, uploader=None, report_filter=None,
+                 codec=None, tracer=None, fleet_table=None, admission=None, capture_writer=None,
+                 topic_mode='record'):
         """
         Constructor: Defines a configurable method to initialize TCP server.
 
@@ -27,144 +70,651 @@ class TcpModule:
             ip_address (str, optional): Host's IP address. Default is 'localhost'.
             port_number (int, optional): Host's port number where it is listening. Default is 0 (gets the first available port).
             buffer_size (int, optional): Max dimension in bytes readable from messages. Default is 1024 bytes.
+            ingest_mode (str, optional): Encoding of the received frames: 'hex', 'binary' or 'auto' (detected per connection). Default is 'hex'.
+            backlog (int, optional): Max number of connections waiting to be accepted. Default is 5.
+            idle_timeout (float, optional): Seconds of silence after which a connection is closed. Default is None (never).
+            decode_workers (int, optional): Number of threads of the decode stage. Default is 4.
+            publish_workers (int, optional): Number of threads of the publish stage. Default is 2.
+            queue_size (int, optional): Capacity of the queue in front of each stage; receivers block when it is full. Default is 1024.
+            reuse_port (bool, optional): Whether to bind with SO_REUSEPORT (the kernel then spreads connections across processes). Default is False.
+            ring (ringbuffer.RingBuffer, optional): If given, received frames are written into this ring buffer for decoder processes
+                                                    instead of being decoded by this module's pipeline. Default is None.
+            publisher (mqttx.Client, optional): The MQTT client to publish with. Default is a new client for the configured broker.
+            sender (cloud_sender.CloudSender, optional): The HTTP sender to upload with. Default is a new sender for the configured cloud.
+            uploader (cloud_sender.BatchUploader, optional): If given, measurements are uploaded in batches through it. Default is None.
+            report_filter (reporting.ReportFilter, optional): If given, a filter stage between decoding and publishing
+                                                             suppresses the measurements inside their deadband. Default is None.
+            codec (wire.Codec, optional): The format of the published and uploaded records. Default is JSON.
+            tracer (tracing.Tracer, optional): If given, the spans of the sampled frames are logged through it. Default is None.
+            fleet_table (fleet.FleetTable, optional): If given, the decode stage (the receiver, with a ring buffer) tracks
+                                                      the sequence numbers of the nodes in it and drops their retransmitted
+                                                      frames. Default is None.
+            admission (scheduling.Admission, optional): If given, the routine frames of a node beyond its rate
+                                                        are shed as soon as they are received. Default is None.
+            capture_writer (capture.CaptureWriter, optional): If given, every received frame is appended to its log,
+                                                              before admission control. Default is None.
+            topic_mode (str, optional): 'record' (one record on the measurements topic), 'sensor' (one retained message
+                                        per sensor on its own topic) or 'both'. Default is 'record'.
         """
+        if ingest_mode not in stream.ENCODINGS:
+            raise ValueError(f"Ingest mode '{ingest_mode}' not supported. Use one of {stream.ENCODINGS}.")
+        if topic_mode not in mqttx.TOPIC_MODES:
+            raise ValueError(f"Topic mode '{topic_mode}' not supported. Use one of {mqttx.TOPIC_MODES}.")
+
         self.ip_address = ip_address
         self.port_number = port_number
         self.buffer_size = buffer_size
-        self.buffer = ''
+        self.ingest_mode = ingest_mode
+        self.backlog = backlog
+        self.idle_timeout = idle_timeout
+        self.reuse_port = reuse_port
+        self.ring = ring
+
+        # Connections opened once and reused for every frame
+        if publisher is None:
+            publisher = mqttx.Client(config.BROKER_IP_ADDRESS, port=int(config.BROKER_PORT_NUMBER),
+                                     keepalive=int(config.MQTT_KEEPALIVE),
+                                     reconnect_min_delay=int(config.MQTT_RECONNECT_MIN_DELAY),
+                                     reconnect_max_delay=int(config.MQTT_RECONNECT_MAX_DELAY))
+        if sender is None:
+            sender = cloud_sender.CloudSender(config.CLOUD_URL, int(config.HTTP_POOL_SIZE),
+                                              float(config.HTTP_CONNECT_TIMEOUT), float(config.HTTP_READ_TIMEOUT),
+                                              int(config.HTTP_RETRIES))
+        self.publisher = publisher
+        self.sender = sender
+        self.uploader = uploader
+        self.report_filter = report_filter
+        self.codec = codec if codec is not None else wire.Codec('json', room=config.ROOM)
+        self.tracer = tracer
+        self.fleet_table = fleet_table
+        self.admission = admission
+        self.capture_writer = capture_writer
+        self.topic_mode = topic_mode
+        # Topics of the sensors, built on first use: {ascii_id: '<measurements topic>/<ascii_id>'}
+        self.sensor_topics = {}
+
+        stages = [pipeline.Stage("decode", self.decode_stage, decode_workers, queue_size)]
+        if report_filter is not None:
+            stages.append(pipeline.Stage("filter", self.filter_stage, 1, queue_size))
+        stages.append(pipeline.Stage("publish", self.publish_stage, publish_workers, queue_size))
+        self.pipeline = pipeline.Pipeline(stages, tracer)
 
     def start(self):
         """
         Starts a TCP connection and listens for incoming connections on the specified IP and port.
         When a connection is established, this function creates a new thread to handle the connection.
         """
+        self.publisher.start()
+        if self.uploader is not None:
+            self.uploader.start()
+        self.pipeline.start()
+
         try:
             # Socket creation
             s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            if self.reuse_port:
+                s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
 
             # Bind
             s.bind((self.ip_address, self.port_number))
 
-            # Listen (max 5 connections)
-            s.listen(5)
+            # Listen (max 'backlog' pending connections)
+            s.listen(self.backlog)
 
             # Message at start
-            print(f"[TCP MODULE] Server on: <{self.ip_address}, {self.port_number}>")
+            SERVER.info("Server on: <%s, %s> (%s frames)", self.ip_address, self.port_number, self.ingest_mode)
 
             # Always listening for new connections
             while True:
                 # Accept: returns a tuple (socket, (ip, port)) of the client
                 connection, client_address = s.accept()
-                print("[TCP MODULE] Client: " + str(client_address))
+                SERVER.debug("Client: %s", client_address)
 
                 # Start a new thread
-                t = threading.Thread(target=self.thread_function, args=(connection,))
+                t = threading.Thread(target=self.thread_function, args=(connection, client_address))
                 t.start()
 
         except socket.error as e:
-            print("[TCP MODULE] TCP connection error: " + str(e))
+            SERVER.error("TCP connection error: %s", e)
+
+    def start_async(self):
+        """
+        Starts the TCP server in asyncio mode: a single event loop holds all the connections,
+        while frames are decoded and published by the pipeline's worker threads so the loop never blocks.
+        """
+        self.publisher.start()
+        if self.uploader is not None:
+            self.uploader.start()
+        self.pipeline.start()
+
+        try:
+            asyncio.run(self.serve())
+        except OSError as e:
+            SERVER.error("TCP connection error: %s", e)
+
+    async def serve(self):
+        """
+        Coroutine of the asyncio mode: listens for new connections and serves them forever.
+        """
+        server = await asyncio.start_server(self.handle_connection, self.ip_address, self.port_number,
+                                            backlog=self.backlog, reuse_address=True, reuse_port=self.reuse_port)
+
+        # Message at start
+        SERVER.info("Asyncio server on: <%s, %s> (%s frames)", self.ip_address, self.port_number, self.ingest_mode)
+
+        async with server:
+            await server.serve_forever()
+
+    async def handle_connection(self, reader, writer):
+        """
+        Coroutine serving one connection in asyncio mode: splits the stream into frames
+        and submits each one to the pipeline. Reads of the connection are paused while
+        the decode queue is full.
+
+        Args:
+            reader (asyncio.StreamReader): The stream of the client.
+            writer (asyncio.StreamWriter): The writer of the client, used to close the connection.
+        """
+        client_address = writer.get_extra_info('peername')
+        SERVER.debug("Client: %s", client_address)
+
+        splitter = stream.FrameSplitter(self.ingest_mode)
+
+        try:
+            while True:
+                data = await asyncio.wait_for(reader.read(self.buffer_size), self.idle_timeout)
+                if not data:
+                    break
+
+                for frame in splitter.feed(data):
+                    start = time.perf_counter()
+                    item = self.admit(frame, client_address)
+                    if item is not None:
+                        try:
+                            self.hand_over(item, block=False)
+                        except (queue.Full, ringbuffer.RingBufferFull):
+                            # Wait for a free slot outside of the event loop (the frame is already captured and admitted)
+                            await asyncio.to_thread(self.hand_over, item)
+                    metrics.RECEIVE_SECONDS.since(start)
+
+        except asyncio.TimeoutError:
+            SERVER.debug("Idle client closed: %s", client_address)
+        except OSError as e:
+            SERVER.warning("TCP connection error: %s", e)
+
+        finally:
+            splitter.reset()
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except OSError:
+                pass
+
+    def receive(self, frame, client_address=None, block=True):
+        """
+        Hands a received frame over: to the decoder processes through the ring buffer if any,
+        to this module's pipeline otherwise. The frame type is peeked first: alarms and events
+        overtake routine frames in the queues, and routine frames beyond their node's rate are shed.
+
+        Args:
+            frame (bytes): The raw Libellium frame.
+            client_address (tuple, optional): The (ip, port) of the client. Default is None.
+            block (bool, optional): Whether to wait while the ring buffer or the decode queue is full. Default is True.
+
+        Raises:
+            queue.Full: If the decode queue is full and block is False.
+            ringbuffer.RingBufferFull: If the ring buffer is full and block is False.
+        """
+        start = time.perf_counter()
+        item = self.admit(frame, client_address)
+        if item is not None:
+            self.hand_over(item, block)
+        metrics.RECEIVE_SECONDS.since(start)
+
+    def admit(self, frame, client_address=None):
+        """
+        First step of the hand-over of a received frame, run exactly once per frame: captures and counts the frame,
+        peeks its type and node, and sheds it if its node is over its rate. Towards decoder processes,
+        retransmitted frames are dropped here too.
+
+        Args:
+            frame (bytes): The raw Libellium frame.
+            client_address (tuple, optional): The (ip, port) of the client. Default is None.
+
+        Returns:
+            bytes | pipeline.FrameContext | None: What to hand over (the frame for the ring buffer, its context
+                                                  for the pipeline), None if the frame was shed or dropped.
+        """
+        if self.capture_writer is not None:
+            self.capture_writer.append(frame)
+        metrics.FRAMES_RECEIVED.inc(client_address[0] if client_address else 'unknown')
+
+        priority, node = scheduling.peek(frame, libellium.KEY_STORE)
+        if self.admission is not None and not self.admission.admit(node, priority):
+            metrics.SHED_FRAMES.inc(ft.PRIORITY_NAMES[priority], "rate")
+            return None
+        if self.ring is not None:
+            # The decoder processes cannot share the fleet table: retransmissions are dropped here, from the header
+            if self.fleet_table is not None and self.observe_header(frame) == fleet.DUPLICATE:
+                metrics.DUPLICATE_FRAMES.inc()
+                return None
+            return frame
+        return pipeline.FrameContext(frame, client_address, priority)
+
+    def observe_header(self, frame):
+        """
+        Updates the state of the node of a frame from its header only, as the receiver of decoder processes does.
+        The battery level of the node is not tracked then, since it is only known once the payload is decoded.
+
+        Args:
+            frame (bytes): The raw Libellium frame.
+
+        Returns:
+            str | None: The outcome of fleet.FleetTable.observe, None if the header cannot be read
+                        (the frame is then left to the decoder, which reports it).
+        """
+        measurement = libellium.Libellium(frame)
+        try:
+            measurement.decrypt()
+            measurement.parse_header_bytes(memoryview(measurement.frame))
+        except Exception:
+            return None
+        return self.fleet_table.observe(measurement.serial_id, measurement.waspmote_id, measurement.frame_sequence)
+
+    def hand_over(self, item, block=True):
+        """
+        Second step of the hand-over of a received frame: puts what 'admit' returned into the ring buffer
+        or the decode queue. Only this step is retried when they are full.
+
+        Args:
+            item (bytes | pipeline.FrameContext): The frame for the ring buffer, or its context for the pipeline.
+            block (bool, optional): Whether to wait while the ring buffer or the decode queue is full. Default is True.
+
+        Raises:
+            queue.Full: If the decode queue is full and block is False.
+            ringbuffer.RingBufferFull: If the ring buffer is full and block is False.
+        """
+        if self.ring is not None:
+            self.ring.put(item, timeout=None if block else 0)
+        else:
+            self.pipeline.submit(item, block=block)
+
+    def consume(self, ring):
+        """
+        Body of a decoder process: claims frames from the ring buffer, decodes them in place
+        in shared memory, then hands them to the publish stage. Never returns.
+
+        Args:
+            ring (ringbuffer.RingBuffer): The ring buffer filled by the receiver process.
+        """
+        self.publisher.start()
+        if self.uploader is not None:
+            self.uploader.start()
+        self.pipeline.start()
+        decode = self.pipeline.stages[0]
+
+        while True:
+            slot = ring.get()
+            context = pipeline.FrameContext(slot.data)
+            self.pipeline.trace(context)
+            try:
+                result = decode.handle(context)
+            finally:
+                # The frame is only valid until the slot is released
+                context.frame = None
+                slot.release()
+
+            decode.forward(result)
+
+    def decode_stage(self, context):
+        """
+        Decode stage of the pipeline: decodes the frame of the context and updates the state of its node.
+
+        Args:
+            context (pipeline.FrameContext): The context of the frame.
+
+        Returns:
+            pipeline.FrameContext | None: The context with its decoded measures, or None if the frame is a retransmission.
+        """
+        measurement = self.parse(context.frame)
+        context.node = measurement.waspmote_id
+        context.priority = getattr(measurement.type, 'priority', context.priority)
+        context.measures = measurement.measurements
+        metrics.NODE_FRAMES.inc(context.node)
+
+        if self.fleet_table is not None:
+            outcome = self.fleet_table.observe(measurement.serial_id, measurement.waspmote_id, measurement.frame_sequence,
+                                               context.measures.get("BAT"))
+            if outcome == fleet.DUPLICATE:
+                metrics.DUPLICATE_FRAMES.inc()
+                return None
+        return context
+
+    def filter_stage(self, context):
+        """
+        Filter stage of the pipeline: keeps only the measures of the context that moved out of their deadband.
+        Alarm and event frames are always reported in full.
+
+        Args:
+            context (pipeline.FrameContext): The context of the frame.
+
+        Returns:
+            pipeline.FrameContext | None: The context with its reported measures, or None if none is left.
+        """
+        if context.priority != ft.PRIORITY_ROUTINE:
+            return context
+        context.measures = self.report_filter.apply(context.node, context.measures, context.received_at)
+        return context if context.measures else None
 
-    def decode(self):
+    def publish_stage(self, context):
+        """
+        Publish stage of the pipeline: uploads the measures of the context.
+
+        Args:
+            context (pipeline.FrameContext): The context of the frame.
+
+        Returns:
+            pipeline.FrameContext: The published context.
+        """
+        self.to_mqtt_broker(context.measures, context)
+        metrics.FRAME_SECONDS.observe(time.monotonic() - context.received_at)
+        return context
+
+    def decode(self, frame):
         """
         Decodes the received frame into structured data using the 'libellium' module's utilities.
         Returns a dictionary with collected measurements: {measure_type: {measure_value, measure_unit}}.
+
+        Args:
+            frame (str | bytes): The frame to decode, in hexadecimal format or as raw bytes.
+        """
+        return self.measures(self.parse(frame))
+
+    def parse(self, frame):
+        """
+        Parses the received frame using the 'libellium' module's utilities.
+
+        Args:
+            frame (str | bytes): The frame to parse, in hexadecimal format or as raw bytes.
+
+        Returns:
+            libellium.Libellium: The parsed frame.
         """
         # Call to 'libellium' module utilities
-        measurement = libellium.Libellium(self.buffer)
+        measurement = libellium.Libellium(frame)
         measurement.parse()
-        print(measurement)
-
-        # Create a dictionary of measures
-        measurements = {}
-        for measure in measurement.measurements:
+        # Formatted only if this frame dump is sampled
+        FRAMES.info("%s", measurement)
+        return measurement
 
-            json_data = {
-                "value": measure[1],
-                "unit": measure[0].unit
-            }
-            
-            measurements[measure[0].ascii_id] = json_data
+    def measures(self, measurement):
+        """
+        Returns a dictionary with the measurements of a parsed frame: {measure_type: {measure_value, measure_unit}}.
 
-        return measurements
+        Args:
+            measurement (libellium.Libellium): The parsed frame.
+        """
+        return measurement.measurements.to_dict()
 
-    def to_mqtt_broker(self, measures):
+    def to_mqtt_broker(self, measures, context=None):
         """
-        Publishes the collected measurements to the MQTT broker for the selected topic using the 'mqttx' module.
+        Publishes the collected measurements to the MQTT broker using the 'mqttx' module, as a record on the measurements
+        topic and/or as a retained message per sensor on its own topic (see 'topic_mode'), then uploads them to the cloud. Both go through connections opened once and shared by all the threads.
+        The record's metadata carries the trace ID and the monotonic reception time of the frame.
 
         Args:
-            measures (dict): A dictionary of measurement data {measure_type: measure_value}.
+            measures (libellium.measurement.MeasurementSet | dict): The measurements, serialized straight from their columns,
+                                                                    or a dictionary {measure_type: {measure_value, measure_unit}}.
+            context (pipeline.FrameContext, optional): The context of the frame. Default is None (record not traced).
         """
+        now = datetime.now()
+        metadata = {
+            "date": now.strftime('%Y-%m-%d'),
+            "time": now.strftime('%H:%M:%S.%f')[:-5],
+            "room": config.ROOM,
+            "broker": config.BROKER_IP_ADDRESS + ":" + config.BROKER_PORT_NUMBER,
+            "topic": config.TOPIC_MEASUREMENTS
+        }
+        spans = None
+        if context is not None:
+            metadata["trace_id"] = context.trace_id
+            metadata["received_at"] = round(context.received_at, 6)
+            spans = context.spans
+
+        # dict to JSON (or to the compact format)
+        record = self.codec.record(metadata, measures, now)
+        RECORDS.info("%s", record)
+
+        begin = time.monotonic()
         try:
-            # Starts an MQTTX client
-            #publisher = mqttx.Client(config.BROKER_IP_ADDRESS, config.TOPIC_MEASUREMENTS)
-            #publisher.start()
-
-            # dict to JSON
-            json_string = {
-                "metadata": {
-                    "date": datetime.today().strftime('%Y-%m-%d'),
-                    "time": datetime.now().strftime('%H:%M:%S.%f')[:-5],
-                    "room": config.ROOM,
-                    "broker": config.BROKER_IP_ADDRESS + ":" + config.BROKER_PORT_NUMBER,
-                    "topic": config.TOPIC_MEASUREMENTS
-                },
-                "data": measures
-            }
-
-            json_string = json.dumps(json_string)
-
-            # Definire l'URL di destinazione
-            url = "http://127.0.0.1:8000/display_json"  # Sostituisci con l'URL effettivo
-
-            # Impostare le intestazioni HTTP (opzionale)
-            headers = {
-                "Content-Type": "application/json",
-            }
-            print(json_string)
-            # Effettuare la richiesta HTTP POST con i dati JSON nel corpo
-            response = requests.post(url, data=json_string, headers=headers)
-
-            # Verificare la risposta
-            if response.status_code == 200:
-                print("Richiesta inviata con successo.")
-            else:
-                print("Errore nella richiesta:", response.status_code)
-                print(response.text)  # Puoi stampare la risposta per ottenere ulteriori dettagli sull'errore, se presente
-
-            # Publish on the given topic
-            publisher.publish(json_string)
-
-            # Stop the client
-            publisher.stop()
+            # Publish on the given topic (the local broker does not depend on the cloud being reachable)
+            if self.topic_mode != 'sensor':
+                self.publisher.publish(self.codec.message(record), config.TOPIC_MEASUREMENTS)
+            # Fan out to one retained topic per sensor, all the messages of the record pipelined
+            if self.topic_mode != 'record':
+                messages = self.codec.sensor_messages(metadata, measures, now)
+                self.publisher.publish_many([(self.sensor_topic(ascii_id), message)
+                                             for ascii_id, message in messages.items()], retain=True)
+                metrics.MQTT_SENSOR_MESSAGES.inc(amount=len(messages))
+            if spans is not None:
+                spans.append(("mqtt", begin, time.monotonic()))
 
         except mqttx.MqttConnectionError:
-            print("[MQTTX MODULE]: connection error.")
+            PUBLISH.warning("[MQTTX MODULE]: connection error.")
+            metrics.MQTT_FAILURES.inc()
         except mqttx.MqttSubscriptionError:
-            print("[MQTTX MODULE]: subscription error.")
+            PUBLISH.warning("[MQTTX MODULE]: subscription error.")
+            metrics.MQTT_FAILURES.inc()
         except mqttx.MqttTopicNotSpecified:
-            print("[MQTTX MODULE]: topic not specified.")
+            PUBLISH.warning("[MQTTX MODULE]: topic not specified.")
+            metrics.MQTT_FAILURES.inc()
         except mqttx.MqttPublishError:
-            print("[MQTTX MODULE]: publish error.")
+            PUBLISH.warning("[MQTTX MODULE]: publish error.")
+            metrics.MQTT_FAILURES.inc()
+
+        if self.uploader is not None:
+            # Uploaded with the next batch (the cloud logs when it is received)
+            self.uploader.add(record)
+            return
+
+        begin = time.monotonic()
+
+        # HTTP POST with the record in the body, on a pooled keep-alive connection
+        if self.codec.format == 'json':
+            response = self.sender.send(record)
+        else:
+            response = self.sender.send(self.codec.message(record), {"Content-Type": wire.CONTENT_TYPES['compact']})
+
+        if spans is not None:
+            spans.append(("post", begin, time.monotonic()))
+
+        # Check the response
+        if response.status_code == 200:
+            metrics.UPLOADED_RECORDS.inc()
+            PUBLISH.debug("Record uploaded.")
+        else:
+            # The body of the response details the error, if any
+            PUBLISH.warning("Record not accepted: %s %s", response.status_code, response.text[:200])
+
+    def sensor_topic(self, ascii_id: str) -> str:
+        """
+        Returns the MQTT topic of a sensor: '<measurements topic>/<ascii_id>'.
+
+        Args:
+            ascii_id (str): The ASCII ID of the sensor.
+        """
+        topic = self.sensor_topics.get(ascii_id)
+        if topic is None:
+            topic = self.sensor_topics[ascii_id] = f"{config.TOPIC_MEASUREMENTS}/{ascii_id}"
+        return topic
 
-    def thread_function(self, connection):
+    def thread_function(self, connection, client_address=None):
         """
         When a connection is established, this function represents a thread
         that waits for new messages on the given connection and completes
         expected tasks of this module for the received data.
+        The connection is kept open until the client closes it, so a gateway can
+        stream any number of frames, even split across or packed into TCP segments.
 
         Args:
             connection (socket.socket): The connection socket for communication with the client.
+            client_address (tuple, optional): The (ip, port) of the client. Default is None.
         """
-        # Receive: writes the established number of bytes into the buffer
-        self.buffer = connection.recv(self.buffer_size).decode("utf-8")
+        # Per-connection receive buffer and frame splitter, reused for the whole stream
+        chunk = bytearray(self.buffer_size)
+        view = memoryview(chunk)
+        splitter = stream.FrameSplitter(self.ingest_mode)
+        connection.settimeout(self.idle_timeout)
+
+        try:
+            while True:
+                # Receive: writes at most the established number of bytes into the buffer
+                received = connection.recv_into(chunk)
+                if received == 0:
+                    break
+
+                for frame in splitter.feed(view[:received]):
+                    # Hand the frame over (blocks while the decode queue or the ring buffer is full)
+                    self.receive(frame, client_address)
+
+        except socket.error as e:
+            SERVER.warning("TCP connection error: %s", e)
+
+        finally:
+            splitter.reset()
+            connection.close()
+
+
+def from_config(reuse_port=False, ring=None, name='main', track_fleet=True) -> list:
+    """
+    Builds the TCP modules defined by the configuration file: the main listener and,
+    if a binary port is set, a second listener for raw binary frames.
+    All the modules share the same MQTT client, HTTP session, batch uploader and reporting filter.
+
+    Args:
+        reuse_port (bool, optional): Whether the modules bind with SO_REUSEPORT. Default is False.
+        ring (ringbuffer.RingBuffer, optional): Ring buffer towards decoder processes. Default is None.
+        name (str, optional): The name of the process, which owns the outbox '<name>.sqlite3'. Default is 'main'.
+        track_fleet (bool, optional): Whether the modules track the state of the nodes. Default is True
+                                      (False for decoder processes, whose receiver tracks it).
+
+    Returns:
+        list: The TcpModule objects, the main listener last.
+    """
+    logs.configure(config.LOG_LEVEL, logs.parse_sampling(config.LOG_SAMPLING), int(config.LOG_QUEUE_SIZE))
+    metrics.REGISTRY.enabled = config.METRICS == 'on'
+    metrics.REGISTRY.max_series = int(config.METRICS_MAX_SERIES)
+
+    sender = cloud_sender.CloudSender(config.CLOUD_URL, int(config.HTTP_POOL_SIZE),
+                                      float(config.HTTP_CONNECT_TIMEOUT), float(config.HTTP_READ_TIMEOUT),
+                                      int(config.HTTP_RETRIES))
+
+    # Measurements inside their deadband are suppressed, unless the filter is disabled
+    report_filter = None
+    if config.REPORT_FILTER == 'on':
+        heartbeat = float(config.REPORT_HEARTBEAT)
+        deadbands = reporting.deadbands_from_sensors(libellium.SENSORS, heartbeat)
+        deadbands.update(reporting.parse_deadbands(config.DEADBANDS, heartbeat))
+        report_filter = reporting.ReportFilter(deadbands)
+
+    # Records are published and uploaded as JSON or in the compact format
+    codec = wire.Codec(config.WIRE_FORMAT, config.WIRE_COMPRESSION, config.ROOM)
+
+    # The spans of a sample of the frames are logged locally, unless the sample rate is 0
+    tracer = None
+    if float(config.TRACE_SAMPLE_RATE) > 0:
+        tracer = tracing.Tracer(os.path.join(config.TRACE_DIR, f"{name}.jsonl"), float(config.TRACE_SAMPLE_RATE),
+                                f"edge-{name}", int(config.TRACE_MAX_BYTES))
+
+    # The state of up to FLEET_MAX_NODES nodes is tracked to drop retransmissions, unless it is 0
+    fleet_table = None
+    if track_fleet and int(config.FLEET_MAX_NODES) > 0:
+        fleet_table = fleet.FleetTable(int(config.FLEET_MAX_NODES), float(config.FLEET_DUPLICATE_WINDOW))
+
+    # The routine frames of each node are rate limited, unless the rate is 0
+    admission = None
+    if float(config.ADMISSION_RATE) > 0:
+        admission = scheduling.Admission(float(config.ADMISSION_RATE), float(config.ADMISSION_BURST),
+                                         int(config.ADMISSION_MAX_NODES))
+
+    # The received frames are captured for replay if a capture directory is set
+    capture_writer = None
+    if config.CAPTURE_DIR != '':
+        capture_writer = capture.CaptureWriter(os.path.join(config.CAPTURE_DIR, f"{name}.lbcap"))
+
+    # Encrypted frames are decrypted with the keys of the nodes, if a key file is set
+    if config.AES_KEYS_FILE != '':
+        libellium.KEY_STORE.load(config.AES_KEYS_FILE)
+
+    # Records are persisted until the cloud acknowledges them, unless the outbox is disabled
+    store = None
+    if config.OUTBOX_DIR != '':
+        store = outbox.Outbox(os.path.join(config.OUTBOX_DIR, f"{name}.sqlite3"), int(config.OUTBOX_MAX_BYTES))
+
+    # Records are uploaded one by one unless batches of more than one record, or the outbox, are configured
+    uploader = None
+    if int(config.UPLOAD_BATCH_SIZE) > 1 or store is not None:
+        uploader = cloud_sender.BatchUploader(sender, config.CLOUD_BULK_URL,
+                                              int(config.UPLOAD_BATCH_SIZE), float(config.UPLOAD_LINGER_MS), store,
+                                              int(config.REPLAY_BATCH_SIZE), float(config.REPLAY_RATE),
+                                              float(config.REPLAY_RETRY_MAX), codec)
+
+    options = {
+        "buffer_size": int(config.BUFFER_SIZE),
+        "backlog": int(config.BACKLOG),
+        "idle_timeout": float(config.IDLE_TIMEOUT) if config.IDLE_TIMEOUT != '' else None,
+        "decode_workers": int(config.DECODE_WORKERS),
+        "publish_workers": int(config.PUBLISH_WORKERS),
+        "queue_size": int(config.QUEUE_SIZE),
+        "reuse_port": reuse_port,
+        "ring": ring,
+        "publisher": mqttx.Client(config.BROKER_IP_ADDRESS, port=int(config.BROKER_PORT_NUMBER),
+                                  keepalive=int(config.MQTT_KEEPALIVE),
+                                  reconnect_min_delay=int(config.MQTT_RECONNECT_MIN_DELAY),
+                                  reconnect_max_delay=int(config.MQTT_RECONNECT_MAX_DELAY)),
+        "sender": sender,
+        "uploader": uploader,
+        "report_filter": report_filter,
+        "codec": codec,
+        "tracer": tracer,
+        "fleet_table": fleet_table,
+        "admission": admission,
+        "capture_writer": capture_writer,
+        "topic_mode": config.MQTT_TOPIC_MODE
+    }
+
+    modules = []
+
+    # Optional second listener for gateways sending raw binary frames
+    if config.BINARY_PORT_NUMBER != '':
+        modules.append(TcpModule(config.IP_ADDRESS, int(config.BINARY_PORT_NUMBER), ingest_mode='binary', **options))
+
+    modules.append(TcpModule(config.IP_ADDRESS, int(config.PORT_NUMBER), ingest_mode=config.INGEST_MODE, **options))
+    return modules
+
+
+def run(modules: list):
+    """
+    Starts the given TCP modules in the configured server mode: all but the last one
+    in background threads, the last one in the calling thread (never returns while it serves).
+
+    Args:
+        modules (list): The TcpModule objects to start.
+    """
+    for module in modules:
+        target = module.start_async if config.SERVER_MODE == 'asyncio' else module.start
 
-        # Do stuff
-        measurement = self.decode()
-        self.to_mqtt_broker(measurement)
+        if module is modules[-1]:
+            target()
+        else:
+            threading.Thread(target=target, daemon=True).start()
 
 
 if __name__ == '__main__':
     print("[TCP MODULE]: Test main.")
 
-    test = TcpModule(config.IP_ADDRESS, int(config.PORT_NUMBER), int(config.BUFFER_SIZE))
-    test.start()
+    modules = from_config()
+    if config.METRICS_PORT_NUMBER != '':
+        metrics.serve(config.METRICS_IP_ADDRESS, int(config.METRICS_PORT_NUMBER), metrics.REGISTRY.render)
+    run(modules)
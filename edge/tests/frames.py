@@ -0,0 +1,41 @@
+# ************************************** TEST FRAMES **************************************
+
+import struct
+
+# Frame sent by 'test.py': information frame of node_01 (battery, then ten float sensors, some of them zero)
+FRAME = bytes.fromhex("3C3D3E06451B20B4BD3C195E206E6F64655F3031231434641500000000006185EB3F0100000000"
+                      "046179913E4A7B14C4414C005462424DBFD0C647460000000047000000004800000000")
+
+# Sensor binary IDs of 'sensor.json' used by the tests
+BATTERY = 52  # BAT, uint8_t
+TEMPERATURE = 74  # TC, float
+LUMINOSITY = 78  # LUX, uint32_t
+ULTRASOUND = 79  # US, uint16_t
+STRING = 61  # STR, string
+MAC = 55  # MAC, string
+
+INFORMATION = 0x06
+ALARM = 0x03
+
+
+def build(payload: bytes, waspmote_id: str = 'node_test', serial_id: int = 0x0102030405060708,
+          sequence: int = 7, frame_type: int = INFORMATION) -> bytes:
+    """
+    Builds a raw Libellium frame around a payload.
+
+    Args:
+        payload (bytes): The sensor IDs and their little-endian values.
+        waspmote_id (str, optional): The Waspmote ID. Default is 'node_test'.
+        serial_id (int, optional): The serial ID. Default is 0x0102030405060708.
+        sequence (int, optional): The frame sequence number. Default is 7.
+        frame_type (int, optional): The frame type. Default is INFORMATION.
+    """
+    body = serial_id.to_bytes(8, 'big') + waspmote_id.encode('ascii') + b'#' + bytes([sequence]) + payload
+    return b'<=>' + bytes([frame_type, len(body)]) + body
+
+
+def float_bits(bits: int) -> bytes:
+    """
+    Returns a float measurement given by its 32 bits, e.g. 0x7F800000 for infinity.
+    """
+    return struct.pack('<I', bits)
@@ -0,0 +1,83 @@
+import json
+
+import pytest
+
+import libellium.aes as aes
+import tests.frames as frames
+
+pytestmark = pytest.mark.skipif(aes.Cipher is None, reason="requires the 'cryptography' package")
+
+SERIAL_ID = int.from_bytes(frames.FRAME[aes.SERIAL_ID_START:aes.SERIAL_ID_END], 'big')
+KEYS = {16: bytes(range(16)), 24: bytes(range(24)), 32: bytes(range(32))}
+
+
+def store_for(frame_type: int) -> tuple:
+    """
+    Returns a key store able to decrypt the given frame type, and the key to encrypt it with.
+    """
+    size = aes.KEY_SIZES[frame_type] or 32
+    if frame_type in aes.CLEAR_SERIAL_ID:
+        return aes.KeyStore({SERIAL_ID: KEYS[size]}), KEYS[size]
+    return aes.KeyStore(default=KEYS[size]), KEYS[size]
+
+
+@pytest.mark.parametrize('frame_type', sorted(aes.KEY_SIZES), ids=hex)
+def test_round_trip(frame_type):
+    store, key = store_for(frame_type)
+    encrypted = aes.encrypt_frame(frames.FRAME, key, frame_type)
+
+    assert aes.is_encrypted(encrypted) and not aes.is_encrypted(frames.FRAME)
+    assert store.decrypt(encrypted) == frames.FRAME
+    assert store.header(encrypted) == frames.FRAME[:aes.BLOCK_SIZE]
+
+
+def test_contexts_are_cached():
+    store, key = store_for(0x60)
+    encrypted = aes.encrypt_frame(frames.FRAME, key)
+    for _ in range(3):
+        store.decrypt(encrypted)
+
+    assert store.stats() == {"decrypted": 3, "failures": 0, "cipher_hits": 2, "cipher_misses": 1}
+
+
+def test_wrong_key():
+    store, _ = store_for(0x60)
+    encrypted = aes.encrypt_frame(frames.FRAME, KEYS[16], 0x60)
+    store.keys[SERIAL_ID] = bytes(reversed(KEYS[16]))
+
+    with pytest.raises(aes.DecryptionError):
+        store.decrypt(encrypted)
+    assert store.header(encrypted) is None
+    assert store.stats()["failures"] == 1
+
+
+def test_missing_key_or_wrong_key_size():
+    encrypted = aes.encrypt_frame(frames.FRAME, KEYS[16], 0x61)
+    with pytest.raises(aes.DecryptionError):
+        aes.KeyStore().decrypt(encrypted)
+    with pytest.raises(aes.DecryptionError):
+        aes.KeyStore(default=KEYS[32]).decrypt(encrypted)
+    assert aes.KeyStore().header(encrypted) is None
+
+
+def test_truncated_ciphertext():
+    store, key = store_for(0x60)
+    encrypted = aes.encrypt_frame(frames.FRAME, key)
+
+    with pytest.raises(aes.DecryptionError):
+        store.decrypt(encrypted[:-1])
+    assert store.header(encrypted[:aes.SERIAL_ID_END + aes.BLOCK_SIZE - 1]) is None
+
+
+def test_load(tmp_path):
+    path = tmp_path / "keys.json"
+    path.write_text(json.dumps({"default": KEYS[16].hex(), "nodes": {str(SERIAL_ID): KEYS[32].hex()}}))
+    store = aes.KeyStore()
+    store.load(str(path))
+
+    assert store.default == KEYS[16] and store.keys == {SERIAL_ID: KEYS[32]}
+    assert store.decrypt(aes.encrypt_frame(frames.FRAME, KEYS[32], 0x60)) == frames.FRAME
+
+    path.write_text(json.dumps({"default": "00ff"}))
+    with pytest.raises(ValueError):
+        store.load(str(path))
@@ -0,0 +1,111 @@
+import pytest
+
+pytest.importorskip('numpy')
+
+import libellium.aes as aes
+import libellium.batch as batch
+import libellium.libellium as libellium
+import loadgen.loadgen as loadgen
+import tests.frames as frames
+
+
+def decode_scalar(frames_list: list) -> list:
+    decoded = []
+    for frame in frames_list:
+        measurement = libellium.Libellium(frame)
+        measurement.parse()
+        decoded.append(measurement)
+    return decoded
+
+
+def assert_same_as_scalar(frames_list: list):
+    """
+    Checks that the batch decode of frames gives the headers and the measurements of the scalar decoder.
+    """
+    result = batch.decode_batch(frames_list)
+    scalar = decode_scalar(frames_list)
+
+    assert result.errors == []
+    assert result.serial_id == [m.serial_id for m in scalar]
+    assert result.waspmote_id == [m.waspmote_id for m in scalar]
+    assert result.frame_sequence == [m.frame_sequence for m in scalar]
+
+    expected = {}
+    for row, measurement in enumerate(scalar):
+        for s, value in measurement.measurements:
+            expected.setdefault(s.ascii_id, []).append((row, value))
+    assert set(result.columns) == set(expected)
+    for ascii_id, pairs in expected.items():
+        assert list(result.rows[ascii_id]) == [row for row, _ in pairs], ascii_id
+        assert list(result.columns[ascii_id]) == [value for _, value in pairs], ascii_id
+    return result
+
+
+def test_generated_fleet():
+    builder = loadgen.FrameBuilder(seed=0)
+    nodes = [builder.node(number) for number in range(50)]
+    # Several frames per node, interleaved as a gateway forwards them
+    assert_same_as_scalar([builder.build(node) for _ in range(4) for node in nodes])
+
+
+def test_sequences_of_one_node():
+    sequence_index = frames.FRAME.index(b'#') + 1
+    frames_list = []
+    for sequence in range(300):
+        raw = bytearray(frames.FRAME)
+        raw[sequence_index] = sequence % 256
+        frames_list.append(bytes(raw))
+
+    result = assert_same_as_scalar(frames_list)
+    assert result.frame_sequence == [sequence % 256 for sequence in range(300)]
+
+
+def test_float_edge_cases():
+    patterns = (0x00000000, 0x80000000, 0x00000001, 0x007FFFFF, 0x7F800000, 0xFF800000, 0x7FC00000, 0x7F800001)
+    assert_same_as_scalar([frames.build(bytes([frames.BATTERY, 50, frames.TEMPERATURE]) + frames.float_bits(bits),
+                                        'node_edges') for bits in patterns])
+
+
+def test_strings_and_hex_frames():
+    payloads = [bytes([frames.BATTERY, 50, frames.STRING]) + text + b'\0' for text in (b'a', b'bc', b'def')]
+    frames_list = [frames.build(payload, 'node_strings') for payload in payloads]
+    frames_list.append(frames.FRAME.hex().upper())
+    result = batch.decode_batch(frames_list)
+
+    assert result.errors == []
+    assert list(result.columns['STR']) == ['a\0', 'bc\0', 'def\0']
+    assert list(result.columns['BAT']) == [50, 50, 50, 100]
+
+
+def test_malformed_frames_are_reported():
+    result = batch.decode_batch([frames.FRAME, b'not a frame', frames.FRAME])
+    assert [row for row, _ in result.errors] == [1]
+    assert result.waspmote_id == ['node_01', None, 'node_01']
+    assert list(result.rows['BAT']) == [0, 2]
+
+
+@pytest.mark.skipif(aes.Cipher is None, reason="requires the 'cryptography' package")
+def test_encrypted_frames(monkeypatch):
+    sequence_index = frames.FRAME.index(b'#') + 1
+    clear = []
+    for sequence in range(20):
+        raw = bytearray(frames.FRAME)
+        raw[sequence_index] = sequence
+        clear.append(bytes(raw))
+    store = aes.KeyStore(default=bytes(range(16)))
+    monkeypatch.setattr(libellium, 'KEY_STORE', store)
+
+    # Encrypted and clear frames of the same node, grouped and decoded together
+    mixed = [aes.encrypt_frame(frame, store.default, 0x61) if sequence % 2 else frame
+             for sequence, frame in enumerate(clear)]
+    result = batch.decode_batch(mixed)
+    expected = assert_same_as_scalar(clear)
+    assert result.errors == [] and result.frame_sequence == list(range(20))
+    for ascii_id, column in expected.columns.items():
+        assert list(result.columns[ascii_id]) == list(column), ascii_id
+
+    # Without their key, encrypted frames are reported instead of decoded as garbage
+    monkeypatch.setattr(libellium, 'KEY_STORE', aes.KeyStore())
+    result = batch.decode_batch(mixed)
+    assert [row for row, _ in result.errors] == list(range(1, 20, 2))
+    assert result.frame_sequence == [sequence if sequence % 2 == 0 else None for sequence in range(20)]
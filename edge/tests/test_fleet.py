@@ -0,0 +1,54 @@
+import fleet.fleet as fleet
+
+
+def test_retransmissions_gaps_and_late_frames():
+    table = fleet.FleetTable(4)
+    assert table.observe(1, "a", 10, now=0) == fleet.NEW
+    assert table.observe(1, "a", 10, now=1) == fleet.DUPLICATE
+    assert table.observe(1, "a", 13, now=2) == fleet.NEW and table.node(1)["gaps"] == 2
+    assert table.observe(1, "a", 12, now=3) == fleet.LATE and table.node(1)["gaps"] == 1
+    assert table.node(1) == {
+        "serial_id": 1, "waspmote_id": "a", "sequence": 13, "last_seen": 3,
+        "battery": None, "frames": 3, "duplicates": 1, "gaps": 1
+    }
+
+
+def test_sequence_numbers_wrap_around():
+    table = fleet.FleetTable(4)
+    assert table.observe(2, "b", 254, now=0) == fleet.NEW
+    # 255 and 0 skipped
+    assert table.observe(2, "b", 1, now=1) == fleet.NEW and table.node(2)["gaps"] == 2
+
+
+def test_repeated_sequence_after_the_duplicate_window_is_new():
+    table = fleet.FleetTable(4, duplicate_window=60)
+    table.observe(1, "a", 10, now=0)
+    assert table.observe(1, "a", 10, now=61) == fleet.NEW
+    assert table.node(1)["gaps"] == 0
+
+
+def test_least_recently_seen_node_is_evicted():
+    table = fleet.FleetTable(2)
+    table.observe(1, "a", 0, now=0)
+    table.observe(2, "b", 0, now=1)
+    table.observe(1, "a", 1, now=2)
+    table.observe(3, "c", 0, now=3)
+
+    assert table.node(2) is None and table.node(1) is not None and table.evicted == 1
+    # The slot of the evicted node is reset for the new one
+    assert table.node(3)["frames"] == 1 and table.node(3)["sequence"] == 0
+
+
+def test_health_snapshot():
+    table = fleet.FleetTable(8)
+    table.observe(1, "a", 0, battery=90.0, now=0)
+    table.observe(2, "b", 0, battery=10.0, now=100)
+    table.observe(2, "b", 0, now=101)
+    table.observe(3, "c", 5, now=100)
+    table.observe(3, "c", 8, now=101)
+
+    assert table.snapshot(stale_after=50, low_battery=20, now=110) == {
+        "nodes": 3, "evicted": 0, "stale": 1, "low_battery": 1, "frames": 4, "duplicates": 1, "gaps": 2
+    }
+    assert [node["serial_id"] for node in table.nodes(stale_after=50, now=110)] == [1]
+    assert [node["serial_id"] for node in table.nodes(low_battery=20, now=110)] == [2]
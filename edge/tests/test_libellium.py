@@ -0,0 +1,127 @@
+import struct
+
+import pytest
+
+import libellium.aes as aes
+import libellium.frametype as ft
+import libellium.libellium as libellium
+import loadgen.loadgen as loadgen
+import tests.frames as frames
+
+ATTRIBUTES = ('type', 'number_of_bytes', 'serial_id', 'waspmote_id', 'frame_sequence', 'measurements')
+
+# 32-bit patterns of the float edge cases: zeros, subnormals, the normal bounds, infinities and NaNs
+FLOAT_EDGE_BITS = {
+    'zero': 0x00000000,
+    'negative zero': 0x80000000,
+    'smallest subnormal': 0x00000001,
+    'largest subnormal': 0x007FFFFF,
+    'negative subnormal': 0x80000001,
+    'smallest normal': 0x00800000,
+    'largest normal': 0x7F7FFFFF,
+    'infinity': 0x7F800000,
+    'negative infinity': 0xFF800000,
+    'quiet NaN': 0x7FC00000,
+    'signaling NaN': 0x7F800001,
+    'negative NaN': 0xFFC00000,
+}
+
+
+def decode(frame, mode: str) -> libellium.Libellium:
+    measurement = libellium.Libellium(frame)
+    measurement.parse(mode)
+    return measurement
+
+
+def assert_equivalent(frame: bytes):
+    """
+    Decodes a frame with the 'tokens' decoder (from hex text) and with the 'bytes' decoder
+    (from bytes, twice so that the second decode goes through the compiled plan, and from a memoryview),
+    and checks that they give the same attributes and measurements.
+    """
+    reference = decode(frame.hex().upper(), 'tokens')
+    for decoded in (decode(frame, 'bytes'), decode(frame, 'bytes'), decode(memoryview(frame), 'bytes')):
+        for attribute in ATTRIBUTES:
+            assert getattr(decoded, attribute) == getattr(reference, attribute), attribute
+
+
+def test_reference_frame():
+    assert_equivalent(frames.FRAME)
+    measurement = decode(frames.FRAME, 'bytes')
+    assert measurement.waspmote_id == 'node_01'
+    assert measurement.measurements.to_dict()['TC']['value'] == pytest.approx(24.51)
+
+
+def test_hex_text_is_decoded_as_bytes():
+    assert decode(frames.FRAME.hex().upper(), 'bytes').measurements == decode(frames.FRAME, 'bytes').measurements
+
+
+@pytest.mark.parametrize('seed', [0, 1, 2])
+def test_generated_frames(seed):
+    builder = loadgen.FrameBuilder(seed)
+    for number in range(100):
+        node = builder.node(number)
+        for _ in range(3):
+            assert_equivalent(builder.build(node, marker=f"m{number}" if number % 2 else None))
+
+
+@pytest.mark.parametrize('bits', FLOAT_EDGE_BITS.values(), ids=FLOAT_EDGE_BITS.keys())
+def test_float_edge_cases(bits):
+    frame = frames.build(bytes([frames.BATTERY, 80, frames.TEMPERATURE]) + frames.float_bits(bits))
+    assert_equivalent(frame)
+
+
+def test_float_edge_cases_in_one_payload():
+    payload = b''.join(bytes([frames.TEMPERATURE]) + frames.float_bits(bits) for bits in FLOAT_EDGE_BITS.values())
+    assert_equivalent(frames.build(payload, waspmote_id='node_floats'))
+
+
+@pytest.mark.parametrize('text', [b'', b'a', b'abcdefgh', b'00:1A:2B:3C:4D:5E'])
+def test_string_sensors(text):
+    payload = bytes([frames.STRING]) + text + b'\0' + bytes([frames.MAC]) + text + b'\0'
+    frame = frames.build(payload, waspmote_id='node_strings')
+    assert_equivalent(frame)
+    assert [value for _, value in decode(frame, 'bytes').measurements] == [text.decode() + '\0'] * 2
+
+
+def test_multi_sensor_payload():
+    payload = (bytes([frames.BATTERY, 42])
+               + bytes([frames.TEMPERATURE]) + struct.pack('<f', -12.5)
+               + bytes([frames.STRING]) + b'marker\0'
+               + bytes([frames.LUMINOSITY]) + struct.pack('<I', 0xFFFFFFFF)
+               + bytes([frames.ULTRASOUND]) + struct.pack('<H', 999)
+               + bytes([frames.TEMPERATURE]) + frames.float_bits(0x7F800000))
+    frame = frames.build(payload, waspmote_id='node_multi', frame_type=frames.ALARM)
+    assert_equivalent(frame)
+
+    measurement = decode(frame, 'bytes')
+    assert measurement.type is ft.FRAME_TYPES[frames.ALARM]
+    assert [s.ascii_id for s, _ in measurement.measurements] == ['BAT', 'TC', 'STR', 'LUX', 'US', 'TC']
+    assert list(measurement.measurements)[:5] == [
+        (libellium.SENSORS[frames.BATTERY], 42), (libellium.SENSORS[frames.TEMPERATURE], -12.5),
+        (libellium.SENSORS[frames.STRING], 'marker\0'), (libellium.SENSORS[frames.LUMINOSITY], 0xFFFFFFFF),
+        (libellium.SENSORS[frames.ULTRASOUND], 999)
+    ]
+
+
+def test_changed_layout_is_not_decoded_by_the_cached_plan():
+    first = frames.build(bytes([frames.BATTERY, 1, frames.TEMPERATURE]) + struct.pack('<f', 1.5), 'node_layout')
+    # Same Waspmote ID and payload size, other sensors
+    second = frames.build(bytes([frames.BATTERY, 1, frames.LUMINOSITY]) + struct.pack('<I', 7), 'node_layout')
+    for frame in (first, second, first):
+        assert_equivalent(frame)
+
+
+@pytest.mark.skipif(aes.Cipher is None, reason="requires the 'cryptography' package")
+@pytest.mark.parametrize('frame_type', [0x60, 0x61])
+def test_encrypted_frames(frame_type, monkeypatch):
+    reference = decode(frames.FRAME, 'bytes')
+    store = aes.KeyStore({reference.serial_id: bytes(range(32))}, default=bytes(range(16)))
+    monkeypatch.setattr(libellium, 'KEY_STORE', store)
+
+    key = store.keys[reference.serial_id] if frame_type in aes.CLEAR_SERIAL_ID else store.default
+    encrypted = aes.encrypt_frame(frames.FRAME, key, frame_type)
+    for decoded in (decode(encrypted, 'bytes'), decode(encrypted.hex().upper(), 'tokens')):
+        assert decoded.encryption is ft.FRAME_TYPES[frame_type]
+        for attribute in ('type', 'serial_id', 'waspmote_id', 'frame_sequence', 'measurements'):
+            assert getattr(decoded, attribute) == getattr(reference, attribute), attribute
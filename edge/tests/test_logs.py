@@ -0,0 +1,89 @@
+import logging
+
+import pytest
+
+import logs.logs as logs
+
+
+class Recorder(logging.Handler):
+    """
+    Keeps the messages of the records it handles.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+
+
+class Formatted:
+    """
+    Argument counting how many times it is formatted.
+    """
+
+    def __init__(self):
+        self.count = 0
+
+    def __str__(self):
+        self.count += 1
+        return "formatted"
+
+
+@pytest.fixture
+def recorder():
+    handler = Recorder()
+    logger = logging.getLogger(f"{logs.ROOT}.test")
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    yield handler
+    logger.removeHandler(handler)
+    logger.setLevel(logging.NOTSET)
+
+
+def test_parse_sampling():
+    assert logs.parse_sampling('frames:1000, records:100,') == {'frames': 1000, 'records': 100}
+    for malformed in ('frames', 'frames:0', 'frames:x'):
+        with pytest.raises(ValueError):
+            logs.parse_sampling(malformed)
+
+
+def test_one_message_out_of_every_is_logged(recorder):
+    logger = logs.SampledLogger('test', every=10)
+    for number in range(100):
+        logger.info("message %d", number)
+
+    assert recorder.messages == [f"message {number}" for number in range(0, 100, 10)]
+
+
+def test_arguments_are_only_formatted_when_logged(recorder):
+    argument = Formatted()
+    sampled = logs.SampledLogger('test', every=10)
+    sampled.info("%s", argument)
+    assert recorder.messages == ["formatted"]
+
+    argument.count = 0
+    for _ in range(9):
+        sampled.info("%s", argument)
+    for _ in range(100):
+        sampled.debug("%s", argument)
+    assert argument.count == 0 and recorder.messages == ["formatted"]
+
+
+def test_full_queue_drops_records():
+    handler = logs.DroppingQueueHandler(queue_size=2)
+    logger = logging.getLogger(f"{logs.ROOT}.test_queue")
+    logger.addHandler(handler)
+    logger.propagate = False
+    try:
+        for number in range(5):
+            logger.warning("message %d", number)
+    finally:
+        logger.removeHandler(handler)
+
+    assert handler.queue.qsize() == 2 and handler.dropped == 3
+
+
+def test_get_logger_returns_the_same_logger():
+    assert logs.get_logger('test_same') is logs.get_logger('test_same')
@@ -0,0 +1,57 @@
+import json
+
+import libellium.libellium as libellium
+import libellium.measurement as measurement
+import loadgen.loadgen as loadgen
+import wire.wire as wire
+import tests.frames as frames
+
+METADATA = {"date": "2024-01-01", "time": "12:00:00.0", "room": "DTLab"}
+
+
+def decoded_fleet(nodes: int = 200) -> list:
+    builder = loadgen.FrameBuilder(seed=0)
+    decoded = []
+    for number in range(nodes):
+        node = builder.node(number)
+        # The second frame of a node is decoded by its compiled plan
+        for _ in range(2):
+            parsed = libellium.Libellium(builder.build(node, marker="m" if number % 3 == 0 else None))
+            parsed.parse()
+            decoded.append(parsed.measurements)
+    return decoded
+
+
+def test_behaves_as_a_list_of_pairs():
+    temperature, battery = libellium.SENSORS[frames.TEMPERATURE], libellium.SENSORS[frames.BATTERY]
+    measures = measurement.MeasurementSet()
+    measures.append((battery, 90))
+    measures.append((temperature, 21.5))
+
+    assert len(measures) == 2
+    assert measures[1] == (temperature, 21.5)
+    assert list(measures) == [(battery, 90), (temperature, 21.5)]
+    assert measures == [(battery, 90), (temperature, 21.5)]
+    assert measures == measurement.MeasurementSet((battery, temperature), [90, 21.5])
+    assert measures.select([1]) == [(temperature, 21.5)]
+
+
+def test_last_value_of_a_shared_ascii_id_wins():
+    strings = measurement.MeasurementSet([libellium.SENSORS[61], libellium.SENSORS[65]], ['first\0', 'second\0'])
+
+    assert not strings.is_unique()
+    assert strings.get('STR') == 'second\0'
+    assert strings.get('TC', 'missing') == 'missing'
+    assert strings.to_dict() == {'STR': {"value": 'second\0', "unit": libellium.SENSORS[65].unit}}
+
+
+def test_json_records_match_the_dict_serialization():
+    codec = wire.Codec('json')
+    for measures in decoded_fleet():
+        assert codec.record(METADATA, measures, wire.EPOCH) == json.dumps({"metadata": METADATA, "data": measures.to_dict()})
+
+
+def test_compact_records_match_the_dict_serialization():
+    codec = wire.Codec('compact')
+    for measures in decoded_fleet():
+        assert codec.record(METADATA, measures, wire.EPOCH) == codec.record(METADATA, measures.to_dict(), wire.EPOCH)
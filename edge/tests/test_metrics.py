@@ -0,0 +1,98 @@
+import threading
+import time
+
+import metrics.metrics as metrics
+
+
+def test_counter():
+    registry = metrics.Registry()
+    frames = registry.counter("frames_total", "Frames.", ("node",))
+    frames.inc("a")
+    frames.inc("a", amount=2)
+    frames.inc("b")
+
+    assert frames.snapshot() == {'node="a"': 3, 'node="b"': 1}
+
+
+def test_histogram_buckets_and_sum():
+    registry = metrics.Registry()
+    seconds = registry.histogram("seconds", "Latency.", buckets=(0.1, 1))
+    for value in (0.05, 0.1, 0.5, 2):
+        seconds.observe(value)
+
+    assert seconds.snapshot() == {'': {'0.1': 2, '1': 1, '+Inf': 1, 'sum': 2.65}}
+
+
+def test_child_records_into_the_series_of_its_labels():
+    registry = metrics.Registry()
+    seconds = registry.histogram("stage_seconds", "Latency.", ("stage",), buckets=(1,))
+    decode = seconds.child("decode")
+    decode.observe(0.5)
+    decode.since(time.perf_counter())
+    seconds.observe(0.5, "decode")
+    seconds.since(time.perf_counter(), "publish")
+
+    snapshot = seconds.snapshot()
+    assert snapshot['stage="decode"']['1'] == 3 and snapshot['stage="publish"']['1'] == 1
+
+
+def test_disabled_registry_records_nothing():
+    registry = metrics.Registry(enabled=False)
+    frames = registry.counter("frames_total", "Frames.")
+    seconds = registry.histogram("seconds", "Latency.", ("stage",))
+    frames.inc()
+    seconds.observe(1, "decode")
+    seconds.child("decode").since(time.perf_counter())
+
+    assert registry.snapshot() == {"frames_total": {}, "seconds": {}}
+
+
+def test_series_beyond_the_limit_are_counted_under_other():
+    registry = metrics.Registry(max_series=2)
+    frames = registry.counter("frames_total", "Frames.", ("node",))
+    for node in ("a", "b", "c", "d"):
+        frames.inc(node)
+
+    assert frames.snapshot() == {'node="a"': 1, 'node="b"': 1, 'node="other"': 2}
+
+
+def test_shards_of_ended_threads_are_kept():
+    registry = metrics.Registry()
+    frames = registry.counter("frames_total", "Frames.")
+    seconds = registry.histogram("seconds", "Latency.", ("stage",), buckets=(1,))
+    decode = seconds.child("decode")
+
+    def work():
+        for _ in range(100):
+            frames.inc()
+            decode.observe(0.5)
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    frames.inc()
+
+    assert frames.snapshot() == {'': 401}
+    assert seconds.snapshot()['stage="decode"']['1'] == 400
+    # Folded once: a second snapshot gives the same totals
+    assert frames.snapshot() == {'': 401}
+
+
+def test_render():
+    registry = metrics.Registry()
+    registry.counter("frames_total", "Frames.", ("node",)).inc('a"b')
+    registry.histogram("seconds", "Latency.", buckets=(1,)).observe(0.5)
+
+    assert registry.render().splitlines() == [
+        '# HELP frames_total Frames.',
+        '# TYPE frames_total counter',
+        'frames_total{node="a\\"b"} 1',
+        '# HELP seconds Latency.',
+        '# TYPE seconds histogram',
+        'seconds_bucket{le="1"} 1',
+        'seconds_bucket{le="+Inf"} 1',
+        'seconds_sum 0.5',
+        'seconds_count 1'
+    ]
@@ -0,0 +1,65 @@
+import struct
+
+import pytest
+
+import libellium.libellium as libellium
+import libellium.plan as plan
+import libellium.sensor as sensor
+import tests.frames as frames
+
+
+def payload_offset(frame: bytes) -> int:
+    return frame.index(b'#') + 2
+
+
+def test_plan_decodes_its_layout():
+    frame = frames.build(bytes([frames.BATTERY, 90, frames.TEMPERATURE]) + struct.pack('<f', 21.5)
+                         + bytes([frames.ULTRASOUND]) + struct.pack('<H', 300))
+    decode_plan = plan.DecodePlan([libellium.SENSORS[i] for i in (frames.BATTERY, frames.TEMPERATURE, frames.ULTRASOUND)])
+
+    assert decode_plan.layout == (frames.BATTERY, frames.TEMPERATURE, frames.ULTRASOUND)
+    assert decode_plan.unpack(memoryview(frame), payload_offset(frame)).values == [90, 21.5, 300]
+
+
+def test_plan_rejects_another_layout_or_size():
+    decode_plan = plan.DecodePlan([libellium.SENSORS[frames.BATTERY], libellium.SENSORS[frames.TEMPERATURE]])
+    other = frames.build(bytes([frames.BATTERY, 90, frames.LUMINOSITY]) + struct.pack('<I', 1))
+    longer = frames.build(bytes([frames.BATTERY, 90, frames.TEMPERATURE]) + struct.pack('<f', 1) + b'\0')
+
+    assert decode_plan.unpack(memoryview(other), payload_offset(other)) is None
+    assert decode_plan.unpack(memoryview(longer), payload_offset(longer)) is None
+
+
+def test_variable_length_fields_have_no_plan():
+    with pytest.raises(ValueError):
+        plan.DecodePlan([libellium.SENSORS[frames.STRING]])
+
+
+@pytest.mark.parametrize('bits', [0x00000000, 0x00000001, 0x7F800000, 0xFFC00000])
+def test_plan_rebuilds_float_edge_cases_as_the_generic_decoder(bits):
+    frame = frames.build(bytes([frames.TEMPERATURE]) + frames.float_bits(bits))
+    decode_plan = plan.DecodePlan([libellium.SENSORS[frames.TEMPERATURE]])
+
+    assert decode_plan.unpack(memoryview(frame), payload_offset(frame)).values == [sensor.float_from_bits(bits)]
+
+
+def test_cache_counts_hits_misses_and_evictions():
+    cache = plan.PlanCache(max_size=1)
+    first = frames.build(bytes([frames.BATTERY, 1]), 'node_a')
+    second = frames.build(bytes([frames.BATTERY, 2]), 'node_b')
+    measurements = [(libellium.SENSORS[frames.BATTERY], 1)]
+
+    assert cache.decode(('node_a', 2), memoryview(first), payload_offset(first)) is None
+    cache.compile(('node_a', 2), measurements)
+    assert cache.decode(('node_a', 2), memoryview(first), payload_offset(first)).values == [1]
+    cache.compile(('node_b', 2), measurements)
+    assert cache.decode(('node_a', 2), memoryview(first), payload_offset(first)) is None
+    assert cache.decode(('node_b', 2), memoryview(second), payload_offset(second)).values == [2]
+
+    assert cache.stats() == {"size": 1, "max_size": 1, "hits": 2, "misses": 2, "evictions": 1}
+
+
+def test_cache_skips_variable_length_layouts():
+    cache = plan.PlanCache()
+    cache.compile(('node_a', 3), [(libellium.SENSORS[frames.STRING], 'a\0')])
+    assert cache.stats()["size"] == 0
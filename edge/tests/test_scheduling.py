@@ -0,0 +1,78 @@
+import queue
+
+import pytest
+
+import libellium.aes as aes
+import libellium.frametype as ft
+import pipeline.pipeline as pipeline
+import scheduling.scheduling as scheduling
+import tests.frames as frames
+
+ALARM = frames.FRAME[:scheduling.TYPE_OFFSET] + bytes([frames.ALARM]) + frames.FRAME[scheduling.TYPE_OFFSET + 1:]
+SERIAL_ID = int.from_bytes(frames.FRAME[scheduling.SERIAL_ID_START:scheduling.SERIAL_ID_END], 'big')
+
+
+def test_peek():
+    assert scheduling.peek(frames.FRAME) == (ft.PRIORITY_ROUTINE, SERIAL_ID)
+    assert scheduling.peek(ALARM) == (ft.PRIORITY_ALARM, SERIAL_ID)
+    assert scheduling.peek(frames.FRAME[:scheduling.SERIAL_ID_END - 1]) == (ft.PRIORITY_ROUTINE, None)
+
+
+@pytest.mark.skipif(aes.Cipher is None, reason="requires the 'cryptography' package")
+@pytest.mark.parametrize('frame_type', [0x60, 0x61], ids=hex)
+def test_peek_encrypted_frames(frame_type):
+    store = aes.KeyStore(default=bytes(range(16)))
+    encrypted = aes.encrypt_frame(ALARM, store.default, frame_type)
+
+    # Read through the first block, or scheduled as an event when it cannot be decrypted
+    assert scheduling.peek(encrypted, store) == (ft.PRIORITY_ALARM, SERIAL_ID)
+    clear_serial_id = SERIAL_ID if frame_type in aes.CLEAR_SERIAL_ID else None
+    assert scheduling.peek(encrypted) == (ft.PRIORITY_EVENT, clear_serial_id)
+    assert scheduling.peek(encrypted, aes.KeyStore()) == (ft.PRIORITY_EVENT, clear_serial_id)
+
+
+def test_admission_sheds_routine_frames_beyond_the_rate():
+    admission = scheduling.Admission(rate=5, burst=10)
+    routine = [admission.admit(SERIAL_ID, ft.PRIORITY_ROUTINE, now=0) for _ in range(100)]
+    alarms = [admission.admit(SERIAL_ID, ft.PRIORITY_ALARM, now=0) for _ in range(10)]
+
+    assert routine.count(True) == 10 and all(alarms)
+    # Refilled at 5 frames per second
+    assert [admission.admit(SERIAL_ID, ft.PRIORITY_ROUTINE, now=1) for _ in range(6)].count(True) == 5
+    assert admission.admit(None, ft.PRIORITY_ROUTINE, now=1)
+    assert admission.stats() == {
+        "nodes": 1,
+        "admitted": {"alarm": 10, "event": 0, "routine": 16},
+        "shed": {"alarm": 0, "event": 0, "routine": 91}
+    }
+
+
+def test_admission_drops_the_least_recently_seen_bucket():
+    admission = scheduling.Admission(rate=1, burst=1, max_nodes=2)
+    assert admission.admit(1, ft.PRIORITY_ROUTINE, now=0)
+    assert admission.admit(2, ft.PRIORITY_ROUTINE, now=0)
+    assert not admission.admit(1, ft.PRIORITY_ROUTINE, now=0)
+    assert admission.admit(3, ft.PRIORITY_ROUTINE, now=0)
+    # Node 2 was dropped and starts again with a full bucket
+    assert admission.admit(2, ft.PRIORITY_ROUTINE, now=0)
+
+
+def test_alarms_overtake_and_shed_routine_frames():
+    contexts = pipeline.PriorityQueue(maxsize=3)
+    routine = [pipeline.FrameContext(frames.FRAME, priority=ft.PRIORITY_ROUTINE) for _ in range(3)]
+    for context in routine:
+        contexts.put(context)
+
+    alarm = pipeline.FrameContext(ALARM, priority=ft.PRIORITY_ALARM)
+    assert contexts.put(alarm) is routine[-1]
+    assert [contexts.get() for _ in range(3)] == [alarm] + routine[:2]
+    assert contexts.shed == [0, 0, 1]
+
+
+def test_full_queue_does_not_shed_the_same_priority():
+    contexts = pipeline.PriorityQueue(maxsize=1)
+    contexts.put(pipeline.FrameContext(frames.FRAME))
+    with pytest.raises(queue.Full):
+        contexts.put(pipeline.FrameContext(frames.FRAME), block=False)
+    with pytest.raises(queue.Full):
+        contexts.put(pipeline.FrameContext(frames.FRAME), timeout=0.01)
@@ -0,0 +1,76 @@
+import json
+import os
+import zlib
+from datetime import datetime
+
+import pytest
+
+import wire.wire as wire
+
+with open(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'message.json')) as file:
+    SAMPLE = json.load(file)
+TIMESTAMP = datetime.fromisoformat(f"{SAMPLE['metadata']['date']}T{SAMPLE['metadata']['time']}")
+ROOM = SAMPLE['metadata']['room']
+COMPRESSIONS = ['none', 'zlib'] + (['zstd'] if wire.zstandard is not None else [])
+
+
+@pytest.mark.parametrize('compression', COMPRESSIONS)
+def test_compact_batch_round_trip(compression):
+    codec = wire.Codec('compact', compression, ROOM)
+    body, headers = codec.batch([codec.record(SAMPLE['metadata'], SAMPLE['data'], TIMESTAMP) for _ in range(100)])
+
+    assert headers == {"Content-Type": wire.CONTENT_TYPES['compact']}
+    records = wire.to_json_records(body)
+    assert len(records) == 100
+    assert records[0] == {"metadata": {"date": SAMPLE['metadata']['date'], "time": SAMPLE['metadata']['time'],
+                                       "room": ROOM}, "data": SAMPLE['data']}
+
+
+@pytest.mark.parametrize('compression', COMPRESSIONS)
+def test_json_batch(compression):
+    codec = wire.Codec('json', compression)
+    record = codec.record(SAMPLE['metadata'], SAMPLE['data'], TIMESTAMP)
+    body, headers = codec.batch([record] * 3)
+
+    if compression == 'none':
+        assert headers is None
+    else:
+        assert headers["Content-Encoding"] == wire.COMPRESSIONS[compression]
+        body = zlib.decompress(body) if compression == 'zlib' else wire.zstandard.ZstdDecompressor().decompress(body)
+    assert wire.to_json_records(body) == [SAMPLE] * 3
+
+
+def test_trace_is_carried_by_compact_records():
+    metadata = dict(SAMPLE['metadata'], trace_id="0123456789abcdef", received_at=12.5)
+    codec = wire.Codec('compact', room=ROOM)
+    record = wire.to_json_records(codec.message(codec.record(metadata, SAMPLE['data'], TIMESTAMP)))[0]
+
+    assert record["metadata"]["trace_id"] == "0123456789abcdef" and record["metadata"]["received_at"] == 12.5
+
+
+def test_sensor_messages():
+    messages = wire.encode_sensor_messages(TIMESTAMP, SAMPLE['data'], room=ROOM)
+    json_messages = wire.json_sensor_messages(SAMPLE['metadata'], SAMPLE['data'])
+
+    assert set(messages) == set(json_messages) == set(SAMPLE['data'])
+    for ascii_id, measure in SAMPLE['data'].items():
+        assert messages[ascii_id] == wire.encode_message([wire.encode_record(TIMESTAMP, {ascii_id: measure})], ROOM)
+        assert json.loads(json_messages[ascii_id]) == {"value": measure["value"], "unit": measure["unit"],
+                                                       "date": SAMPLE['metadata']['date'],
+                                                       "time": SAMPLE['metadata']['time']}
+
+
+def test_corrupted_messages():
+    message = wire.encode_message([wire.encode_record(TIMESTAMP, SAMPLE['data'])], ROOM)
+
+    assert wire.is_compact(message) and not wire.is_compact(json.dumps(SAMPLE))
+    for corrupted in (message[:len(message) // 2], b'LBC\x09\x00', b'XYZ' + message[3:]):
+        with pytest.raises(wire.WireFormatError):
+            wire.decode_message(corrupted)
+
+
+def test_unsupported_format_or_compression():
+    with pytest.raises(ValueError):
+        wire.Codec('xml')
+    with pytest.raises(ValueError):
+        wire.Codec('json', 'lz4')
@@ -0,0 +1,133 @@
+# ************************************** TRACING MODULE **************************************
+
+import json
+import os
+import random
+import threading
+import time
+
+# Fraction of the trace IDs below which a trace is sampled, compared with their first 32 bits:
+# the cloud applies the same rule, so both sides log the same traces when their sample rates are equal
+SAMPLE_SPACE = 1 << 32
+
+
+def new_trace_id() -> str:
+    """
+    Returns a new random trace ID: 16 hexadecimal digits.
+    """
+    return f"{random.getrandbits(64):016x}"
+
+
+def is_sampled(trace_id: str, sample_rate: float) -> bool:
+    """
+    Returns whether a trace is sampled: the decision only depends on the trace ID and the sample rate.
+
+    Args:
+        trace_id (str): The trace ID.
+        sample_rate (float): The fraction of the traces to sample, between 0 and 1.
+    """
+    return int(trace_id[:8], 16) < sample_rate * SAMPLE_SPACE
+
+
+class Tracer:
+    """
+    Writes the spans of the sampled traces to a local log, one JSON object per line:
+    {"trace_id", "process", "node", "received", "outcome", "spans": [{"name", "start", "duration"}]}.
+    'received' is the wall clock time (seconds since 1970) of the frame's reception; span starts are seconds
+    since then, measured with the monotonic clock. The cloud logs its own spans in the same format,
+    so the two logs can be joined on the trace ID offline. The log is rotated once to '<path>.1' when full.
+
+    Attributes:
+        path (str): The path of the trace log.
+        sample_rate (float): The fraction of the traces to log, between 0 and 1.
+        process (str): The name of the process, written in every line.
+        max_bytes (int): Size in bytes at which the log is rotated (0 to never rotate).
+        written (int): Number of traces written.
+    """
+
+    def __init__(self, path: str, sample_rate: float = 0.01, process: str = 'edge', max_bytes: int = 0):
+        """
+        Constructor for Tracer class: opens (or creates) the trace log.
+
+        Args:
+            path (str): The path of the trace log.
+            sample_rate (float, optional): The fraction of the traces to log. Default is 0.01.
+            process (str, optional): The name of the process. Default is 'edge'.
+            max_bytes (int, optional): Size in bytes at which the log is rotated. Default is 0 (never).
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.path = path
+        self.sample_rate = sample_rate
+        self.process = process
+        self.max_bytes = max_bytes
+        self.written = 0
+        self.lock = threading.Lock()
+        # Line buffered: a sampled trace is on disk as soon as it is finished
+        self.file = open(path, 'a', buffering=1)
+
+    def start(self, context):
+        """
+        Starts collecting the spans of a frame if its trace is sampled.
+
+        Args:
+            context (pipeline.FrameContext): The context of the frame.
+        """
+        if is_sampled(context.trace_id, self.sample_rate):
+            context.spans = []
+
+    def finish(self, context, outcome: str):
+        """
+        Writes the spans of a sampled frame to the log.
+
+        Args:
+            context (pipeline.FrameContext): The context of the frame.
+            outcome (str): How the frame left the pipeline, e.g. 'published', 'dropped by filter' or 'failed'.
+        """
+        spans = context.spans
+        if spans is None:
+            return
+        context.spans = None
+
+        received = time.time() - (time.monotonic() - context.received_at)
+        line = json.dumps({
+            "trace_id": context.trace_id,
+            "process": self.process,
+            "node": context.node,
+            "received": round(received, 6),
+            "outcome": outcome,
+            "spans": [{"name": name, "start": round(start - context.received_at, 6), "duration": round(end - start, 6)}
+                      for name, start, end in spans]
+        })
+        self.write(line)
+
+    def write(self, line: str):
+        """
+        Appends a line to the log, rotating it first if it is full.
+
+        Args:
+            line (str): The JSON line, without its newline.
+        """
+        with self.lock:
+            if self.max_bytes and self.file.tell() + len(line) >= self.max_bytes:
+                self.file.close()
+                os.replace(self.path, self.path + '.1')
+                self.file = open(self.path, 'a', buffering=1)
+            self.file.write(line + '\n')
+            self.written += 1
+
+    def stats(self) -> dict:
+        """
+        Returns the counters of the tracer.
+        """
+        with self.lock:
+            return {"written": self.written}
+
+    def close(self):
+        """
+        Closes the trace log.
+        """
+        with self.lock:
+            self.file.close()
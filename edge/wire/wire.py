@@ -0,0 +1,656 @@
+# ************************************** WIRE MODULE **************************************
+
+import json
+import struct
+import zlib
+from datetime import datetime
+import libellium.measurement as measurement
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+# Formats of the messages sent to the cloud and published on MQTT
+FORMATS = ('json', 'compact')
+
+# Compressions of the batches sent to the cloud, with their HTTP 'Content-Encoding'
+COMPRESSIONS = {'none': None, 'zlib': 'deflate', 'zstd': 'zstd'}
+
+# HTTP 'Content-Type' of each format
+CONTENT_TYPES = {'json': 'application/json', 'compact': 'application/x-libellium-compact'}
+
+# Compact message: magic, version, flags; then (possibly compressed) record count and room
+MAGIC = b'LBC'
+VERSION = 1
+HEADER = struct.Struct('<3sBB')
+BODY_HEADER = struct.Struct('<H')
+
+# Flags of a compact message
+FLAG_ZLIB = 0x01
+FLAG_ZSTD = 0x02
+
+# Compact record: length, timestamp (milliseconds since 1970-01-01, local time), number of values
+RECORD_LENGTH = struct.Struct('<H')
+RECORD_HEADER = struct.Struct('<qB')
+
+# Compact value: sensor binary_id (1 byte), type code (1 byte), value.
+# Type codes of the compact values, with their unpackers (strings and lists are length-prefixed)
+UINT8, UINT16, UINT32, UINT64, INT64, FLOAT32, FLOAT64, STRING, LIST, NULL = range(10)
+VALUE_FORMATS = {
+    UINT8: struct.Struct('<B'),
+    UINT16: struct.Struct('<H'),
+    UINT32: struct.Struct('<I'),
+    UINT64: struct.Struct('<Q'),
+    INT64: struct.Struct('<q'),
+    FLOAT32: struct.Struct('<f'),
+    FLOAT64: struct.Struct('<d'),
+}
+LENGTH = struct.Struct('<B')
+
+# Reserved binary_id of the trace of a record: a list [trace_id, received_at] (see the 'tracing' module)
+TRACE = 255
+
+EPOCH = datetime(1970, 1, 1)
+
+
+class WireFormatError(Exception):
+    """
+    Exception raised when a message cannot be encoded or decoded in the compact format.
+    """
+
+    def __init__(self, message="Invalid compact message"):
+        """
+        Constructor for WireFormatError exception.
+
+        Args:
+            message (str, optional): Custom error message. Defaults to "Invalid compact message".
+        """
+        self.message = message
+        super().__init__(self.message)
+
+
+class Schema:
+    """
+    Maps the sensors' ascii_id, used by the JSON format, to their binary_id, used by the compact format,
+    and keeps their units, which the compact format never sends.
+
+    Attributes:
+        binary_ids (dict): {ascii_id: binary_id}.
+        ascii_ids (dict): {binary_id: ascii_id}.
+        units (dict): {ascii_id: unit}.
+    """
+
+    def __init__(self, sensors: dict):
+        """
+        Constructor for Schema class.
+
+        Args:
+            sensors (dict): The sensors: {binary_id: Sensor}.
+        """
+        self.binary_ids = {sensor.ascii_id: binary_id for binary_id, sensor in sensors.items()}
+        self.ascii_ids = {binary_id: sensor.ascii_id for binary_id, sensor in sensors.items()}
+        self.units = {sensor.ascii_id: sensor.unit for sensor in sensors.values()}
+
+
+def default_schema() -> Schema:
+    """
+    Returns the schema of the sensors of 'sensor.json'.
+    """
+    global SCHEMA
+    if SCHEMA is None:
+        # Imported here, so that subscribers only load the sensors when they decode a compact message
+        import libellium.libellium as libellium
+        SCHEMA = Schema(libellium.SENSORS)
+    return SCHEMA
+
+
+SCHEMA = None
+
+# JSON fragments of every sensor, built on first use: ('"ascii_id": {"value": ', ', "unit": "unit"}')
+FRAGMENTS = {}
+
+
+def json_value(value) -> str:
+    """
+    Returns the JSON text of a value, as json.dumps writes it (finite floats and integers without going through it).
+    """
+    kind = type(value)
+    if kind is float and value - value == 0:
+        return float.__repr__(value)
+    if kind is int:
+        return int.__repr__(value)
+    return json.dumps(value)
+
+
+def json_record(metadata: dict, measures: measurement.MeasurementSet) -> str:
+    """
+    Serializes a record in the JSON format straight from the columns of its measurements, joining the cached
+    fragments of the sensors with their values: the text is the same as json.dumps({"metadata", "data"}),
+    without building a {"value", "unit"} dict per measurement.
+
+    Args:
+        metadata (dict): The metadata of the record.
+        measures (measurement.MeasurementSet): The measurements.
+
+    Returns:
+        str: The record.
+    """
+    if not measures.is_unique():
+        # Repeated ASCII IDs: the dict keeps the last value of each, as the JSON object would
+        return json.dumps({"metadata": metadata, "data": measures.to_dict()})
+
+    parts = []
+    for sensor, value in zip(measures.sensors, measures.values):
+        fragment = FRAGMENTS.get(sensor)
+        if fragment is None:
+            fragment = FRAGMENTS[sensor] = (json.dumps(sensor.ascii_id) + ': {"value": ',
+                                            ', "unit": ' + json.dumps(sensor.unit) + '}')
+        parts.append(fragment[0] + json_value(value) + fragment[1])
+    return '{"metadata": ' + json.dumps(metadata) + ', "data": {' + ', '.join(parts) + '}}'
+
+
+# Metadata carried by the messages of the per-sensor topics (the room and the sensor are in the topic)
+SENSOR_METADATA = ('date', 'time')
+
+# JSON fragments of the per-sensor message of every sensor, built on first use: ('{"value": ', ', "unit": "unit"')
+SENSOR_FRAGMENTS = {}
+
+
+def json_sensor_messages(metadata: dict, measures) -> dict:
+    """
+    Serializes every measurement as its own JSON message: {"value", "unit", "date", "time"}.
+    The text is the same as json.dumps of that dict; the metadata part is serialized once for all the messages.
+
+    Args:
+        metadata (dict): The metadata of the record.
+        measures (measurement.MeasurementSet | dict): The measurements, or a dict {ascii_id: {"value", "unit"}}.
+
+    Returns:
+        dict: The messages: {ascii_id: str}. When two sensors share an ASCII ID, the last value wins.
+    """
+    suffix = ''.join(f', "{key}": ' + json.dumps(metadata[key]) for key in SENSOR_METADATA if key in metadata) + '}'
+
+    if not isinstance(measures, measurement.MeasurementSet):
+        return {ascii_id: '{"value": ' + json.dumps(measure["value"]) + ', "unit": ' + json.dumps(measure["unit"]) + suffix
+                for ascii_id, measure in measures.items()}
+
+    messages = {}
+    for sensor, value in zip(measures.sensors, measures.values):
+        fragment = SENSOR_FRAGMENTS.get(sensor)
+        if fragment is None:
+            fragment = SENSOR_FRAGMENTS[sensor] = ('{"value": ', ', "unit": ' + json.dumps(sensor.unit))
+        messages[sensor.ascii_id] = fragment[0] + json_value(value) + fragment[1] + suffix
+    return messages
+
+
+def encode_value(value, out: bytearray):
+    """
+    Appends a value, preceded by its type code, choosing the smallest exact encoding.
+
+    Args:
+        value (int | float | str | list | None): The value.
+        out (bytearray): The buffer to append to.
+    """
+    if value is None:
+        out.append(NULL)
+    elif isinstance(value, float):
+        try:
+            packed = VALUE_FORMATS[FLOAT32].pack(value)
+            if VALUE_FORMATS[FLOAT32].unpack(packed)[0] == value or value != value:
+                out.append(FLOAT32)
+                out += packed
+                return
+        except OverflowError:
+            pass
+        out.append(FLOAT64)
+        out += VALUE_FORMATS[FLOAT64].pack(value)
+    elif isinstance(value, int):
+        if value < 0:
+            code = INT64
+        elif value <= 0xFF:
+            code = UINT8
+        elif value <= 0xFFFF:
+            code = UINT16
+        elif value <= 0xFFFFFFFF:
+            code = UINT32
+        else:
+            code = UINT64
+        out.append(code)
+        out += VALUE_FORMATS[code].pack(value)
+    elif isinstance(value, str):
+        data = value.encode('utf-8')
+        out.append(STRING)
+        out += LENGTH.pack(len(data))
+        out += data
+    elif isinstance(value, (list, tuple)):
+        out.append(LIST)
+        out += LENGTH.pack(len(value))
+        for item in value:
+            encode_value(item, out)
+    else:
+        raise WireFormatError(f"Value of type {type(value).__name__} not supported.")
+
+
+def decode_value(view, offset: int) -> tuple:
+    """
+    Reads a value preceded by its type code.
+
+    Args:
+        view (bytes | memoryview): The buffer.
+        offset (int): The offset of the type code.
+
+    Returns:
+        tuple: The value and the offset of the next byte.
+    """
+    code = view[offset]
+    offset += 1
+
+    unpacker = VALUE_FORMATS.get(code)
+    if unpacker is not None:
+        return unpacker.unpack_from(view, offset)[0], offset + unpacker.size
+    if code == STRING:
+        length = view[offset]
+        offset += 1
+        return bytes(view[offset:offset + length]).decode('utf-8'), offset + length
+    if code == LIST:
+        count = view[offset]
+        offset += 1
+        values = []
+        for _ in range(count):
+            value, offset = decode_value(view, offset)
+            values.append(value)
+        return values, offset
+    if code == NULL:
+        return None, offset
+    raise WireFormatError(f"Unknown type code {code}.")
+
+
+def encode_record(timestamp: datetime, measures, schema: Schema = None, trace: list = None) -> bytes:
+    """
+    Encodes a record in the compact format: the timestamp and, for every measurement, the binary_id
+    of its sensor and its value. Units are left out, they are known from the schema.
+    The trace, if any, is encoded as an extra value with the reserved binary_id TRACE.
+
+    Args:
+        timestamp (datetime): The (naive, local) time of the record.
+        measures (measurement.MeasurementSet | dict): The measurements, or a dict {ascii_id: {"value", "unit"}}.
+        schema (Schema, optional): The sensors' schema. Default is the schema of 'sensor.json'.
+        trace (list, optional): The trace ID and the monotonic reception time of the record. Default is None.
+
+    Returns:
+        bytes: The record, preceded by its length.
+
+    Raises:
+        WireFormatError: If a sensor is not in the schema or a value cannot be encoded.
+    """
+    schema = schema or default_schema()
+
+    if isinstance(measures, measurement.MeasurementSet) and measures.is_unique():
+        values = ((sensor.ascii_id, value) for sensor, value in zip(measures.sensors, measures.values))
+    else:
+        if isinstance(measures, measurement.MeasurementSet):
+            measures = measures.to_dict()
+        values = ((ascii_id, measure["value"]) for ascii_id, measure in measures.items())
+
+    milliseconds = (timestamp - EPOCH) // EPOCH.resolution // 1000
+    out = bytearray(RECORD_LENGTH.size)
+    out += RECORD_HEADER.pack(milliseconds, len(measures) + (trace is not None))
+    for ascii_id, value in values:
+        binary_id = schema.binary_ids.get(ascii_id)
+        if binary_id is None:
+            raise WireFormatError(f"Sensor '{ascii_id}' not in the schema.")
+        out.append(binary_id)
+        encode_value(value, out)
+    if trace is not None:
+        out.append(TRACE)
+        encode_value(list(trace), out)
+
+    RECORD_LENGTH.pack_into(out, 0, len(out) - RECORD_LENGTH.size)
+    return bytes(out)
+
+
+def encode_sensor_messages(timestamp: datetime, measures, schema: Schema = None, room: str = '') -> dict:
+    """
+    Encodes every measurement as its own compact message, holding a single record with a single value.
+    The messages are the same as encode_message([encode_record(...)], room) of each measurement (uncompressed),
+    but their header and the header of their record are only packed once.
+
+    Args:
+        timestamp (datetime): The (naive, local) time of the record.
+        measures (measurement.MeasurementSet | dict): The measurements, or a dict {ascii_id: {"value", "unit"}}.
+        schema (Schema, optional): The sensors' schema. Default is the schema of 'sensor.json'.
+        room (str, optional): The room the measurements come from. Default is an empty string.
+
+    Returns:
+        dict: The messages: {ascii_id: bytes}. When two sensors share an ASCII ID, the last value wins.
+
+    Raises:
+        WireFormatError: If a sensor is not in the schema or a value cannot be encoded.
+    """
+    schema = schema or default_schema()
+
+    if isinstance(measures, measurement.MeasurementSet):
+        values = ((sensor.ascii_id, value) for sensor, value in zip(measures.sensors, measures.values))
+    else:
+        values = ((ascii_id, measure["value"]) for ascii_id, measure in measures.items())
+
+    room = room.encode('utf-8')
+    header = HEADER.pack(MAGIC, VERSION, 0) + BODY_HEADER.pack(1) + LENGTH.pack(len(room)) + room
+    milliseconds = (timestamp - EPOCH) // EPOCH.resolution // 1000
+    record_header = RECORD_HEADER.pack(milliseconds, 1)
+
+    messages = {}
+    for ascii_id, value in values:
+        binary_id = schema.binary_ids.get(ascii_id)
+        if binary_id is None:
+            raise WireFormatError(f"Sensor '{ascii_id}' not in the schema.")
+        out = bytearray(record_header)
+        out.append(binary_id)
+        encode_value(value, out)
+        messages[ascii_id] = header + RECORD_LENGTH.pack(len(out)) + out
+    return messages
+
+
+def decode_record(view, offset: int, schema: Schema = None) -> tuple:
+    """
+    Decodes a compact record into its timestamp, its measurements and its trace.
+
+    Args:
+        view (bytes | memoryview): The buffer.
+        offset (int): The offset of the record's length.
+        schema (Schema, optional): The sensors' schema. Default is the schema of 'sensor.json'.
+
+    Returns:
+        tuple: The timestamp (datetime), the measurements {ascii_id: {"value", "unit"}},
+               the trace [trace_id, received_at] (None if absent) and the offset of the next record.
+    """
+    schema = schema or default_schema()
+
+    length = RECORD_LENGTH.unpack_from(view, offset)[0]
+    offset += RECORD_LENGTH.size
+    end = offset + length
+
+    milliseconds, count = RECORD_HEADER.unpack_from(view, offset)
+    offset += RECORD_HEADER.size
+
+    measures = {}
+    trace = None
+    for _ in range(count):
+        binary_id = view[offset]
+        value, offset = decode_value(view, offset + 1)
+        if binary_id == TRACE:
+            trace = value
+            continue
+        ascii_id = schema.ascii_ids.get(binary_id, str(binary_id))
+        measures[ascii_id] = {"value": value, "unit": schema.units.get(ascii_id, '')}
+
+    if offset != end:
+        raise WireFormatError("Record length mismatch.")
+    return EPOCH + EPOCH.resolution * 1000 * milliseconds, measures, trace, end
+
+
+def encode_message(records: list, room: str = '', compression: str = 'none') -> bytes:
+    """
+    Wraps compact records into a message, optionally compressed.
+
+    Args:
+        records (list): The records, as returned by encode_record.
+        room (str, optional): The room the records come from. Default is an empty string.
+        compression (str, optional): One of COMPRESSIONS. Default is 'none'.
+
+    Returns:
+        bytes: The message.
+
+    Raises:
+        WireFormatError: If the compression is not available.
+    """
+    room = room.encode('utf-8')
+    body = BODY_HEADER.pack(len(records)) + LENGTH.pack(len(room)) + room + b''.join(records)
+
+    flags = 0
+    if compression == 'zlib':
+        flags = FLAG_ZLIB
+        body = zlib.compress(body)
+    elif compression == 'zstd':
+        if zstandard is None:
+            raise WireFormatError("zstd compression requires the 'zstandard' package.")
+        flags = FLAG_ZSTD
+        body = zstandard.ZstdCompressor().compress(body)
+    elif compression != 'none':
+        raise WireFormatError(f"Compression '{compression}' not supported. Use one of {tuple(COMPRESSIONS)}.")
+
+    return HEADER.pack(MAGIC, VERSION, flags) + body
+
+
+def decode_message(data, schema: Schema = None) -> dict:
+    """
+    Decodes a compact message.
+
+    Args:
+        data (bytes | memoryview): The message.
+        schema (Schema, optional): The sensors' schema. Default is the schema of 'sensor.json'.
+
+    Returns:
+        dict: {"room": str, "records": [(timestamp, measures, trace)]}.
+
+    Raises:
+        WireFormatError: If the message is not a valid compact message.
+    """
+    try:
+        magic, version, flags = HEADER.unpack_from(data, 0)
+        if magic != MAGIC or version != VERSION:
+            raise WireFormatError("Not a compact message.")
+
+        body = bytes(data[HEADER.size:])
+        if flags & FLAG_ZLIB:
+            body = zlib.decompress(body)
+        elif flags & FLAG_ZSTD:
+            if zstandard is None:
+                raise WireFormatError("zstd compression requires the 'zstandard' package.")
+            body = zstandard.ZstdDecompressor().decompress(body)
+
+        count = BODY_HEADER.unpack_from(body, 0)[0]
+        offset = BODY_HEADER.size
+        length = body[offset]
+        room = body[offset + 1:offset + 1 + length].decode('utf-8')
+        offset += 1 + length
+
+        records = []
+        for _ in range(count):
+            timestamp, measures, trace, offset = decode_record(body, offset, schema)
+            records.append((timestamp, measures, trace))
+        return {"room": room, "records": records}
+
+    except (struct.error, IndexError, UnicodeDecodeError, zlib.error) as e:
+        raise WireFormatError("Truncated or corrupted compact message: " + str(e))
+
+
+def is_compact(data) -> bool:
+    """
+    Returns whether a payload is a compact message (JSON payloads never start with the magic).
+
+    Args:
+        data (str | bytes | memoryview): The payload.
+    """
+    return not isinstance(data, str) and bytes(data[:len(MAGIC)]) == MAGIC
+
+
+def to_json_records(data, schema: Schema = None) -> list:
+    """
+    Decodes a payload in either format into JSON records as published by the edge: {"metadata", "data"}.
+    This is what MQTT subscribers and the cloud use to accept both formats.
+
+    Args:
+        data (str | bytes | memoryview): A JSON record, a JSON array of records or a compact message.
+        schema (Schema, optional): The sensors' schema. Default is the schema of 'sensor.json'.
+
+    Returns:
+        list: The records.
+    """
+    if not is_compact(data):
+        records = json.loads(data)
+        return records if isinstance(records, list) else [records]
+
+    message = decode_message(data, schema)
+    records = []
+    for timestamp, measures, trace in message["records"]:
+        metadata = {
+            "date": timestamp.strftime('%Y-%m-%d'),
+            "time": timestamp.strftime('%H:%M:%S.%f')[:-5],
+            "room": message["room"]
+        }
+        if trace is not None:
+            metadata["trace_id"], metadata["received_at"] = trace
+        records.append({"metadata": metadata, "data": measures})
+    return records
+
+
+class Codec:
+    """
+    Serializes the records uploaded to the cloud and published on MQTT in the configured format.
+    JSON records are strings and batches are JSON arrays; compact records are bytes and batches are compact messages.
+
+    Attributes:
+        format (str): One of FORMATS.
+        compression (str): Compression of the batches, one of COMPRESSIONS.
+        room (str): The room of the edge.
+        schema (Schema): The sensors' schema (compact format only).
+    """
+
+    def __init__(self, format: str = 'json', compression: str = 'none', room: str = '', schema: Schema = None):
+        """
+        Constructor for Codec class.
+
+        Args:
+            format (str, optional): One of FORMATS. Default is 'json'.
+            compression (str, optional): Compression of the batches, one of COMPRESSIONS. Default is 'none'.
+            room (str, optional): The room of the edge. Default is an empty string.
+            schema (Schema, optional): The sensors' schema. Default is the schema of 'sensor.json'.
+
+        Raises:
+            ValueError: If the format or the compression is not supported.
+        """
+        if format not in FORMATS:
+            raise ValueError(f"Wire format '{format}' not supported. Use one of {FORMATS}.")
+        if compression not in COMPRESSIONS:
+            raise ValueError(f"Compression '{compression}' not supported. Use one of {tuple(COMPRESSIONS)}.")
+        if compression == 'zstd' and zstandard is None:
+            raise ValueError("zstd compression requires the 'zstandard' package.")
+
+        self.format = format
+        self.compression = compression
+        self.room = room
+        self.schema = schema
+
+    def record(self, metadata: dict, measures: dict, timestamp: datetime):
+        """
+        Serializes a record.
+
+        Args:
+            metadata (dict): The metadata of the JSON format.
+            measures (measurement.MeasurementSet | dict): The measurements, or a dict {ascii_id: {"value", "unit"}}.
+            timestamp (datetime): The time of the record.
+
+        Returns:
+            str | bytes: The record.
+        """
+        if self.format == 'json':
+            if isinstance(measures, measurement.MeasurementSet):
+                return json_record(metadata, measures)
+            return json.dumps({"metadata": metadata, "data": measures})
+
+        trace = None
+        if "trace_id" in metadata:
+            trace = (metadata["trace_id"], metadata["received_at"])
+        return encode_record(timestamp, measures, self.schema, trace)
+
+    def message(self, record):
+        """
+        Returns the MQTT payload of a single record (never compressed).
+
+        Args:
+            record (str | bytes): The record.
+
+        Returns:
+            str | bytes: The payload.
+        """
+        if self.format == 'json':
+            return record
+        return encode_message([record], self.room)
+
+    def sensor_messages(self, metadata: dict, measures, timestamp: datetime) -> dict:
+        """
+        Serializes every measurement as its own MQTT payload, for the per-sensor topics (never compressed, no trace).
+
+        Args:
+            metadata (dict): The metadata of the JSON format.
+            measures (measurement.MeasurementSet | dict): The measurements, or a dict {ascii_id: {"value", "unit"}}.
+            timestamp (datetime): The time of the record.
+
+        Returns:
+            dict: The payloads: {ascii_id: str | bytes}.
+        """
+        if self.format == 'json':
+            return json_sensor_messages(metadata, measures)
+        return encode_sensor_messages(timestamp, measures, self.schema, self.room)
+
+    def batch(self, records: list) -> tuple:
+        """
+        Serializes a batch of records for the cloud's bulk endpoint.
+
+        Args:
+            records (list): The records.
+
+        Returns:
+            tuple: The body and the HTTP headers describing it.
+        """
+        if self.format == 'json':
+            # Records are already serialized: join them instead of decoding and encoding them again
+            body = "[" + ",".join(records) + "]"
+            if self.compression == 'none':
+                return body, None
+            body = body.encode('utf-8')
+            body = zlib.compress(body) if self.compression == 'zlib' else zstandard.ZstdCompressor().compress(body)
+            return body, {"Content-Type": CONTENT_TYPES['json'], "Content-Encoding": COMPRESSIONS[self.compression]}
+
+        # Compact messages carry their own compression flag
+        headers = {"Content-Type": CONTENT_TYPES['compact']}
+        return encode_message(records, self.room, self.compression), headers
+
+
+if __name__ == '__main__':
+    import time
+
+    with open('message.json') as file:
+        sample = json.load(file)
+    timestamp = datetime.fromisoformat(f"{sample['metadata']['date']}T{sample['metadata']['time']}")
+
+    for compression in ('none', 'zlib') + (('zstd',) if zstandard is not None else ()):
+        codec = Codec('compact', compression, sample['metadata']['room'])
+        records = [codec.record(sample['metadata'], sample['data'], timestamp) for _ in range(100)]
+        body, _ = codec.batch(records)
+
+        json_codec = Codec('json', compression)
+        json_body, _ = json_codec.batch([json_codec.record(sample['metadata'], sample['data'], timestamp)] * 100)
+
+        print(f"[{compression}] JSON: {len(json_body)} bytes, compact: {len(body)} bytes for 100 records "
+              f"({len(body) / len(json_body):.1%})")
+
+    start = time.perf_counter()
+    for _ in range(10000):
+        encode_record(timestamp, sample['data'])
+    print(f"Compact encoding: {(time.perf_counter() - start) / 10000 * 1e6:.1f} us per record")
+
+    start = time.perf_counter()
+    for _ in range(10000):
+        json.dumps(sample)
+    print(f"JSON encoding: {(time.perf_counter() - start) / 10000 * 1e6:.1f} us per record")
+
+    # Total size of the per-sensor messages of a record
+    room = sample['metadata']['room']
+    messages = encode_sensor_messages(timestamp, sample['data'], room=room)
+    json_messages = json_sensor_messages(sample['metadata'], sample['data'])
+    print(f"Per-sensor messages of a record: {len(messages)}, JSON: {sum(map(len, json_messages.values()))} bytes, "
+          f"compact: {sum(map(len, messages.values()))} bytes")